@@ -1,4 +1,9 @@
-def get_full_uspcm_dict():
+# The largest number of vertices of the graphs in the stored dictionaries, see set_max_verts() in
+# spectator_floor_number_read_write_functions.py.
+MAX_VERTS = 10
+
+
+def get_full_uspcm_dict(url_path=None, max_workers=8, retries=3, backoff=0.5, max_verts=10):
     """
     Access the GitHub repo to put together the complete uspcm_dict, the dictionary of connected graphs 
     on up to 10 vertices (inclusive) with the spectator number for each graph.
@@ -6,35 +11,138 @@ def get_full_uspcm_dict():
     This is a nested dictionary, to access, e.g., the dictionary of connected graphs on 6 vertices and 
     10 edges, use uspcm_dict['6_verts']['10_edges']. The innermost dictionary's keys are graph6_strings 
     and the values are the spectator number for that graph.
+    
+    The partitions are downloaded by max_workers threads sharing one pool of connections, and each one is
+    parsed as soon as it arrives while the others are still downloading.
+    
+    :param url_path: Optional argument. The URL of the directory of partition files. By default,
+            USPCM_DICT_URL.
+    
+    :param max_workers: The largest number of requests in flight at once.
+    
+    :param retries: The number of times to retry a failed request, see fetch_text().
+    
+    :param backoff: The number of seconds to wait before the first retry, see fetch_text().
+    
+    :param max_verts: The largest number of vertices of the graphs to fetch.
     """
     
     import requests
+    from concurrent.futures import ThreadPoolExecutor, as_completed
 
-    uspcm_dict = {}
-    url_path = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data/uspcm_dict/'
+    if url_path is None:
+        url_path = USPCM_DICT_URL
+    url_path = url_path.rstrip('/')
 
+    # Create the keys in the usual order, the partitions arrive in any order
+    uspcm_dict = {}
+    partitions = []
+    for num_verts in range(max_verts + 1):
+        edge_counts = [0] if num_verts < 2 else range(num_verts*(num_verts-1)//2, 0, -1)
+        uspcm_dict[f'{num_verts}_verts'] = {f'{num_edges}_edges': None for num_edges in edge_counts}
+        partitions += [(num_verts, num_edges) for num_edges in edge_counts]
 
-    for num_verts in range(2):
-        uspcm_dict[f'{num_verts}_verts'] = {}
-
-        filename = f'uspcm_dict_{num_verts}_verts_{0}_edges.txt'
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    
+    with session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_text, f'{url_path}/uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt',
+                               session, retries, backoff): (num_verts, num_edges)
+                   for num_verts, num_edges in partitions}
+        for future in as_completed(futures):
+            num_verts, num_edges = futures[future]
+            uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = eval(future.result())
+            
+    return uspcm_dict
 
-        file_url = f'{url_path}/{filename}'
-        response = requests.get(file_url)
-        uspcm_dict[f'{num_verts}_verts'][f'{0}_edges'] = eval(response.text)
 
 
-    for num_verts in range(2, 11):
-        uspcm_dict[f'{num_verts}_verts'] = {}
+def set_fetch_cache(cache_dir=None, offline=None, memo_size=None):
+    """
+    Configures the cache of files fetched from the GitHub repo.
+    
+    :param cache_dir: Optional argument. The directory in which to keep fetched files, or False to not keep
+            them on disk.
+    
+    :param offline: Optional argument. If True, files are only ever read from the cache and never downloaded.
+    
+    :param memo_size: Optional argument. The number of parsed files to keep in memory.
+    """
+    global FETCH_CACHE_DIR, FETCH_OFFLINE, FETCH_MEMO_SIZE
+    
+    if cache_dir is not None:
+        FETCH_CACHE_DIR = cache_dir
+    if offline is not None:
+        FETCH_OFFLINE = offline
+    if memo_size is not None:
+        FETCH_MEMO_SIZE = memo_size
+        while len(_fetch_memo) > FETCH_MEMO_SIZE:
+            del _fetch_memo[next(iter(_fetch_memo))]
+        
+        
+def clear_fetch_memo():
+    """
+    Forgets the files parsed during this session, so they are read from the cache (or fetched) again.
+    """
+    _fetch_memo.clear()
 
-        for num_edges in range(num_verts*(num_verts-1)//2, 0, -1):
-            filename = f'uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt'
 
-            file_url = f'{url_path}/{filename}'
-            response = requests.get(file_url)
-            uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = eval(response.text)
-            
-    return uspcm_dict
+def fetch_cached(url, cache_name):
+    """
+    Returns the eval of the text of the file at url, read from the in-process memo, then from the on-disk
+    cache, then (unless offline) from url. A cached file whose content does not match its recorded hash, or
+    that was fetched from another URL (e.g. before USPCM_DICT_URL was changed), is fetched again. The
+    returned object is shared by every caller and must not be modified.
+    
+    :param url: The URL of the file, see fetch_text().
+    
+    :param cache_name: The name of the file in FETCH_CACHE_DIR.
+    """
+    import hashlib
+    import os
+    import tempfile
+    
+    if url in _fetch_memo:
+        # Move it to the end, as the most recently used
+        _fetch_memo[url] = _fetch_memo.pop(url)
+        return _fetch_memo[url]
+    
+    text = None
+    if FETCH_CACHE_DIR:
+        cache_dir = os.path.expanduser(FETCH_CACHE_DIR)
+        cache_filename = f'{cache_dir}/{cache_name}'
+        try:
+            with open(cache_filename, 'r') as infile:
+                cached_text = infile.read()
+            with open(cache_filename + '.sha256', 'r') as infile:
+                if infile.read().strip() == f'{hashlib.sha256(cached_text.encode()).hexdigest()}  {url}':
+                    text = cached_text
+        except OSError:
+            pass
+    
+    if text is None:
+        if FETCH_OFFLINE:
+            raise FileNotFoundError(f'{cache_name} from {url} is not in the cache {FETCH_CACHE_DIR} '
+                                    f'and offline mode is set')
+        text = fetch_text(url)
+        if FETCH_CACHE_DIR:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to temporary files of unique names first, so that an interrupted write is never mistaken for
+            # a cached file and processes filling the cache at the same time do not write to the same file
+            checksum = f'{hashlib.sha256(text.encode()).hexdigest()}  {url}\n'
+            for filename, contents in ((cache_filename, text), (cache_filename + '.sha256', checksum)):
+                fd, tmp_filename = tempfile.mkstemp(dir=cache_dir)
+                with os.fdopen(fd, 'w') as outfile:
+                    outfile.write(contents)
+                os.replace(tmp_filename, filename)
+    
+    partition = eval(text)
+    _fetch_memo[url] = partition
+    while len(_fetch_memo) > FETCH_MEMO_SIZE:
+        del _fetch_memo[next(iter(_fetch_memo))]
+    return partition
 
 
 
@@ -47,22 +155,22 @@ def get_partial_uspcm_dict(num_verts, num_edges):
     10 edges, use uspcm_dict['6_verts']['10_edges']. The innermost dictionary's keys are graph6_strings 
     and the values are the spectator number for that graph.
     
+    Each partition is only downloaded once, see fetch_cached(), and the innermost dictionary is shared by
+    every call for the same partition.
+    
     :param num_verts: The number of vertices.
     
     :param num_edges: The number of edges.
     """
-    
-    import requests
 
     uspcm_dict = {}
-    url_path = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data/uspcm_dict/'
+    url_path = USPCM_DICT_URL
     filename = f'uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt'
 
     file_url = f'{url_path}/{filename}'
-    response = requests.get(file_url)
     
     uspcm_dict[f'{num_verts}_verts'] = {}
-    uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = eval(response.text)
+    uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = fetch_cached(file_url, filename)
 
     return uspcm_dict
 
@@ -71,13 +179,12 @@ def get_partial_uspcm_dict(num_verts, num_edges):
 def read_minor_minimals():
     """
     Returns the dictionary of graphs which are minor minimal with respect to the spectator minor floor 
-    number from the GitHub repo.
+    number from the GitHub repo. The file is only downloaded once, see fetch_cached().
     """
-    import requests
+    import copy
     
-    url = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data/minimals_dict.txt'
-    response = requests.get(url)
-    return eval(response.text)
+    url = f'{MINIMALS_DICT_URL}/minimals_dict.txt'
+    return copy.deepcopy(fetch_cached(url, 'minimals_dict.txt'))
 
 
 
@@ -142,25 +249,40 @@ Enter 'Yes' to print all {num} of the graphs.\n"""
         
         
         
-def get_spectator_floor(graph, uspcm_dict=None):
+def get_spectator_floor(graph, uspcm_dict=None, path_prefix=None, file_format='bin'):
     """
     Returns the spectator floor number of the given graph.
     
-    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most 10 vertices.
+    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most MAX_VERTS vertices.
     
     :param uspcm_dict: Optional argument. A dictionary of spectator floor numbers, either the complete 
             dictionary or partial dictionary with the spectator floor numbers for graphs on the number of 
-            vertices and edges that the graph argument has. If not provided, the get_partial_uspcm_dict() 
-            function will be used to fetch the partial dictionary from the github repo.
+            vertices and edges that the graph argument has. The innermost dictionaries may be memory-mapped
+            binary partitions, e.g. from init_uspcm_dict(path_prefix, file_format='bin'). If not provided, the
+            get_partial_uspcm_dict() function will be used to fetch the partial dictionary from the github repo.
+            
+    :param path_prefix: Optional argument. If provided (and uspcm_dict is not), the spectator floor number is
+            looked up in the memory-mapped binary partition file saved in this directory by
+            write_partial_uspcm_dict(..., file_format='bin') instead of being fetched from the github repo.
+            Requires spectator_floor_number_read_write_functions.py to be loaded.
+            
+    :param file_format: Either 'bin' (default) to memory-map the binary partition file, or 'array' to read it
+            into a UspcmArrayPartition of sorted NumPy arrays. Only used if path_prefix is provided.
+            
+    To look up many graphs at once, use get_spectator_floors().
     """
     G, g6_str = get_canonical_graph(graph)
         
-    if G.num_verts() > 10 or G.is_connected() == False:
-        return "This function only works for connected graphs on at most 10 vertices"
+    if G.num_verts() > MAX_VERTS or G.is_connected() == False:
+        return f'This function only works for connected graphs on at most {MAX_VERTS} vertices'
 
     num_verts = G.num_verts()
     num_edges = G.num_edges()
     
+    if uspcm_dict is None and path_prefix is not None:
+        with read_partial_uspcm_dict(num_verts, num_edges, path_prefix, file_format) as partial_uspcm_dict:
+            return partial_uspcm_dict[g6_str]
+    
     if uspcm_dict is None:
         uspcm_dict = get_partial_uspcm_dict(num_verts, num_edges)
 
@@ -168,55 +290,1165 @@ def get_spectator_floor(graph, uspcm_dict=None):
 
 
 
-def get_canonical_graph(graph):
+class _PartitionCache:
+    """
+    The partitions of the uspcm_dict needed by get_spectator_floors() and iter_spectator_floors(), each fetched
+    (or read, or memory-mapped) at most once.
+    """
+    
+    def __init__(self, uspcm_dict=None, path_prefix=None, file_format='bin'):
+        self.uspcm_dict = uspcm_dict
+        self.path_prefix = path_prefix
+        self.file_format = file_format
+        self.partitions = {}
+    
+    def get(self, num_verts, num_edges):
+        if self.uspcm_dict is not None:
+            return self.uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges']
+        if (num_verts, num_edges) not in self.partitions:
+            if self.path_prefix is not None:
+                partition = read_partial_uspcm_dict(num_verts, num_edges, self.path_prefix, self.file_format)
+            else:
+                partition = get_partial_uspcm_dict(num_verts, num_edges)[f'{num_verts}_verts'][f'{num_edges}_edges']
+            self.partitions[(num_verts, num_edges)] = partition
+        return self.partitions[(num_verts, num_edges)]
+    
+    def close(self):
+        for partition in self.partitions.values():
+            if hasattr(partition, 'close'):
+                partition.close()
+        self.partitions = {}
+
+
+def _lookup_spectator_floors(g6_strings, partitions):
+    """
+    Returns the list of spectator floor numbers of the graphs with the given canonical graph6_strings, looking
+    up all of the graphs of each partition together.
+    """
+    floors = [None]*len(g6_strings)
+    groups = {}
+    for idx, g6_str in enumerate(g6_strings):
+        G = Graph(g6_str)
+        if G.num_verts() > MAX_VERTS or G.is_connected() == False:
+            floors[idx] = f'This function only works for connected graphs on at most {MAX_VERTS} vertices'
+            continue
+        groups.setdefault((G.num_verts(), G.num_edges()), []).append(idx)
+    
+    for (num_verts, num_edges), indices in groups.items():
+        partition = partitions.get(num_verts, num_edges)
+        if hasattr(partition, 'get_floors'):
+            # A UspcmArrayPartition looks up the whole group with one searchsorted()
+            group_floors = [int(floor) for floor in partition.get_floors([g6_strings[idx] for idx in indices])]
+        else:
+            group_floors = [partition[g6_strings[idx]] for idx in indices]
+        for idx, floor in zip(indices, group_floors):
+            floors[idx] = floor
+    
+    return floors
+
+
+def get_spectator_floors(graphs, uspcm_dict=None, path_prefix=None, file_format='bin', algorithm=None,
+                         processes=None):
+    """
+    Returns the list of spectator floor numbers of the given graphs, in the same order. The graphs are
+    canonically labelled together and grouped by number of vertices and edges, so each partition of the
+    uspcm_dict that is needed is fetched (or read) once rather than once per graph.
+    
+    :param graphs: An iterable of graphs, graph6_strings, or adjacency matrices of connected graphs on at most
+            MAX_VERTS vertices.
+    
+    :param uspcm_dict: Optional argument, see get_spectator_floor().
+    
+    :param path_prefix: Optional argument, see get_spectator_floor().
+    
+    :param file_format: Either 'bin' (default) or 'array', see get_spectator_floor().
+    
+    :param algorithm: Optional argument. The canonical labelling backend, see canonical_graph6().
+    
+    :param processes: Optional argument. The number of worker processes used to canonically label the graphs,
+            see canonical_graph6_batch().
+    """
+    partitions = _PartitionCache(uspcm_dict, path_prefix, file_format)
+    try:
+        return _lookup_spectator_floors(canonical_graph6_batch(graphs, algorithm, processes), partitions)
+    finally:
+        partitions.close()
+
+
+def iter_spectator_floors(graphs, uspcm_dict=None, path_prefix=None, file_format='bin', algorithm=None,
+                          processes=None, batch_size=10000):
+    """
+    Generator version of get_spectator_floors() for inputs too large to hold in memory: yields the spectator
+    floor number of each graph, in order, while reading only batch_size graphs at a time. The partitions of
+    the uspcm_dict are still fetched (or read) once, and kept until the generator is finished.
+    
+    :param graphs: An iterable of graphs, graph6_strings, or adjacency matrices of connected graphs on at most
+            MAX_VERTS vertices, e.g. an open file of graph6_strings.
+    
+    :param batch_size: The number of graphs canonically labelled and looked up together.
+    
+    The other arguments are those of get_spectator_floors().
+    """
+    from itertools import islice
+    
+    graphs = iter(graphs)
+    partitions = _PartitionCache(uspcm_dict, path_prefix, file_format)
+    try:
+        while True:
+            batch = [graph.strip() if type(graph) == str else graph for graph in islice(graphs, batch_size)]
+            if not batch:
+                break
+            yield from _lookup_spectator_floors(canonical_graph6_batch(batch, algorithm, processes), partitions)
+    finally:
+        partitions.close()
+
+
+
+def get_canonical_graph(graph, algorithm=None):
     """
     Returns the graph and graph6_string for the canonical labelling of the graph passed into this function.
     
     :param graph: A graph object, graph6_string, or adjacency matrix for a graph.
+    
+    :param algorithm: Optional argument. The canonical labelling backend, see canonical_graph6().
     """
     try:
         mat = Matrix(graph)
         G = Graph(mat)
-        g6_str = G.canonical_label(algorithm='sage').graph6_string()
+        g6_str = canonical_graph6(G, algorithm)
     except TypeError:
         if type(graph) == str:
             G = Graph(graph)
-            g6_str = G.canonical_label(algorithm='sage').graph6_string()
+            g6_str = canonical_graph6(G, algorithm)
         elif type(graph) == Graph:
             G = graph
-            g6_str = G.canonical_label(algorithm='sage').graph6_string()
+            g6_str = canonical_graph6(G, algorithm)
             
     return G, g6_str
 
+
+
+# The keys of every stored dictionary are graph6_strings of the canonical labelling found by Sage's own
+# algorithm. The other backends find a different (but just as canonical) labelling, so each of them keeps a
+# table from its canonical graph6_string to the Sage one, which is filled in the first time a graph is seen
+# or ahead of time by build_canonical_translation(). While a worker of canonical_graph6_batch() labels a chunk,
+# the entries it adds are also collected in _new_canonical_translations, to be merged into the parent's table.
+CANONICAL_ALGORITHM = 'sage'
+CANONICAL_ALGORITHMS = ('sage', 'bliss', 'nauty')
+_canonical_translations = {}
+_new_canonical_translations = None
+
+# The orbits of the automorphism groups of the most recently labelled graphs with a non-trivial automorphism,
+# keyed by the Sage canonical graph6_string, as lists of the vertices of the canonically labelled graph.
+# They come for free with the Sage labelling (see canonical_graph6()) and are used by spectator_number().
+CANONICAL_ORBITS = {}
+CANONICAL_ORBITS_SIZE = 100000
+
+
+def set_canonical_algorithm(algorithm):
+    """
+    Sets the canonical labelling backend used by canonical_graph6(), get_canonical_graph() and Glabel() when no
+    algorithm is given.
+    
+    :param algorithm: One of 'sage', 'bliss' or 'nauty'. The bliss backend needs Sage's optional bliss
+            package and the nauty backend needs nauty's labelg program, otherwise the sage algorithm is used.
+            The first time the bliss or nauty backend sees a graph the sage algorithm is run as well, to
+            translate the labelling, so they are only faster once build_canonical_translation() has been run
+            on the keys of the stored dictionaries.
+    """
+    global CANONICAL_ALGORITHM
+    
+    if algorithm not in CANONICAL_ALGORITHMS:
+        raise ValueError(f'algorithm must be one of {CANONICAL_ALGORITHMS}, not {algorithm!r}')
+    CANONICAL_ALGORITHM = algorithm
+    
+    
+def _translate_canonical_label(algorithm, label):
+    """
+    Returns the graph6_string of the Sage canonical labelling of the graph whose canonical graph6_string
+    found by algorithm is label.
+    """
+    translation = _canonical_translations.setdefault(algorithm, {})
+    try:
+        return translation[label]
+    except KeyError:
+        g6_str = Graph(label).canonical_label(algorithm='sage').graph6_string()
+        translation[label] = g6_str
+        if _new_canonical_translations is not None:
+            _new_canonical_translations.setdefault(algorithm, {})[label] = g6_str
+        return g6_str
+
+
+def _nauty_canonical_labels(g6_strings):
+    """
+    Returns the list of graph6_strings of the canonical labellings found by nauty's labelg program, in
+    the same order as g6_strings, or None if labelg cannot be found.
+    """
+    import shutil
+    import subprocess
+    
+    try:
+        from sage.features.nauty import NautyExecutable
+        labelg = NautyExecutable('labelg').absolute_filename()
+    except Exception:
+        labelg = shutil.which('labelg') or shutil.which('nauty-labelg')
+    if labelg is None:
+        return None
+    
+    result = subprocess.run([labelg, '-q'], input='\n'.join(g6_strings) + '\n', capture_output=True, text=True,
+                            check=True)
+    return result.stdout.split()
+
+
+def canonical_graph6(G, algorithm=None):
+    """
+    Returns the graph6_string of the canonical labelling of G found by Sage's own algorithm, which is the
+    labelling of every key of the stored dictionaries, whichever backend is used to find it.
+    
+    :param G: A graph object.
+    
+    :param algorithm: Optional argument. One of 'sage', 'bliss' or 'nauty'. By default, the backend set by
+            set_canonical_algorithm(). The nauty backend starts the labelg program, so it is only faster
+            through canonical_graph6_batch(). A graph that is not in the translation table of the bliss or
+            nauty backend is also labelled by the sage algorithm, so run build_canonical_translation() on
+            the stored keys first.
+    """
+    if algorithm is None:
+        algorithm = CANONICAL_ALGORITHM
+    
+    if algorithm == 'nauty':
+        return canonical_graph6_batch([G], algorithm)[0]
+    if algorithm != 'sage':
+        try:
+            label = G.canonical_label(algorithm=algorithm).graph6_string()
+        except (ImportError, ValueError, NotImplementedError):
+            # The backend is not installed
+            return _sage_canonical_graph6(G)
+        return _translate_canonical_label(algorithm, label)
+    
+    return _sage_canonical_graph6(G)
+
+
+def _sage_canonical_graph6(G):
+    """
+    Returns the graph6_string of the canonical labelling found by Sage's own algorithm, the same as
+    G.canonical_label(algorithm='sage'), from the same search tree that gives the generators of the
+    automorphism group of G. The orbits of the canonically labelled graph are recorded in CANONICAL_ORBITS if
+    G has a non-trivial automorphism.
+    """
+    from sage.groups.perm_gps.partn_ref.refinement_graphs import search_tree
+    
+    n = G.num_verts()
+    if n <= 1 or G.has_loops() or G.has_multiple_edges():
+        return G.canonical_label(algorithm='sage').graph6_string()
+    
+    # On the vertices 0, ..., n-1 the generators and the certificate are in terms of the vertices themselves
+    K = G.relabel({v: idx for idx, v in enumerate(G)}, inplace=False)
+    generators, _, certificate = search_tree(K, [list(range(n))], certificate=True)
+    g6_str = K.relabel(certificate, inplace=False).graph6_string()
+    
+    if generators and g6_str not in CANONICAL_ORBITS:
+        parent = list(range(n))
+        def find(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+        for generator in generators:
+            for v, image in enumerate(generator):
+                parent[find(v)] = find(image)
+        orbits = {}
+        for v in range(n):
+            orbits.setdefault(find(v), []).append(certificate[v])
+        if len(CANONICAL_ORBITS) >= CANONICAL_ORBITS_SIZE:
+            del CANONICAL_ORBITS[next(iter(CANONICAL_ORBITS))]
+        CANONICAL_ORBITS[g6_str] = [sorted(orbit) for orbit in orbits.values()]
+    
+    return g6_str
+
+
+def _canonical_graph6_chunk(g6_strings, algorithm):
+    if algorithm == 'nauty':
+        labels = _nauty_canonical_labels(g6_strings)
+        if labels is not None:
+            return [_translate_canonical_label('nauty', label) for label in labels]
+        algorithm = 'sage'
+    
+    return [canonical_graph6(Graph(g6_str), algorithm) for g6_str in g6_strings]
+
+
+def _canonical_graph6_worker(g6_strings, algorithm):
+    """
+    Returns the Sage canonical graph6_strings of a chunk of graphs labelled in a worker of
+    canonical_graph6_batch(), and the entries that were added to the translation tables while labelling them.
+    """
+    global _new_canonical_translations
+    
+    _new_canonical_translations = {}
+    try:
+        return _canonical_graph6_chunk(g6_strings, algorithm), _new_canonical_translations
+    finally:
+        _new_canonical_translations = None
+
+
+def canonical_graph6_batch(graphs, algorithm=None, processes=None, chunksize=1000):
+    """
+    Returns the list of graph6_strings of the Sage canonical labellings (see canonical_graph6()) of the
+    given graphs, in the same order.
+    
+    :param graphs: An iterable of graph objects, graph6_strings or adjacency matrices.
+    
+    :param algorithm: Optional argument. One of 'sage', 'bliss' or 'nauty'. By default, the backend set by
+            set_canonical_algorithm(). With 'nauty' each chunk of graphs is labelled by a single run of labelg.
+    
+    :param processes: Optional argument. The number of worker processes that label chunks of the graphs.
+            By default, the graphs are labelled in this process. The translations the workers find are
+            added to the translation tables of this process.
+    
+    :param chunksize: The number of graphs in each chunk.
+    """
+    if algorithm is None:
+        algorithm = CANONICAL_ALGORITHM
+    
+    g6_strings = []
+    for graph in graphs:
+        if type(graph) == str:
+            g6_strings.append(graph)
+        elif type(graph) == Graph:
+            g6_strings.append(graph.graph6_string())
+        else:
+            g6_strings.append(Graph(Matrix(graph)).graph6_string())
+    chunks = [g6_strings[idx:idx + chunksize] for idx in range(0, len(g6_strings), chunksize)]
+    
+    if processes is None or processes <= 1 or len(chunks) <= 1:
+        return [g6_str for chunk in chunks for g6_str in _canonical_graph6_chunk(chunk, algorithm)]
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    labelled = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for chunk, translations in pool.map(_canonical_graph6_worker, chunks, [algorithm]*len(chunks)):
+            labelled.extend(chunk)
+            for backend, translation in translations.items():
+                _canonical_translations.setdefault(backend, {}).update(translation)
+    return labelled
+
+
+def build_canonical_translation(g6_strings, algorithm=None):
+    """
+    Fills in the table from the canonical graph6_strings found by algorithm to the Sage ones for the graphs
+    with the given Sage canonical graph6_strings, e.g. the keys of a partition of the uspcm_dict, so that
+    looking up those graphs never runs the sage algorithm. Until it has been run, the bliss and nauty backends
+    label every graph they have not seen with the sage algorithm as well, and are slower than it.
+    
+    :param g6_strings: An iterable of graph6_strings of Sage canonical labellings.
+    
+    :param algorithm: Optional argument. One of 'bliss' or 'nauty'. By default, the backend set by
+            set_canonical_algorithm().
+    """
+    if algorithm is None:
+        algorithm = CANONICAL_ALGORITHM
+    if algorithm == 'sage':
+        return
+    
+    g6_strings = list(g6_strings)
+    if algorithm == 'nauty':
+        labels = _nauty_canonical_labels(g6_strings)
+        if labels is None:
+            return
+    else:
+        try:
+            labels = [Graph(g6_str).canonical_label(algorithm=algorithm).graph6_string() for g6_str in g6_strings]
+        except (ImportError, ValueError, NotImplementedError):
+            return
+    
+    _canonical_translations.setdefault(algorithm, {}).update(zip(labels, g6_strings))
+
         
 
-def has_minor(G, H):
+def get_graph(graph):
+    """
+    Returns the graph object for a graph object, graph6_string, or adjacency matrix, without relabelling it.
+    
+    :param graph: A graph object, graph6_string, or adjacency matrix for a graph.
+    """
+    if type(graph) == str:
+        return Graph(graph)
+    if type(graph) == Graph:
+        return graph
+    return Graph(Matrix(graph))
+
+
+
+def _unique_geodesic_layers(adjacency, source, best=0, targets=None):
+    """
+    Runs a breadth first search from source in the graph with the given adjacency bitsets, counting the
+    shortest paths to each vertex up to two, and returns (length, target) for a longest unique shortest path
+    from source to a vertex of the bitset targets (by default, any vertex), or (0, source) if there is none
+    longer than best.
+    
+    The search stops at the first layer without a vertex reached by a unique shortest path, since a subpath
+    of a unique shortest path is a unique shortest path, as soon as the unvisited vertices are too few to
+    give a path longer than best, or once every target has been reached.
+    """
+    full = (1 << len(adjacency)) - 1
+    if targets is None:
+        targets = full
+    visited = 1 << source
+    once = visited
+    twice = 0
+    length, target = 0, source
+    depth = 0
+    while once:
+        if depth + bin(full & ~visited).count('1') <= max(best, length) or not targets & ~visited:
+            break
+        # The vertices of the next layer reached through one or at least two shortest paths
+        next_once = 0
+        next_twice = 0
+        frontier = once | twice
+        while frontier:
+            low = frontier & -frontier
+            frontier ^= low
+            reached = adjacency[low.bit_length() - 1] & ~visited
+            if twice & low:
+                next_twice |= reached
+            else:
+                next_twice |= next_once & reached
+                next_once |= reached
+        next_once &= ~next_twice
+        visited |= next_once | next_twice
+        once, twice = next_once, next_twice
+        depth += 1
+        if once & targets:
+            length, target = depth, (once & targets & -(once & targets)).bit_length() - 1
+    return length, target
+
+
+def get_parade_number(adjacency, orbits=None):
+    """
+    Returns (length, source, target) for a longest unique shortest path (parade) in the graph with the given
+    adjacency bitsets, see get_adjacency_bitsets(). The vertices are given by their indices.
+    
+    Given the orbits of the automorphism group, the search is from one vertex of each orbit only, since an
+    automorphism takes the unique shortest paths from one vertex of an orbit to those from any other. The
+    paths are the same read in either direction, so each orbit of pairs of ends is also only searched once:
+    the search from the i-th orbit only looks for ends in the i-th and later orbits, and stops once it has
+    reached all of them.
+    
+    :param adjacency: The adjacency bitsets of a graph.
+    
+    :param orbits: Optional argument. A list of lists of the (indices of the) vertices in each orbit of the
+            automorphism group. By default, every vertex is its own orbit.
+    """
+    n = len(adjacency)
+    if orbits is None:
+        orbits = [[v] for v in range(n)]
+    targets = (1 << n) - 1
+    best, best_source, best_target = 0, 0, 0
+    for orbit in orbits:
+        # No path is longer than one through every vertex
+        if best == n - 1:
+            break
+        length, target = _unique_geodesic_layers(adjacency, orbit[0], best, targets)
+        if length > best:
+            best, best_source, best_target = length, orbit[0], target
+        for v in orbit:
+            targets &= ~(1 << v)
+    return best, best_source, best_target
+
+
+def get_parade(adjacency, source, target):
+    """
+    Returns the list of (indices of the) vertices of the unique shortest path from source to target in the
+    graph with the given adjacency bitsets.
+    """
+    layers = [1 << source]
+    visited = layers[0]
+    while not visited >> target & 1:
+        reached = 0
+        frontier = layers[-1]
+        while frontier:
+            low = frontier & -frontier
+            frontier ^= low
+            reached |= adjacency[low.bit_length() - 1]
+        layers.append(reached & ~visited)
+        visited |= reached
+    
+    path = [target]
+    for layer in reversed(layers[:-1]):
+        previous = adjacency[path[-1]] & layer
+        path.append(previous.bit_length() - 1)
+    return path[::-1]
+
+
+def get_spectator_lower_bound(adjacency):
+    """
+    Returns a lower bound of the spectator number of the graph with the given adjacency bitsets, from its
+    degrees only. A shortest path is no longer than the diameter of its component, which is at most
+    n - (largest degree) + 1, since a vertex is adjacent to at most three vertices of a shortest path, and at
+    most 3n/(smallest degree + 1) - 1, since the closed neighbourhoods of every third vertex of a shortest
+    path are disjoint.
+    
+    :param adjacency: The adjacency bitsets of a graph, see get_adjacency_bitsets().
+    """
+    nn = len(adjacency)
+    if nn == 0:
+        return 0
+    degrees = [bin(bits).count('1') for bits in adjacency]
+    longest = min(nn - 1, nn - max(degrees) + 1, 3*nn // (min(degrees) + 1) - 1)
+    return max(nn - 1 - longest, 0)
+
+
+def spectator_number(graph, certificate=False, orbits=None):
+    """
+    Returns the spectator number of the graph, which is the number of vertices that are not on a longest
+    unique shortest path (parade) of the graph, and the same number usp_comp() finds from the powers of the
+    adjacency matrix. See get_parade_number().
+    
+    Vertices in the same orbit of the automorphism group are the ends of the same lengths of unique shortest
+    paths, so given the orbits only one vertex of each orbit, and one pair of each orbit of pairs of ends, is
+    searched (see get_parade_number()).
+    
+    :param graph: A graph object, graph6_string, or adjacency matrix for a graph.
+    
+    :param certificate: If True, returns (spectator number, parade) where parade is the list of vertices of
+            a longest unique shortest path.
+    
+    :param orbits: Optional argument. A list of lists of the vertices in each orbit of the automorphism group
+            of the graph, e.g. from G.automorphism_group(orbits=True, return_group=False), or True to find them.
+            By default, the orbits recorded in CANONICAL_ORBITS when the canonical graph6_string graph was
+            found by canonical_graph6() (as it is for the minors from deletions() and contractions()) are used,
+            and otherwise every vertex is searched from. False to search from every vertex.
+    """
+    G = get_graph(graph)
+    vertices, adjacency = get_adjacency_bitsets(G)
+    if orbits is None and type(graph) == str:
+        orbits = CANONICAL_ORBITS.get(graph)
+    elif orbits is True:
+        orbits = G.automorphism_group(orbits=True, return_group=False) if vertices else []
+    if orbits:
+        index = {v: idx for idx, v in enumerate(vertices)}
+        orbits = [[index[v] for v in orbit] for orbit in orbits]
+    else:
+        orbits = None
+    length, source, target = get_parade_number(adjacency, orbits)
+    spec_num = max(len(vertices) - 1 - length, 0)
+    if certificate:
+        if not vertices:
+            return spec_num, []
+        return spec_num, [vertices[v] for v in get_parade(adjacency, source, target)]
+    return spec_num
+
+
+
+# The algorithm used by has_minor() when none is given: 'bitset' for the search in find_minor_model(), or
+# 'milp' for Sage's Graph.minor(), which solves an integer program.
+MINOR_ALGORITHM = 'bitset'
+_connected_subsets_cache = {}
+
+
+def get_adjacency_bitsets(G):
+    """
+    Returns the list of vertices of G and the list whose i-th entry has bit j set when the i-th and j-th
+    vertices are adjacent.
+    
+    :param G: A graph object.
+    """
+    vertices = list(G)
+    index = {v: idx for idx, v in enumerate(vertices)}
+    adjacency = [0]*len(vertices)
+    for u, v in G.edges(labels=False):
+        if u != v:
+            adjacency[index[u]] |= 1 << index[v]
+            adjacency[index[v]] |= 1 << index[u]
+    return vertices, adjacency
+
+
+def _connected_subsets(adjacency):
+    """
+    Returns the list of (subset, neighbours) of every connected set of vertices of the graph with the given
+    adjacency bitsets, smallest first, where neighbours is the set of vertices outside subset adjacent to it.
+    """
+    key = tuple(adjacency)
+    if key not in _connected_subsets_cache:
+        if len(_connected_subsets_cache) >= 1024:
+            _connected_subsets_cache.clear()
+        subsets = []
+        for subset in range(1, 1 << len(adjacency)):
+            reached = subset & -subset
+            frontier = reached
+            while frontier:
+                low = frontier & -frontier
+                frontier ^= low
+                new = adjacency[low.bit_length() - 1] & subset & ~reached
+                reached |= new
+                frontier |= new
+            if reached == subset:
+                neighbours = 0
+                rest = subset
+                while rest:
+                    low = rest & -rest
+                    rest ^= low
+                    neighbours |= adjacency[low.bit_length() - 1]
+                subsets.append((subset, neighbours & ~subset))
+        subsets.sort(key=lambda pair: (bin(pair[0]).count('1'), pair[0]))
+        _connected_subsets_cache[key] = subsets
+    return _connected_subsets_cache[key]
+
+
+def find_minor_model(G_adjacency, H_adjacency, H_orbits=None):
+    """
+    Returns a list of disjoint connected sets of vertices of G (as bitsets), one for each vertex of H, such
+    that there is an edge of G between the sets of any two adjacent vertices of H, which shows that H is a
+    minor of G. Returns None if H is not a minor of G.
+    
+    The vertices of H are given branch sets one at a time in breadth first order, so that each branch set can
+    be chosen among the connected sets bordering the branch sets of its neighbours. Vertices of H with the
+    same neighbours (twins) are interchangeable, so their branch sets are only tried with their smallest
+    vertices in increasing order, and likewise for the first vertex and the rest of its orbit under the
+    automorphisms of H.
+    
+    :param G_adjacency: The adjacency bitsets of G, see get_adjacency_bitsets(). Only practical for graphs on
+            at most about 12 vertices, since every connected set of vertices of G is listed.
+    
+    :param H_adjacency: The adjacency bitsets of H.
+    
+    :param H_orbits: Optional argument. A list of lists of the (indices of the) vertices in each orbit of the
+            automorphism group of H.
+    """
+    n_G = len(G_adjacency)
+    n_H = len(H_adjacency)
+    if n_H == 0:
+        return []
+    degrees = [bin(adjacency).count('1') for adjacency in H_adjacency]
+    if n_H > n_G or sum(degrees) > sum(bin(adjacency).count('1') for adjacency in G_adjacency):
+        return None
+    
+    # Breadth first order of H, starting each component at a vertex of largest degree
+    order = []
+    placed = 0
+    while len(order) < n_H:
+        start = max((h for h in range(n_H) if not placed >> h & 1), key=lambda h: degrees[h])
+        queue = [start]
+        placed |= 1 << start
+        while queue:
+            h = queue.pop(0)
+            order.append(h)
+            for u in sorted((u for u in range(n_H) if H_adjacency[h] >> u & 1 and not placed >> u & 1),
+                            key=lambda u: -degrees[u]):
+                placed |= 1 << u
+                queue.append(u)
+    position = {h: idx for idx, h in enumerate(order)}
+    
+    # The earlier positions adjacent to each position, and the positions whose neighbours are not all placed
+    earlier = [[position[u] for u in range(n_H) if H_adjacency[h] >> u & 1 and position[u] < idx]
+               for idx, h in enumerate(order)]
+    last_neighbour = [max([position[u] for u in range(n_H) if H_adjacency[h] >> u & 1], default=-1) for h in order]
+    
+    # The previous position of a twin, whose branch set must have a smaller lowest vertex
+    twin_before = [-1]*n_H
+    for idx, h in enumerate(order):
+        for prev in range(idx - 1, -1, -1):
+            u = order[prev]
+            if (H_adjacency[u] & ~(1 << h)) == (H_adjacency[h] & ~(1 << u)):
+                twin_before[idx] = prev
+                break
+    first_orbit = set()
+    if H_orbits is not None:
+        for orbit in H_orbits:
+            if order[0] in orbit:
+                first_orbit = {position[u] for u in orbit if u != order[0]}
+    
+    subsets = _connected_subsets(tuple(G_adjacency))
+    full = (1 << n_G) - 1
+    branch = [0]*n_H
+    borders = [0]*n_H
+    
+    def search(idx, used):
+        if idx == n_H:
+            return True
+        free_count = bin(full & ~used).count('1')
+        for subset, neighbours in subsets:
+            if subset & used:
+                continue
+            size = bin(subset).count('1')
+            if free_count - size < n_H - idx - 1:
+                break
+            if bin(neighbours).count('1') < degrees[order[idx]]:
+                continue
+            if any(not neighbours & branch[prev] for prev in earlier[idx]):
+                continue
+            low = subset & -subset
+            if twin_before[idx] >= 0 and low < branch[twin_before[idx]] & -branch[twin_before[idx]]:
+                continue
+            if idx in first_orbit and low < branch[0] & -branch[0]:
+                continue
+            new_used = used | subset
+            branch[idx] = subset
+            borders[idx] = neighbours
+            # Every placed branch set with neighbours still to be placed must border a free vertex
+            if all(borders[prev] & ~new_used for prev in range(idx + 1) if last_neighbour[prev] > idx):
+                if search(idx + 1, new_used):
+                    return True
+        branch[idx] = 0
+        return False
+    
+    if not search(0, 0):
+        return None
+    return [branch[position[h]] for h in range(n_H)]
+
+
+def is_minor_model(G_adjacency, H_adjacency, model):
+    """
+    Returns True if model (a list of bitsets of vertices of G, one for each vertex of H, see find_minor_model())
+    is a set of disjoint connected branch sets with an edge of G between the branch sets of adjacent vertices
+    of H, i.e. a certificate that H is a minor of G.
+    
+    :param G_adjacency: The adjacency bitsets of G, see get_adjacency_bitsets().
+    
+    :param H_adjacency: The adjacency bitsets of H.
+    
+    :param model: A list of bitsets.
+    """
+    if len(model) != len(H_adjacency):
+        return False
+    
+    used = 0
+    borders = []
+    for subset in model:
+        if not subset or subset & used or subset >> len(G_adjacency):
+            return False
+        used |= subset
+        reached = subset & -subset
+        frontier = reached
+        neighbours = 0
+        while frontier:
+            low = frontier & -frontier
+            frontier ^= low
+            neighbours |= G_adjacency[low.bit_length() - 1]
+            new = G_adjacency[low.bit_length() - 1] & subset & ~reached
+            reached |= new
+            frontier |= new
+        if reached != subset:
+            return False
+        borders.append(neighbours)
+    
+    return all(borders[h] & model[u] for h in range(len(H_adjacency)) for u in range(len(H_adjacency))
+               if H_adjacency[h] >> u & 1)
+
+
+def get_minor_model(G, H):
+    """
+    Returns a dictionary whose keys are the vertices of H and whose values are lists of vertices of G (the
+    branch sets) showing that H is a minor of G, in the same form as Sage's Graph.minor(), or None if H is not
+    a minor of G. See find_minor_model().
+    
+    :param G: A graph object.
+    
+    :param H: A graph object.
+    """
+    G_vertices, G_adjacency = get_adjacency_bitsets(G)
+    H_vertices, H_adjacency = get_adjacency_bitsets(H)
+    H_orbits = None
+    if H.num_verts() > 1:
+        H_index = {v: idx for idx, v in enumerate(H_vertices)}
+        H_orbits = [[H_index[v] for v in orbit] for orbit in H.automorphism_group(orbits=True, return_group=False)]
+    
+    model = find_minor_model(G_adjacency, H_adjacency, H_orbits)
+    if model is None:
+        return None
+    return {H_vertices[h]: [G_vertices[v] for v in range(len(G_vertices)) if subset >> v & 1]
+            for h, subset in enumerate(model)}
+
+
+class MinorCache:
+    """
+    Cache of the answers of has_minor() indexed by the canonical graph6_strings of G and H, with the branch sets
+    (in the canonical labellings) of each minor found. The most recently used max_entries answers are kept in
+    memory, and every answer is kept in an SQLite database if filename is given, so that it can be shared
+    across sessions and by worker processes. Branch sets read from the database are checked with
+    is_minor_model() before they are trusted.
+    
+    :param filename: Optional argument. The SQLite database file. By default, answers are only kept in memory.
+    
+    :param max_entries: The number of answers kept in memory.
+    """
+    
+    def __init__(self, filename=None, max_entries=100000):
+        from collections import OrderedDict
+        
+        self.filename = filename
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._db = None
+        self._pid = None
+    
+    def _connection(self):
+        import os
+        import sqlite3
+        
+        if self.filename is None:
+            return None
+        # A connection cannot be shared with a forked worker process, so each process opens its own
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.filename, timeout=60)
+            self._pid = os.getpid()
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS minors (g_key TEXT NOT NULL, h_key TEXT NOT NULL, '
+                             'found INTEGER NOT NULL, model TEXT, PRIMARY KEY (g_key, h_key)) WITHOUT ROWID')
+        return self._db
+    
+    def _remember(self, key, answer):
+        self._memo[key] = answer
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+    
+    def get(self, g_key, h_key):
+        """
+        Returns (found, model) for the canonical graph6_strings g_key and h_key, where model is the list of
+        branch sets as bitsets if found is True, or None if the answer is not in the cache.
+        """
+        key = (g_key, h_key)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+        
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute('SELECT found, model FROM minors WHERE g_key = ? AND h_key = ?', key).fetchone()
+        if row is None:
+            return None
+        found = bool(row[0])
+        model = None if row[1] is None else [int(subset, 16) for subset in row[1].split(',') if subset]
+        if found and not is_minor_model(get_adjacency_bitsets(Graph(g_key))[1],
+                                        get_adjacency_bitsets(Graph(h_key))[1], model):
+            return None
+        
+        self._remember(key, (found, model))
+        return found, model
+    
+    def put(self, g_key, h_key, found, model):
+        """
+        Records whether the graph with canonical graph6_string h_key is a minor of the graph with canonical
+        graph6_string g_key, and the branch sets (as bitsets) if it is.
+        """
+        self._remember((g_key, h_key), (found, model))
+        db = self._connection()
+        if db is not None:
+            db.execute('INSERT OR REPLACE INTO minors VALUES (?, ?, ?, ?)',
+                       (g_key, h_key, int(found), None if model is None else ','.join(f'{subset:x}' for subset in model)))
+            db.commit()
+    
+    def __len__(self):
+        db = self._connection()
+        if db is None:
+            return len(self._memo)
+        return db.execute('SELECT COUNT(*) FROM minors').fetchone()[0]
+    
+    def close(self):
+        if self._db is not None and self._pid is not None:
+            import os
+            if self._pid == os.getpid():
+                self._db.close()
+        self._db = None
+
+
+# The MinorCache used by has_minor() when none is given, see set_minor_cache(). None to not cache answers.
+MINOR_CACHE = None
+
+
+def set_minor_cache(filename=None, max_entries=100000):
+    """
+    Sets (and returns) the MinorCache used by has_minor() when none is given.
+    
+    :param filename: Optional argument. The SQLite database file in which to keep the answers. By default,
+            answers are only kept in memory.
+    
+    :param max_entries: The number of answers kept in memory.
+    """
+    global MINOR_CACHE
+    
+    if MINOR_CACHE is not None:
+        MINOR_CACHE.close()
+    MINOR_CACHE = MinorCache(filename, max_entries)
+    return MINOR_CACHE
+
+
+def has_minor(G, H, algorithm=None, certificate=False, cache=None):
     """
     Determines if graph H is a minor of graph G
     
     :param G: A graph object, graph6_string, or adjacency matrix for a graph.
     
     :param H: A graph object, graph6_string, or adjacency matrix for a graph.
-    """
-    g,_ = get_canonical_graph(G)
-    h,_ = get_canonical_graph(H)
+    
+    :param algorithm: Optional argument. Either 'bitset' to use get_minor_model(), or 'milp' to use Sage's
+            Graph.minor(). By default, MINOR_ALGORITHM.
+    
+    :param certificate: If True, returns (True, model) or (False, None) where model is a dictionary of the
+            branch sets in G of the vertices of H.
             
+    :param cache: Optional argument. The MinorCache in which to look up and record the answer. By default,
+            MINOR_CACHE. False to not use a cache.
+    """
+    if algorithm is None:
+        algorithm = MINOR_ALGORITHM
+    if cache is None:
+        cache = MINOR_CACHE
+    g = get_graph(G)
+    h = get_graph(H)
+    
+    if cache is not None and cache is not False:
+        # Answer for the canonical labellings, which are what the cache is indexed by
+        g_key = canonical_graph6(g)
+        h_key = canonical_graph6(h)
+        answer = cache.get(g_key, h_key)
+        if answer is None:
+            found, canonical_model = has_minor(Graph(g_key), Graph(h_key), algorithm, certificate=True, cache=False)
+            h_vertices = list(Graph(h_key))
+            answer = (found, None if canonical_model is None else
+                      [sum(1 << v for v in canonical_model[u]) for u in h_vertices])
+            cache.put(g_key, h_key, *answer)
+        found, bitsets = answer
+        if not certificate:
+            return found
+        if not found:
+            return False, None
+        # Translate the branch sets back to the vertices of G and H
+        g_relabel = g.canonical_label(algorithm='sage', certificate=True)[1]
+        h_relabel = h.canonical_label(algorithm='sage', certificate=True)[1]
+        g_vertex = {c: v for v, c in g_relabel.items()}
+        return True, {v: [g_vertex[c] for c in range(g.num_verts()) if bitsets[c_h] >> c & 1]
+                      for v, c_h in h_relabel.items()}
+    
+    if algorithm == 'milp':
+        try:
+            model = g.minor(h)
+        except ValueError:
+            model = None
+    elif algorithm == 'bitset':
+        model = get_minor_model(g, h)
+    else:
+        raise ValueError(f"algorithm must be 'bitset' or 'milp', not {algorithm!r}")
+    
+    if certificate:
+        return model is not None, model
+    return model is not None
+
+
+def benchmark_has_minor(pairs=None, algorithms=('bitset', 'milp'), repeat=1):
+    """
+    Prints and returns a dictionary of the total time in seconds that has_minor() takes to test every pair
+    (G, H) with each algorithm, and checks that the algorithms agree.
+    
+    :param pairs: Optional argument. A list of pairs (G, H) of graphs, graph6_strings or adjacency matrices.
+            By default, 20 random graphs on 9 vertices, each against K_4, K_5, K_{3,3} and the wheel on 6
+            vertices.
+    
+    :param algorithms: The algorithms to time, see has_minor().
+    
+    :param repeat: The number of times to test every pair with each algorithm. The best time is reported.
+    """
+    import time
+    
+    if pairs is None:
+        patterns = [graphs.CompleteGraph(4), graphs.CompleteGraph(5), graphs.CompleteBipartiteGraph(3, 3),
+                    graphs.WheelGraph(6)]
+        pairs = [(graphs.RandomGNP(9, 0.2 + 0.6*idx/19), H) for idx in range(20) for H in patterns]
+    pairs = [(get_graph(G), get_graph(H)) for G, H in pairs]
+    
+    times = {}
+    answers = {}
+    for algorithm in algorithms:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            answers[algorithm] = [has_minor(G, H, algorithm) for G, H in pairs]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times[algorithm] = best
+        print(f'{algorithm:>8}: {best:8.3f} s for {len(pairs)} pairs ({sum(answers[algorithm])} minors)')
+    
+    if len(set(tuple(answer) for answer in answers.values())) > 1:
+        print('Warning: the algorithms disagree')
+    
+    return times
+
+
+
+# Invariants that cannot increase when an edge is deleted or contracted (or an isolated vertex deleted), so a
+# graph H can only be a minor of G if every invariant of H is at most that of G. Planarity and outerplanarity
+# are recorded as 0 for (outer)planar graphs and 1 otherwise, so that they compare the same way.
+MINOR_INVARIANTS = ('num_verts', 'num_edges', 'cycle_rank', 'nonplanar', 'non_outerplanar', 'treewidth')
+_obstruction_indexes = {}
+
+
+def get_minor_invariants(G, treewidth=True):
+    """
+    Returns the tuple of the minor-monotone invariants of G listed in MINOR_INVARIANTS.
+    
+    :param G: A graph object.
+    
+    :param treewidth: If False, the treewidth (the most expensive invariant) is recorded as 0.
+    """
+    return (G.num_verts(),
+            G.num_edges(),
+            G.num_edges() - G.num_verts() + G.connected_components_number(),
+            0 if G.is_planar() else 1,
+            0 if G.is_circular_planar() else 1,
+            G.treewidth() if treewidth and G.num_verts() > 0 else 0)
+
+
+def get_obstruction_index(minimals_dict, spec_num, filename=None):
+    """
+    Returns the list of (minor invariants, graph6_string) of the graphs that are minor minimal with respect to
+    the spectator floor number spec_num, sorted by invariants. The index is built once per session for each
+    set of minimal graphs.
+    
+    :param minimals_dict: A dictionary of minor minimal graphs, see find_minimal_representation().
+    
+    :param spec_num: The spectator minor floor number.
+    
+    :param filename: Optional argument. A file in which the index for every spectator floor number is saved
+            the first time it is built and read from afterwards.
+    """
+    import os
+    
+    minimals = frozenset(minimals_dict[f'{spec_num}_spectators'])
+    if (spec_num, minimals) in _obstruction_indexes:
+        return _obstruction_indexes[(spec_num, minimals)]
+    
+    saved_index = {}
+    if filename is not None and os.path.exists(filename):
+        with open(filename, 'r') as infile:
+            saved_index = eval(infile.read())
+    
+    index = saved_index.get(f'{spec_num}_spectators')
+    if index is None or set(g6_str for invariants, g6_str in index) != minimals:
+        index = sorted((get_minor_invariants(Graph(g6_str)), g6_str) for g6_str in minimals)
+        if filename is not None:
+            saved_index[f'{spec_num}_spectators'] = index
+            with open(filename, 'w') as outfile:
+                outfile.write(str(saved_index))
+    
+    _obstruction_indexes[(spec_num, minimals)] = index
+    return index
+
+
+def get_minor_candidates(G, index):
+    """
+    Returns the list of graph6_strings in the obstruction index (see get_obstruction_index()) of the graphs that
+    could be proper minors of G, i.e. the graphs whose minor invariants are all at most those of G and that
+    have fewer vertices or fewer edges than G. The treewidth of G is only computed if there are candidates
+    left after comparing the other invariants.
+    
+    :param G: A graph object.
+    
+    :param index: An obstruction index.
+    """
+    G_invariants = get_minor_invariants(G, treewidth=False)
+    candidates = [(invariants, g6_str) for invariants, g6_str in index
+                  if all(h <= g for h, g in zip(invariants[:-1], G_invariants[:-1]))
+                  and invariants[:2] != G_invariants[:2]]
+    if candidates:
+        G_treewidth = get_minor_invariants(G)[-1]
+        candidates = [(invariants, g6_str) for invariants, g6_str in candidates if invariants[-1] <= G_treewidth]
+    
+    return [g6_str for invariants, g6_str in candidates]
+
+
+
+def _minor_test(args):
+    """
+    Returns (H_str, True) if the graph with graph6_string H_str is a minor of the graph with graph6_string
+    g6_str, (H_str, False) if it is not, and (H_str, None) if the test took longer than timeout seconds.
+    """
+    g6_str, H_str, timeout = args
+    G = Graph(g6_str)
+    H = Graph(H_str)
+    
+    if timeout is None:
+        return H_str, has_minor(G, H)
+    
+    from cysignals.alarm import alarm, cancel_alarm, AlarmInterrupt
+    
     try:
-        m = g.minor(h)
-        return True
-    except:
-        return False
+        alarm(timeout)
+        try:
+            found = has_minor(G, H)
+        finally:
+            cancel_alarm()
+    except AlarmInterrupt:
+        return H_str, None
+    return H_str, found
+
+
+def find_minor(G, candidates, processes=None, timeout=None):
+    """
+    Returns the graph6_string of the first graph in candidates found to be a minor of G, or None if none of
+    them are minors of G. 
+    
+    Candidates are tested in the order given, so smaller graphs (which are both more likely to be minors and
+    quicker to test) should come first, as they do in get_minor_candidates(). With more than one process, the
+    candidates are tested by a pool of worker processes, and every worker is stopped as soon as one of them
+    finds a minor, so the graph returned is not always the first minor in candidates.
+    
+    :param G: A graph object.
     
+    :param candidates: A list of graph6_strings.
     
+    :param processes: Optional argument. The number of worker processes. By default, the candidates are
+            tested one at a time in this process.
+    
+    :param timeout: Optional argument. The number of seconds after which a single test is put aside. Tests that
+            were put aside are run again without a time limit once every other candidate has been tested, so
+            the answer does not depend on the timeout.
+    """
+    g6_str = G.graph6_string()
+    tasks = [(g6_str, H_str, timeout) for H_str in candidates]
+    timed_out = []
+    
+    if processes is None or processes <= 1:
+        for task in tasks:
+            H_str, found = _minor_test(task)
+            if found:
+                return H_str
+            if found is None:
+                timed_out.append(H_str)
+    else:
+        from multiprocessing import Pool
+        
+        pool = Pool(processes)
+        try:
+            for H_str, found in pool.imap_unordered(_minor_test, tasks):
+                if found:
+                    return H_str
+                if found is None:
+                    timed_out.append(H_str)
+        finally:
+            # Stop the workers that are still testing other candidates
+            pool.terminate()
+            pool.join()
+    
+    for H_str in timed_out:
+        if _minor_test((g6_str, H_str, None))[1]:
+            return H_str
+    return None
 
-def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None):
+
+
+def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None, index_filename=None, processes=None,
+                                  timeout=None):
     """
     Determines if the graph, G, passed in as an argument is minor minimal, if G is minor minimal, then its
     graph6_string is returned. If G is not minor minimal, then the function returns the graph6_string of
     a minor of G which has the same spectator minor floor number as G and is minor minimal with respect to
     that spectator minor floor number.
     
-    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most 10 vertices
+    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most MAX_VERTS vertices
     
     :param uspcm_dict: Optional argument. A dictionary of spectator floor numbers, either the complete 
             dictionary or partial dictionary with the spectator floor numbers for graphs on the same number 
@@ -227,11 +1459,21 @@ def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None):
             spectator minor floor number and the associated value is the set of graphs which are minor 
             minimal with respect to that spectator minor floor number. If not provided, then the
             read_minor_minimals() function will be used to fetch the dictionary from the github repo.
+            
+    :param index_filename: Optional argument. The file in which the obstruction index is saved, see
+            get_obstruction_index(). Only the minimal graphs whose minor-monotone invariants allow them to be
+            minors of G are tested with has_minor().
+            
+    :param processes: Optional argument. The number of worker processes that test the minimal graphs, see
+            find_minor().
+    
+    :param timeout: Optional argument. The number of seconds after which a single minor test is put aside
+            until the other minimal graphs have been tested, see find_minor().
     """
     G, g6_str = get_canonical_graph(graph)
         
-    if G.num_verts() > 10 or G.is_connected() == False:
-        return "This function only works for connected graphs on at most 10 vertices"
+    if G.num_verts() > MAX_VERTS or G.is_connected() == False:
+        return f'This function only works for connected graphs on at most {MAX_VERTS} vertices'
 
     num_verts = G.num_verts()
     num_edges = G.num_edges()
@@ -248,10 +1490,11 @@ def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None):
         else:
             G.show(title = f'G: {g6_str}, spec_floor = {G_spec_floor}')
         return g6_str
-    for H_str in minimals_dict[f'{G_spec_floor}_spectators']:
-        if has_minor(G, H_str):
-            print(f'{H_str} is a minor of {graph}, both have spectator floor of {G_spec_floor}, so {graph} is NOT minor-minimal')
-            ga = graphics_array((G.plot(title = f'G: {g6_str}, spec_floor = {G_spec_floor}'),
-                                Graph(H_str).plot(title = f'H: {H_str}, spec_floor = {G_spec_floor}')))
-            ga.show()
-            return H_str
\ No newline at end of file
+    index = get_obstruction_index(minimals_dict, G_spec_floor, index_filename)
+    H_str = find_minor(G, get_minor_candidates(G, index), processes, timeout)
+    if H_str is not None:
+        print(f'{H_str} is a minor of {graph}, both have spectator floor of {G_spec_floor}, so {graph} is NOT minor-minimal')
+        ga = graphics_array((G.plot(title = f'G: {g6_str}, spec_floor = {G_spec_floor}'),
+                            Graph(H_str).plot(title = f'H: {H_str}, spec_floor = {G_spec_floor}')))
+        ga.show()
+        return H_str
\ No newline at end of file
@@ -17,6 +17,14 @@ def spec_floor():
     # Used for progress bar
     num_graphs_worked = 0
     
+    # Graphs added to seen_dict whose updates to the uspcm_dict have not been written to file yet.
+    # They are appended to the seen_dict journal right after the uspcm_dict is saved.
+    unsaved_seen = []
+    
+    # Number of new minors whose spectator number was computed, or skipped by get_spectator_lower_bound()
+    num_evaluated = 0
+    num_skipped = 0
+    
     # Iterate over all graphs on nn vertices and edcount edges
     # amat is a graph6_string
     for amat in progressBar(uspcm_dict[f'{nn}_verts'][f'{edcount}_edges'], 
@@ -28,13 +36,12 @@ def spec_floor():
             num_graphs_worked += 1
             continue
         
-        # Skip the disconnected graphs since we can sum over connected components and save progress
+        # Skip the disconnected graphs since we can sum over connected components and save progress.
+        # Skipping a graph does not change the uspcm_dict, so it only needs to be appended to the journal. The
+        # journal is not compacted here, since the seen_dict also has the graphs in unsaved_seen.
         if Graph(amat).is_connected() == False:
             seen_dict[f'{nn}_verts'][f'{edcount}_edges'].add(amat)
-            write_partial_uspcm_dict(nn, edcount, uspcm_dict, path_prefix)
-            if edcount > 1:
-                write_partial_uspcm_dict(nn, edcount-1, uspcm_dict, path_prefix)
-            write_partial_seen_dict(nn, edcount, seen_dict, path_prefix)
+            append_partial_seen_dict(nn, edcount, [amat], seen_dict, path_prefix, compact=False)
             num_graphs_worked += 1
             continue
             
@@ -50,9 +57,14 @@ def spec_floor():
             if xx in uspcm_dict[f'{nn}_verts'][f'{edcount-1}_edges']:
                 old = uspcm_dict[f'{nn}_verts'][f'{edcount-1}_edges'][xx]
                 uspcm_dict[f'{nn}_verts'][f'{edcount-1}_edges'][xx] = min(mine, old)
+            elif get_spectator_lower_bound(_graph6_to_adjacency(xx)) >= mine:
+                # The spectator number of xx cannot be below mine, so min(mine, old) is mine
+                uspcm_dict[f'{nn}_verts'][f'{edcount-1}_edges'][xx] = mine
+                num_skipped += 1
             else:
-                old = usp_comp(Graph(xx))
+                old = spectator_number(xx)
                 uspcm_dict[f'{nn}_verts'][f'{edcount-1}_edges'][xx] = min(mine, old)
+                num_evaluated += 1
         for xx in contractions(G):
             # Note: This is actually updating the number for the minor xx
             xx_num_verts = Graph(xx).num_verts()
@@ -66,13 +78,616 @@ def spec_floor():
 
         # Save the progress
         seen_dict[f'{nn}_verts'][f'{edcount}_edges'].add(amat)
+        unsaved_seen.append(amat)
         num_graphs_worked += 1
         # Save to file every one percent of the way through
         if num_graphs_worked % save_percent == 0:
             write_partial_uspcm_dict(nn, edcount, uspcm_dict, path_prefix)
             if edcount > 1:
                 write_partial_uspcm_dict(nn, edcount-1, uspcm_dict, path_prefix)
-            write_partial_seen_dict(nn, edcount, seen_dict, path_prefix)
+            append_partial_seen_dict(nn, edcount, unsaved_seen, seen_dict, path_prefix)
+            unsaved_seen = []
+    
+    if num_evaluated + num_skipped:
+        print(f'{nn}_verts {edcount-1}_edges: skipped {num_skipped} of {num_evaluated + num_skipped} '
+              f'spectator number evaluations.')
+
+
+
+def _bound_floor(pending, nn, edcount, g6_str, floor):
+    """
+    Records in pending that the graph with graph6_string g6_str on nn vertices and edcount edges is a minor
+    of a graph whose spectator minor floor is floor (or None to only record the graph).
+    """
+    partition = pending.setdefault((nn, edcount), dict())
+    old = partition.get(g6_str)
+    if old is None:
+        partition[g6_str] = floor
+    elif floor is not None:
+        partition[g6_str] = min(old, floor)
+
+
+def _bound_lattice_floors(pending, lattice, partial_uspcm_dict):
+    """
+    Records in pending the spectator minor floors of the connected graphs of partial_uspcm_dict as bounds of
+    their single edge deletions and contractions, read from the MinorLattice.
+    """
+    g6_strings = list(partial_uspcm_dict)
+    graph_ids = lattice.graph_ids(g6_strings)
+    if (graph_ids < 0).any():
+        raise ValueError('The minor lattice does not have every graph, see build_minor_lattice()')
+    for g6_str, graph_id in zip(g6_strings, graph_ids):
+        if not _is_connected_adjacency(_graph6_to_adjacency(g6_str)):
+            continue
+        for minor_id in lattice.edge_minors(graph_id):
+            key = int(lattice.keys[minor_id])
+            H_num_edges = bin(key & ((1 << GRAPH_KEY_VERTEX_SHIFT) - 1)).count('1')
+            _bound_floor(pending, key >> GRAPH_KEY_VERTEX_SHIFT, H_num_edges, key_to_graph6(key),
+                         partial_uspcm_dict[g6_str])
+
+
+def spec_floor_layers(max_verts=None, batch_size=16384, stats=None, lattice=None):
+    """
+    Generator function to compute the spectator minor floor of every graph up to max_verts vertices in one
+    sweep, without reading or writing any files. Yields (nn, edcount, partial_uspcm_dict) for every partition
+    of the uspcm_dict, from the most vertices and edges down, as in spec_floor().
+    
+    Each partition is made of the single edge deletions, single edge contractions and isolated vertex
+    deletions (see deletions() and contractions()) of the connected graphs of the partitions already
+    yielded, starting from the complete graph on max_verts vertices. The spectator minor floor of a graph is
+    the least of its spectator number (see get_spectator_numbers()) and the spectator minor floors of the
+    connected graphs it was found from. Disconnected graphs are skipped as in spec_floor(). Only the
+    partitions of the layer below the current one are held in memory.
+    
+    The spectator minor floors of the graphs a graph was found from are an upper bound of its own, and
+    get_spectator_lower_bounds() gives a lower bound of its spectator number. When the two meet, the spectator
+    minor floor is the upper bound and the spectator number is not computed.
+    
+    :param max_verts: Optional argument. The largest number of vertices of the graphs. By default, MAX_VERTS.
+    
+    :param batch_size: See get_spectator_numbers().
+    
+    :param stats: Optional argument. A dictionary in which to record (number of graphs, number of spectator
+            number evaluations skipped) for each (nn, edcount).
+    
+    :param lattice: Optional argument. A MinorLattice of the graphs up to max_verts vertices (see
+            build_minor_lattice()), from which the deletions and contractions are read instead of being found
+            and canonically labelled.
+    """
+    if max_verts is None:
+        max_verts = MAX_VERTS
+    
+    # The least spectator minor floor (or None) of the graphs found so far that have each graph as a minor
+    pending = {(max_verts, max_verts*(max_verts - 1) // 2): {Glabel(graphs.CompleteGraph(max_verts)): None}}
+    
+    for nn in range(max_verts, -1, -1):
+        # As in the stored partitions, the graphs with no edges on two or more vertices are left out
+        min_edges = 1 if nn > 1 else 0
+        for edcount in range(nn*(nn - 1) // 2, min_edges - 1, -1):
+            bounds = pending.pop((nn, edcount), dict())
+            g6_strings = list(bounds)
+            floors = [bounds[g6_str] for g6_str in g6_strings]
+            evaluate = []
+            if g6_strings:
+                keys = graph6_to_keys(g6_strings)
+                lower_bounds = get_spectator_lower_bounds(keys, nn, batch_size)
+                evaluate = [idx for idx, floor in enumerate(floors) if floor is None or lower_bounds[idx] < floor]
+                for idx, spec_num in zip(evaluate, get_spectator_numbers(keys[evaluate], nn, batch_size)):
+                    floors[idx] = int(spec_num) if floors[idx] is None else min(int(spec_num), floors[idx])
+            if stats is not None:
+                stats[(nn, edcount)] = (len(g6_strings), len(g6_strings) - len(evaluate))
+            
+            partial_uspcm_dict = dict(zip(g6_strings, floors))
+            
+            if lattice is not None:
+                _bound_lattice_floors(pending, lattice, partial_uspcm_dict)
+                yield nn, edcount, partial_uspcm_dict
+                continue
+            
+            for g6_str, mine in partial_uspcm_dict.items():
+                G = Graph(g6_str)
+                if not G.is_connected():
+                    continue
+                if edcount > min_edges:
+                    for xx in deletions(G):
+                        _bound_floor(pending, nn, edcount - 1, xx, mine)
+                for xx in contractions(G):
+                    H = Graph(xx)
+                    _bound_floor(pending, H.num_verts(), H.num_edges(), xx, mine)
+            
+            yield nn, edcount, partial_uspcm_dict
+
+
+def build_uspcm_dict(max_verts=None, path_prefix=None, file_format='txt', batch_size=16384, stats=None, lattice=None):
+    """
+    Returns the uspcm_dict of the graphs up to max_verts vertices computed by spec_floor_layers(). If
+    path_prefix is given, each partition is instead written to file as soon as it is computed and then
+    dropped, so only the partitions that spec_floor_layers() holds are in memory, and None is returned. The
+    partitions can be read back with init_uspcm_dict().
+    
+    :param max_verts: Optional argument. The largest number of vertices of the graphs. By default, MAX_VERTS.
+    
+    :param path_prefix: Optional argument. The directory in which to save the partitioned files, which are
+            marked complete in the manifest.
+    
+    :param file_format: See write_partial_uspcm_dict().
+    
+    :param batch_size: See get_spectator_numbers().
+    
+    :param stats: Optional argument, see spec_floor_layers().
+    
+    :param lattice: Optional argument, see spec_floor_layers().
+    """
+    if max_verts is None:
+        max_verts = MAX_VERTS
+    uspcm_dict = {f'{nn}_verts': dict() for nn in range(max_verts + 1)}
+    
+    for nn, edcount, partial_uspcm_dict in spec_floor_layers(max_verts, batch_size, stats, lattice):
+        uspcm_dict[f'{nn}_verts'][f'{edcount}_edges'] = partial_uspcm_dict
+        if path_prefix is not None:
+            write_partial_uspcm_dict(nn, edcount, uspcm_dict, path_prefix, file_format)
+            mark_partition_complete('uspcm_dict', nn, edcount, path_prefix, len(partial_uspcm_dict))
+            del uspcm_dict[f'{nn}_verts'][f'{edcount}_edges']
+    
+    if path_prefix is not None:
+        return None
+    return uspcm_dict
+
+
+
+# What the worker processes of spec_floor_parallel() and determine_minimals_parallel() need: the graph6_strings
+# of the partition and the dictionaries of the finished partitions above it. It is set before the pool of
+# workers is forked, so the workers share it copy-on-write and each task only sends the bounds of a chunk (or
+# the new deletions whose spectator numbers are needed).
+_SWEEP_STATE = None
+
+
+def _sweep_chunks(start, stop, processes, chunk_size):
+    """
+    Returns the list of (start, stop) bounds of the chunks of the graphs from start to stop of a partition.
+    """
+    if chunk_size is None:
+        # Several chunks per worker so that the workers finish together
+        chunk_size = min(max((stop - start) // (4*processes), 1), 1000)
+    return [(idx, min(idx + chunk_size, stop)) for idx in range(start, stop, chunk_size)]
+
+
+def _sweep_map(pool, task, chunks):
+    """
+    Returns an iterator of the results of task on each chunk, in order, from the pool of workers or from this
+    process if pool is None.
+    """
+    if pool is None:
+        return map(task, chunks)
+    return pool.imap(task, chunks)
+
+
+def _load_sweep_partitions(uspcm_dict, nn, num_edges):
+    """
+    Reads into uspcm_dict (if it is a LazyPartitionDict) the partitions that the minors of the graphs on nn
+    vertices and num_edges edges are in, i.e. every partition on nn - 1 vertices and the partitions on nn
+    vertices and num_edges or num_edges - 1 edges, so that they are read once before the workers are forked
+    rather than once by every worker.
+    """
+    for vert_key, edge_keys in ((f'{nn-1}_verts', None), (f'{nn}_verts', (f'{num_edges}_edges', f'{num_edges-1}_edges'))):
+        if vert_key not in uspcm_dict:
+            continue
+        layer = uspcm_dict[vert_key]
+        for edge_key in (layer if edge_keys is None else edge_keys):
+            if edge_key in layer:
+                layer[edge_key]
+
+
+def _sweep_pool(processes):
+    """
+    Returns a pool of processes forked from this one (so that they share _SWEEP_STATE), or None for one process.
+    
+    The objects that exist when the pool is forked are moved out of reach of the garbage collector with
+    gc.freeze(), so that a collection in a worker does not write to (and so copy) every page of the
+    dictionaries it shares. The workers still copy the pages of the objects whose reference counts they
+    change, i.e. of the entries they read, but not of the rest of the dictionaries. Call gc.unfreeze() once
+    the pool is closed.
+    """
+    if processes <= 1:
+        return None
+    
+    import gc
+    import multiprocessing
+    
+    gc.freeze()
+    return multiprocessing.get_context('fork').Pool(processes)
+
+
+def _spec_floor_chunk(bounds):
+    """
+    Returns, for each graph of a chunk of the partition in _SWEEP_STATE, (amat, deletions, exceptions) where
+    deletions is the list of (graph6_string, orbits) of its single edge deletions, with the orbits recorded
+    in CANONICAL_ORBITS when they were labelled (or None), and exceptions lists the contractions whose
+    spectator minor floor is larger than the graph's, or (amat, None, []) if the graph is disconnected.
+    """
+    nn, edcount, g6_strings, uspcm_dict = _SWEEP_STATE
+    
+    results = []
+    for amat in g6_strings[bounds[0]:bounds[1]]:
+        G = Graph(amat)
+        if G.is_connected() == False:
+            results.append((amat, None, []))
+            continue
+        
+        mine = uspcm_dict[f'{nn}_verts'][f'{edcount}_edges'][amat]
+        exceptions = []
+        for xx in contractions(G):
+            H = Graph(xx)
+            old = uspcm_dict[f'{H.num_verts()}_verts'][f'{H.num_edges()}_edges'][xx]
+            if old > mine:
+                exceptions.append(f'Exception found: {amat} has uspc {mine} with minor {xx} of uspc {old}.')
+        results.append((amat, [(xx, CANONICAL_ORBITS.get(xx)) for xx in deletions(G)], exceptions))
+    
+    return results
+
+
+def _new_minor_floors(new_minors):
+    """
+    Returns the list of (xx, floor, evaluated) for a list of (xx, bound, orbits) triples of deletions that are
+    new to the uspcm_dict, where floor is the least of bound and the spectator number of xx (found with the
+    orbits of its automorphism group, if they are known), and evaluated is False if
+    get_spectator_lower_bound() showed that the spectator number did not need to be computed.
+    """
+    results = []
+    for xx, bound, orbits in new_minors:
+        if get_spectator_lower_bound(_graph6_to_adjacency(xx)) >= bound:
+            results.append((xx, bound, False))
+        else:
+            results.append((xx, min(bound, spectator_number(xx, orbits=orbits)), True))
+    return results
+
+
+def spec_floor_parallel(nn, edcount, uspcm_dict, seen_dict, path_prefix='data', processes=None, chunk_size=None):
+    """
+    Does the same as spec_floor() for the graphs on nn vertices and edcount edges, with the work split into
+    chunks that are done by a pool of worker processes. The graphs of a partition only depend on the finished
+    partitions above it, so the workers are forked with uspcm_dict as it is at the start and share it
+    copy-on-write, and only the bounds of each chunk and what was found in it are sent between processes.
+    
+    The partition is swept in blocks of as many graphs as spec_floor() works through between saves (or
+    enough to keep every worker busy). The workers find the deletions of the graphs of a block, then the
+    spectator numbers of the deletions that are new to the uspcm_dict, each computed once. The results are
+    merged into uspcm_dict and seen_dict in the order of the partition and saved after every block, so an
+    interrupted sweep is resumed in the same way as spec_floor().
+    
+    The partitions of uspcm_dict that the workers read are loaded before the workers are forked (see
+    _load_sweep_partitions()) and frozen out of the garbage collector (see _sweep_pool()), so the workers
+    share one copy of them. The pages that a worker does copy are those of the entries whose reference
+    counts it changes, so the memory used grows with the number of graphs looked up in each worker, not with
+    the size of uspcm_dict. A LazyPartitionDict with a memory_budget may drop a partition before the workers
+    are forked, which each worker then reads again.
+    
+    Returns (uspcm_dict, seen_dict).
+    
+    :param nn: The number of vertices of the graphs.
+    
+    :param edcount: The number of edges of the graphs.
+    
+    :param uspcm_dict: The nested dictionary of spectator minor floor numbers, as in spec_floor().
+    
+    :param seen_dict: The nested dictionary of graphs that have been processed, as in spec_floor().
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    
+    :param processes: Optional argument. The number of worker processes. By default, one per CPU.
+    
+    :param chunk_size: Optional argument. The number of graphs (or new deletions) in each task. By default, up
+            to 1000 so that each worker gets several tasks per block.
+    """
+    global _SWEEP_STATE
+    import gc
+    import os
+    
+    if processes is None:
+        processes = os.cpu_count() or 1
+    
+    partition = uspcm_dict[f'{nn}_verts'][f'{edcount}_edges']
+    seen = seen_dict[f'{nn}_verts'][f'{edcount}_edges']
+    lower = uspcm_dict[f'{nn}_verts'].setdefault(f'{edcount-1}_edges', dict())
+    
+    # Graphs whose spectator minor floor has already been determined are skipped
+    g6_strings = [amat for amat in partition if amat not in seen]
+    one_percent = max(len(partition) // 100, 1)
+    fraction_percent = max(len(partition) // 1000, 1)
+    save_percent = one_percent if fraction_percent < 500 else fraction_percent
+    block_size = max(save_percent, 4*processes*(chunk_size or 1000))
+    blocks = [(start, min(start + block_size, len(g6_strings))) for start in range(0, len(g6_strings), block_size)]
+    
+    num_evaluated = 0
+    num_skipped = 0
+    
+    _load_sweep_partitions(uspcm_dict, nn, edcount)
+    _SWEEP_STATE = (nn, edcount, g6_strings, uspcm_dict)
+    pool = _sweep_pool(processes)
+    try:
+        for start, stop in progressBar(blocks, prefix = f"1st pass: nn={nn}, ee={edcount}:", suffix = '', length = 40):
+            # The least spectator minor floor of the graphs of the block that have each new deletion, and the
+            # orbits of its automorphism group found by the worker that labelled it
+            new_minors = dict()
+            new_orbits = dict()
+            disconnected = []
+            connected = []
+            for results in _sweep_map(pool, _spec_floor_chunk, _sweep_chunks(start, stop, processes, chunk_size)):
+                for amat, amat_deletions, exceptions in results:
+                    if amat_deletions is None:
+                        disconnected.append(amat)
+                        continue
+                    mine = partition[amat]
+                    for xx, orbits in amat_deletions:
+                        if xx in lower:
+                            lower[xx] = min(mine, lower[xx])
+                        else:
+                            new_minors[xx] = min(mine, new_minors.get(xx, mine))
+                            new_orbits[xx] = orbits
+                    for exception in exceptions:
+                        print(exception)
+                    connected.append(amat)
+            
+            new_minors = [(xx, bound, new_orbits[xx]) for xx, bound in new_minors.items()]
+            new_chunks = [new_minors[lo:hi] for lo, hi in _sweep_chunks(0, len(new_minors), processes, chunk_size)]
+            for results in _sweep_map(pool, _new_minor_floors, new_chunks):
+                for xx, floor, evaluated in results:
+                    lower[xx] = floor
+                    num_evaluated += evaluated
+                    num_skipped += not evaluated
+            
+            # Skipping a graph does not change the uspcm_dict, so the disconnected graphs only need to be journaled
+            seen.update(disconnected)
+            seen.update(connected)
+            if connected:
+                write_partial_uspcm_dict(nn, edcount, uspcm_dict, path_prefix)
+                if edcount > 1:
+                    write_partial_uspcm_dict(nn, edcount-1, uspcm_dict, path_prefix)
+            append_partial_seen_dict(nn, edcount, disconnected + connected, seen_dict, path_prefix)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+            gc.unfreeze()
+        _SWEEP_STATE = None
+    
+    if num_evaluated + num_skipped:
+        print(f'{nn}_verts {edcount-1}_edges: skipped {num_skipped} of {num_evaluated + num_skipped} '
+              f'spectator number evaluations.')
+    
+    return uspcm_dict, seen_dict
+
+
+def _determine_minimals_chunk(bounds):
+    """
+    Returns the list of (g6_str, result of check_minimality() or None) for a chunk of the partition in
+    _SWEEP_STATE.
+    """
+    nn, num_edges, g6_strings, uspcm_dict, lattice = _SWEEP_STATE
+    
+    results = []
+    for g6_str in g6_strings[bounds[0]:bounds[1]]:
+        results.append((g6_str, check_minimality(g6_str, uspcm_dict, lattice) if Graph(g6_str).is_connected() else None))
+    return results
+
+
+def determine_minimals_parallel(nn, num_edges, minimals_dict, uspcm_dict, completed_dict, save=False, path_prefix='data',
+                                processes=None, chunk_size=None, lattice=None):
+    """
+    Does the same as determine_minimals() for the graphs on nn vertices and num_edges edges, with the graphs
+    split into chunks that are checked by a pool of worker processes forked with uspcm_dict, as in
+    spec_floor_parallel(). Every graph only depends on the finished spectator minor floors of the smaller
+    partitions, so the chunks are checked in a single sweep. The results are merged into minimals_dict and
+    completed_dict in the order of the partition, and graphs already in completed_dict are not checked again.
+    The partitions of uspcm_dict that the workers read are loaded and shared as in spec_floor_parallel().
+    
+    :param processes: Optional argument, see spec_floor_parallel().
+    
+    :param chunk_size: Optional argument, see spec_floor_parallel().
+    
+    :param lattice: Optional argument. A MinorLattice, see check_minimality().
+    
+    The other arguments are those of determine_minimals().
+    """
+    global _SWEEP_STATE
+    import gc
+    import os
+    
+    if processes is None:
+        processes = os.cpu_count() or 1
+    
+    partition = uspcm_dict[f'{nn}_verts'][f'{num_edges}_edges']
+    completed = completed_dict[f'{nn}_verts'][f'{num_edges}_edges']
+    g6_strings = [g6_str for g6_str in partition if g6_str not in completed]
+    one_percent = max(len(partition) // 100, 1)
+    fraction_percent = max(len(partition) // 1000, 1)
+    save_percent = one_percent if fraction_percent < 500 else fraction_percent
+    
+    num_graphs_worked = len(partition) - len(g6_strings)
+    unsaved_completed = []
+    
+    chunks = _sweep_chunks(0, len(g6_strings), processes, chunk_size)
+    
+    _load_sweep_partitions(uspcm_dict, nn, num_edges)
+    _SWEEP_STATE = (nn, num_edges, g6_strings, uspcm_dict, lattice)
+    pool = _sweep_pool(processes)
+    try:
+        results = _sweep_map(pool, _determine_minimals_chunk, chunks)
+        for chunk in progressBar(chunks, prefix = f"2nd pass: nn={nn}, ee={num_edges}:", suffix = '', length = 40):
+            for g6_str, result in next(results):
+                if result is not None:
+                    minimals_dict.setdefault(f'{result[1]}_spectators', set()).add(g6_str)
+                completed.add(g6_str)
+                unsaved_completed.append(g6_str)
+                num_graphs_worked += 1
+                
+                if save == True and num_graphs_worked % save_percent == 0:
+                    write_minimals_dict(nn, num_edges, minimals_dict, path_prefix)
+                    append_partial_completed_dict(nn, num_edges, unsaved_completed, completed_dict, path_prefix)
+                    unsaved_completed = []
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+            gc.unfreeze()
+        _SWEEP_STATE = None
+    
+    if save == True:
+        write_minimals_dict(nn, num_edges, minimals_dict, path_prefix)
+        mark_partition_complete('minimals_dict', nn, num_edges, path_prefix,
+                                sum(len(minimals) for minimals in minimals_dict.values()))
+        # Compacts the completed_dict journal into the partition file
+        write_partial_completed_dict(nn, num_edges, completed_dict, path_prefix)
+    
+    return minimals_dict, completed_dict
+
+
+def spec_floor_unit(nn, edcount, shard, path_prefix='data', lattice=None):
+    """
+    Passes the spectator minor floors of the connected graphs in one shard of the sharded partition of graphs
+    on nn vertices and edcount edges (see build_sharded_partition()) down to their single edge deletions and
+    single edge contractions, as spec_floor() does for a whole partition. The floors of the minors are lowered
+    in place in the shards of their partitions, each under a FileLock, so the shards of a partition can be
+    run at the same time by several workers (see spec_floor_worker()). Disconnected minors, which are not in the
+    sharded partitions, are skipped. A FileNotFoundError is raised if the partition of a connected minor has
+    not been built, since its floors would otherwise never be lowered by this unit.
+    
+    Lowering a floor to the least of its old value and a new bound gives the same result however often it is
+    done, so a unit that was interrupted can simply be run again.
+    
+    :param nn: The number of vertices of the graphs.
+    
+    :param edcount: The number of edges of the graphs.
+    
+    :param shard: The shard of the partition.
+    
+    :param path_prefix: The directory in which the shards are saved. By default, 'data'
+    
+    :param lattice: Optional argument. A MinorLattice of the graphs (see build_minor_lattice()), from which the
+            deletions and contractions are read instead of being found and canonically labelled.
+    """
+    import os
+    import numpy as np
+    
+    partition = ShardedUspcmPartition(get_shard_directory(nn, edcount, path_prefix))
+    keys, floors = partition.get_shard(shard)
+    
+    # The least spectator minor floor of the graphs of the shard that have each minor
+    pending = dict()
+    min_edges = 1 if nn > 1 else 0
+    if lattice is not None:
+        _bound_lattice_floors(pending, lattice, {key_to_graph6(key): int(mine) for key, mine in zip(keys, floors)})
+    else:
+        for key, mine in zip(keys, floors):
+            G = Graph(key_to_graph6(key))
+            if not G.is_connected():
+                continue
+            if edcount > min_edges:
+                for xx in deletions(G):
+                    _bound_floor(pending, nn, edcount - 1, xx, int(mine))
+            for xx in contractions(G):
+                H = Graph(xx)
+                _bound_floor(pending, H.num_verts(), H.num_edges(), xx, int(mine))
+    partition.close()
+    
+    for (minor_verts, minor_edges), bounds in pending.items():
+        directory = get_shard_directory(minor_verts, minor_edges, path_prefix)
+        if not os.path.exists(f'{directory}/shards.json'):
+            if minor_verts == 0 or minor_edges < minor_verts - 1:
+                # Every graph of the partition is disconnected, or it is the empty graph whose floor is already 0
+                continue
+            raise FileNotFoundError(f'The sharded partition of the graphs on {minor_verts} vertices and {minor_edges} '
+                                    f'edges has not been built, see build_sharded_partition()')
+        minors = ShardedUspcmPartition(directory)
+        minor_keys = graph6_to_keys(list(bounds))
+        minor_floors = np.array(list(bounds.values()), dtype=np.uint8)
+        shard_ids = get_shard_ids(minor_keys, minors.num_shards)
+        for minor_shard in np.unique(shard_ids):
+            minor_shard = int(minor_shard)
+            if not minors.counts[minor_shard]:
+                continue
+            indices = np.flatnonzero(shard_ids == minor_shard)
+            shard_keys = minors.get_shard(minor_shard)[0]
+            pos = np.searchsorted(shard_keys, minor_keys[indices])
+            found = pos < len(shard_keys)
+            found[found] = shard_keys[pos[found]] == minor_keys[indices][found]
+            if not found.any():
+                continue
+            filename = f'{directory}/shard_{minor_shard:04d}.floors'
+            with FileLock(filename + '.lock'):
+                shard_floors = np.memmap(filename, dtype=np.uint8, mode='r+')
+                np.minimum.at(shard_floors, pos[found], minor_floors[indices][found])
+                shard_floors.flush()
+                del shard_floors
+        minors.close()
+
+
+def build_work_queue(path_prefix='data', filename=None, max_verts=None, lease_time=600):
+    """
+    Returns the WorkQueue of the units of spec_floor_unit() for every sharded partition saved in path_prefix
+    up to max_verts vertices, adding the units that are not in the queue yet. Raises a FileNotFoundError,
+    before any unit is added, if the sharded partition of some number of vertices and edges that has
+    connected graphs is missing, since the units above it would have nowhere to lower the floors of their
+    minors.
+    
+    :param path_prefix: The directory in which the shards are saved. By default, 'data'
+    
+    :param filename: Optional argument. The SQLite database file of the queue. By default,
+            f'{path_prefix}/work_queue.sqlite'.
+    
+    :param max_verts: Optional argument. The largest number of vertices of the graphs. By default, MAX_VERTS.
+    
+    :param lease_time: See WorkQueue.
+    """
+    import json
+    import os
+    
+    if max_verts is None:
+        max_verts = MAX_VERTS
+    if filename is None:
+        filename = f'{path_prefix}/work_queue.sqlite'
+    
+    partitions = []
+    missing = []
+    for nn in range(max_verts, -1, -1):
+        for edcount in range(nn*(nn - 1) // 2, -1, -1):
+            meta_filename = f'{get_shard_directory(nn, edcount, path_prefix)}/shards.json'
+            if os.path.exists(meta_filename):
+                with open(meta_filename) as infile:
+                    partitions.append((nn, edcount, json.load(infile)['num_shards']))
+            elif nn > 0 and edcount >= nn - 1:
+                missing.append((nn, edcount))
+    if missing:
+        raise FileNotFoundError(f'The sharded partitions of the graphs on (vertices, edges) {missing} have not been '
+                                f'built, see build_sharded_partition()')
+    
+    queue = WorkQueue(filename, lease_time)
+    queue.add_partitions(partitions)
+    return queue
+
+
+def spec_floor_worker(path_prefix='data', filename=None, poll_interval=5, max_units=None, lattice=None):
+    """
+    Runs spec_floor_unit() for the units of the queue made by build_work_queue() until every unit is complete,
+    and returns the number of units this worker ran. Any number of workers can be started, in separate
+    processes or on separate machines sharing path_prefix, once the queue has been built.
+    
+    :param path_prefix: The directory in which the shards are saved. By default, 'data'
+    
+    :param filename: Optional argument. The SQLite database file of the queue. By default,
+            f'{path_prefix}/work_queue.sqlite'.
+    
+    :param poll_interval: See run_worker().
+    
+    :param max_units: Optional argument, see run_worker().
+    
+    :param lattice: Optional argument, see spec_floor_unit().
+    """
+    if filename is None:
+        filename = f'{path_prefix}/work_queue.sqlite'
+    
+    return run_worker(WorkQueue(filename), lambda nn, edcount, shard: spec_floor_unit(nn, edcount, shard, path_prefix, lattice),
+                      poll_interval=poll_interval, max_units=max_units)
 
 
 
@@ -80,14 +695,27 @@ def spec_floor():
 ###### Functions to determine minimality in the second pass ######
 ##################################################################
 
-def check_minimality(G, uspcm_dict):
+def check_minimality(G, uspcm_dict, lattice=None):
     """
     Uses the dictionary of graphs and their spectator minor floor numbers calculated by the spec_floor_first_pass()
     function to determine which graphs are minor minimal with respect to the spectator minor floor number.
+    
+    Given a MinorLattice (see build_minor_lattice()), the minors of G are read from it instead of being found
+    and canonically labelled.
     """
 
     G, g6_str = get_canonical_graph(G)
     G_spec_floor = get_spectator_floor(G, uspcm_dict)
+    
+    if lattice is not None:
+        graph_id = lattice.graph_id(g6_str)
+        if graph_id < 0:
+            raise ValueError(f'The minor lattice does not have the graph {g6_str}, see build_minor_lattice()')
+        for minor_id in lattice.edge_minors(graph_id):
+            if get_spectator_floor(lattice.graph6(minor_id), uspcm_dict) == G_spec_floor:
+                # G is not minor minimal
+                return None
+        return (g6_str, G_spec_floor)
 
     for H in deletions(G):
         if get_spectator_floor(H, uspcm_dict) == G_spec_floor:
@@ -103,14 +731,15 @@ def check_minimality(G, uspcm_dict):
     
     
     
-def determine_minimals(nn, num_edges, minimals_dict=None, uspcm_dict=None, completed_dict=None, save=False, path_prefix='data'):
+def determine_minimals(nn, num_edges, minimals_dict=None, uspcm_dict=None, completed_dict=None, save=False, path_prefix='data',
+                       lattice=None):
     
     if uspcm_dict is None:
         uspcm_dict = get_full_uspcm_dict()
         
     if minimals_dict is None:
-        minimals_dict_keys = [f'{kk}_spectators' for kk in range(10)]
-        minimals_dict = dict(zip(minimals_dict_keys, [set() for kk in range(10)]))
+        minimals_dict_keys = [f'{kk}_spectators' for kk in range(MAX_VERTS)]
+        minimals_dict = dict(zip(minimals_dict_keys, [set() for kk in range(MAX_VERTS)]))
         
     
     # for edge_key in uspcm_dict.get(f'{nn}_verts'):
@@ -129,26 +758,30 @@ def determine_minimals(nn, num_edges, minimals_dict=None, uspcm_dict=None, compl
 #         print(f'Working on graphs on {nn} vertices and {num_edges} edges...')
 
     num_graphs_worked = 0
+    
+    # Graphs added to completed_dict since minimals_dict was last written to file
+    unsaved_completed = []
 
     for g6_str in progressBar(uspcm_dict.get(f'{nn}_verts').get(f'{num_edges}_edges'), 
                         prefix = f"2nd pass: nn={nn}, ee={num_edges}:", 
                         suffix = '', length = 40):
         if Graph(g6_str).is_connected():
 #                 print(g6_str)
-            result = check_minimality(g6_str, uspcm_dict)
+            result = check_minimality(g6_str, uspcm_dict, lattice)
             if result is not None:
                 G_spec_num = result[1]
                 minimals_dict.get(f'{G_spec_num}_spectators').add(g6_str)
                 
         completed_dict.get(f'{nn}_verts').get(f'{num_edges}_edges').add(g6_str)
+        unsaved_completed.append(g6_str)
         num_graphs_worked += 1
 
-        if num_graphs_worked % save_percent == 0:
-            with open(path_prefix +
-              f'/minimals_dict/minimals_dict_{nn}_verts_{num_edges}_edges.txt', 'w') as outfile:
-                outfile.write(str(minimals_dict))
-            write_partial_completed_dict(nn, num_edges, completed_dict, path_prefix)
+        if save == True and num_graphs_worked % save_percent == 0:
+            write_minimals_dict(nn, num_edges, minimals_dict, path_prefix)
+            append_partial_completed_dict(nn, num_edges, unsaved_completed, completed_dict, path_prefix)
+            unsaved_completed = []
     
+    # Compacts the completed_dict journal into the partition file
     write_partial_completed_dict(nn, num_edges, completed_dict, path_prefix)
                     
     return minimals_dict, completed_dict
@@ -159,113 +792,791 @@ def determine_minimals(nn, num_edges, minimals_dict=None, uspcm_dict=None, compl
 
 
 
-##############################################################################
-##############################################################################
-##############################################################################
-##############################################################################
-
-def get_full_uspcm_dict():
+def _graph6_to_adjacency(g6_str):
     """
-    Access the GitHub repo to put together the complete uspcm_dict, the dictionary of connected graphs 
-    on up to 10 vertices (inclusive) with the spectator number for each graph.
-
-    This is a nested dictionary, to access, e.g., the dictionary of connected graphs on 6 vertices and 
-    10 edges, use uspcm_dict['6_verts']['10_edges']. The innermost dictionary's keys are graph6_strings 
-    and the values are the spectator number for that graph.
+    Returns the list of adjacency bitsets of the graph with the given graph6_string (see graph6_to_key()).
     """
-    
-    import requests
+    key = graph6_to_key(g6_str)
+    num_verts = key >> GRAPH_KEY_VERTEX_SHIFT
+    adjacency = [0]*num_verts
+    bit = num_verts*(num_verts - 1) // 2
+    for jj in range(1, num_verts):
+        for ii in range(jj):
+            bit -= 1
+            if key >> bit & 1:
+                adjacency[ii] |= 1 << jj
+                adjacency[jj] |= 1 << ii
+    return adjacency
 
-    uspcm_dict = {}
-    url_path = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data/uspcm_dict/'
 
+def _adjacency_to_graph6(adjacency):
+    """
+    Returns the graph6_string of the graph with the given list of adjacency bitsets.
+    """
+    key = 0
+    for jj in range(1, len(adjacency)):
+        for ii in range(jj):
+            key = key << 1 | (adjacency[ii] >> jj & 1)
+    return key_to_graph6(len(adjacency) << GRAPH_KEY_VERTEX_SHIFT | key)
 
-    for num_verts in range(2):
-        uspcm_dict[f'{num_verts}_verts'] = {}
 
-        filename = f'uspcm_dict_{num_verts}_verts_{0}_edges.txt'
+def _is_connected_adjacency(adjacency):
+    if not adjacency:
+        return True
+    reached = 1
+    frontier = 1
+    while frontier:
+        low = frontier & -frontier
+        frontier ^= low
+        new = adjacency[low.bit_length() - 1] & ~reached
+        reached |= new
+        frontier |= new
+    return reached == (1 << len(adjacency)) - 1
 
-        file_url = f'{url_path}/{filename}'
-        response = requests.get(file_url)
-        uspcm_dict[f'{num_verts}_verts'][f'{0}_edges'] = eval(response.text)
 
+# The kinds of one step minors, in the order of their codes in the minor lattice
+MINOR_DELETION = 0
+MINOR_CONTRACTION = 1
+MINOR_VERTEX_DELETION = 2
 
-    for num_verts in range(2, 11):
-        uspcm_dict[f'{num_verts}_verts'] = {}
 
-        for num_edges in range(num_verts*(num_verts-1)//2, 0, -1):
-            filename = f'uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt'
+def _remove_vertex(adjacency, vv):
+    """
+    Returns the adjacency bitsets of the graph with vertex vv removed, so the vertices above vv move down by one.
+    """
+    low_mask = (1 << vv) - 1
+    return [bits & low_mask | bits >> (vv + 1) << vv for ww, bits in enumerate(adjacency) if ww != vv]
 
-            file_url = f'{url_path}/{filename}'
-            response = requests.get(file_url)
-            uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = eval(response.text)
-            
-    return uspcm_dict
 
+def get_one_step_minors(g6_str):
+    """
+    Returns the set of (kind, graph6_string) of the graphs (not canonically labelled) obtained from the graph
+    with the given graph6_string by deleting a single edge (MINOR_DELETION), contracting a single edge
+    (MINOR_CONTRACTION), or deleting a single vertex and its edges (MINOR_VERTEX_DELETION).
+    
+    :param g6_str: The graph6_string of a graph on at most GRAPH_KEY_MAX_VERTS vertices.
+    """
+    adjacency = _graph6_to_adjacency(g6_str)
+    nn = len(adjacency)
+    minors = set()
+    
+    for vv in range(nn):
+        for uu in range(vv):
+            if not adjacency[uu] >> vv & 1:
+                continue
+            deleted = list(adjacency)
+            deleted[uu] &= ~(1 << vv)
+            deleted[vv] &= ~(1 << uu)
+            minors.add((MINOR_DELETION, _adjacency_to_graph6(deleted)))
+            
+            # Contract the edge into uu by giving uu the neighbours of vv and removing vv
+            contracted = [bits | 1 << uu if bits >> vv & 1 else bits for bits in adjacency]
+            contracted[uu] = (adjacency[uu] | adjacency[vv]) & ~(1 << uu | 1 << vv)
+            minors.add((MINOR_CONTRACTION, _adjacency_to_graph6(_remove_vertex(contracted, vv))))
+        
+        minors.add((MINOR_VERTEX_DELETION, _adjacency_to_graph6(_remove_vertex(adjacency, vv))))
+    
+    return minors
 
 
-def get_partial_uspcm_dict(num_verts, num_edges):
+def get_connected_minors(g6_str):
     """
-    Access the GitHub repo to get just the part of the uspcm_dict for num_verts vertices and num_edges
-    edges, where num_verts is at most 10.
-
-    This is a nested dictionary, to access, e.g., the dictionary of connected graphs on 6 vertices and 
-    10 edges, use uspcm_dict['6_verts']['10_edges']. The innermost dictionary's keys are graph6_strings 
-    and the values are the spectator number for that graph.
-    
-    :param num_verts: The number of vertices.
+    Returns the set of graph6_strings (not canonically labelled) of the connected graphs obtained from the
+    graph with the given graph6_string by deleting or contracting a single edge (or deleting the vertex of
+    the graph on one vertex), which are the minors that check_minimality() compares a graph with.
     
-    :param num_edges: The number of edges.
+    :param g6_str: The graph6_string of a connected graph on at most GRAPH_KEY_MAX_VERTS vertices.
     """
+    minors = set()
+    for kind, H_str in get_one_step_minors(g6_str):
+        if kind == MINOR_VERTEX_DELETION and ord(g6_str[0]) - 63 != 1:
+            continue
+        if kind == MINOR_DELETION and not _is_connected_adjacency(_graph6_to_adjacency(H_str)):
+            continue
+        minors.add(H_str)
     
-    import requests
+    return minors
 
-    uspcm_dict = {}
-    url_path = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data/uspcm_dict/'
-    filename = f'uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt'
 
-    file_url = f'{url_path}/{filename}'
-    response = requests.get(file_url)
+def classify_minimals(nn, num_edges, uspcm_dict=None, path_prefix=None, file_format='bin', algorithm=None,
+                      processes=None, lattice=None):
+    """
+    Returns a dictionary whose keys are spectator minor floor numbers and whose values are the sets of
+    graph6_strings of the connected graphs on nn vertices and num_edges edges that are minor minimal with
+    respect to the spectator minor floor number, with the same result as check_minimality() on every graph
+    of the partition.
     
-    uspcm_dict[f'{num_verts}_verts'] = {}
-    uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = eval(response.text)
+    The connected single edge deletions and contractions of every graph in the partition (see
+    get_connected_minors()) are canonically labelled together, and the spectator minor floor numbers of all
+    of them are looked up at once in each of the smaller partitions. A graph is minor minimal when none of
+    them has the same spectator minor floor number.
+    
+    :param nn: The number of vertices of the graphs.
+    
+    :param num_edges: The number of edges of the graphs.
+    
+    :param uspcm_dict: Optional argument, see get_spectator_floor().
+    
+    :param path_prefix: Optional argument, see get_spectator_floor().
+    
+    :param file_format: Either 'bin' (default), 'array' or 'txt', see read_partial_uspcm_dict(). Only used if
+            path_prefix is provided.
+    
+    :param algorithm: Optional argument. The canonical labelling backend, see canonical_graph6().
+    
+    :param processes: Optional argument. The number of worker processes used to canonically label the
+            minors, see canonical_graph6_batch().
+    
+    :param lattice: Optional argument. A MinorLattice of the partitions (see build_minor_lattice()), from
+            which the minors are read instead of being found and canonically labelled.
+    """
+    partitions = _PartitionCache(uspcm_dict, path_prefix, file_format)
+    try:
+        return _classify_minimals(nn, num_edges, partitions, algorithm, processes, lattice)[0]
+    finally:
+        partitions.close()
 
-    return uspcm_dict
 
+def _lookup_partition_floors(g6_strings, partitions):
+    """
+    Returns the dictionary of the spectator minor floor numbers of the graphs with the given canonical
+    graph6_strings, looking up all of the graphs of each partition together.
+    """
+    groups = {}
+    for g6_str in g6_strings:
+        H_num_verts = ord(g6_str[0]) - 63
+        H_num_edges = bin(graph6_to_key(g6_str) & ((1 << GRAPH_KEY_VERTEX_SHIFT) - 1)).count('1')
+        groups.setdefault((H_num_verts, H_num_edges), []).append(g6_str)
+    floors = {}
+    for (H_num_verts, H_num_edges), group in groups.items():
+        H_partition = partitions.get(H_num_verts, H_num_edges)
+        if hasattr(H_partition, 'get_floors'):
+            group_floors = [int(floor) for floor in H_partition.get_floors(group)]
+        else:
+            group_floors = [H_partition[g6_str] for g6_str in group]
+        floors.update(zip(group, group_floors))
+    return floors
 
 
-def read_minor_minimals():
+def _classify_minimals(nn, num_edges, partitions, algorithm, processes, lattice=None):
     """
-    Returns the dictionary of graphs which are minor minimal with respect to the spectator minor floor 
-    number from the GitHub repo.
+    Returns the dictionary of classify_minimals() and the list of graph6_strings of the partition.
     """
-    import requests
+    partition = partitions.get(nn, num_edges)
+    g6_strings = list(partition)
     
-    url = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data/minimals_dict.txt'
-    response = requests.get(url)
-    return eval(response.text)
-
+    if lattice is not None:
+        # The minors are already canonically labelled, by their IDs in the lattice
+        graph_ids = lattice.graph_ids(g6_strings)
+        if (graph_ids < 0).any():
+            raise ValueError(f'The minor lattice does not have every graph on {nn} vertices and {num_edges} edges, '
+                             'see build_minor_lattice()')
+        minors_of = {}
+        connected = {}
+        for g6_str, graph_id in zip(g6_strings, graph_ids):
+            if _is_connected_adjacency(_graph6_to_adjacency(g6_str)):
+                G_minors = [lattice.graph6(minor_id) for minor_id in lattice.edge_minors(graph_id)]
+                for H_str in G_minors:
+                    if H_str not in connected:
+                        connected[H_str] = _is_connected_adjacency(_graph6_to_adjacency(H_str))
+                minors_of[g6_str] = [H_str for H_str in G_minors if connected[H_str]]
+        canonical = {H_str: H_str for H_str in connected}
+    else:
+        minors_of = {}
+        for g6_str in g6_strings:
+            if _is_connected_adjacency(_graph6_to_adjacency(g6_str)):
+                minors_of[g6_str] = get_connected_minors(g6_str)
+        minors = list(set().union(*minors_of.values()))
+        canonical = dict(zip(minors, canonical_graph6_batch(minors, algorithm, processes)))
+    
+    # Look up the minors in each smaller partition together
+    minor_floors = _lookup_partition_floors(set(canonical.values()), partitions)
+    
+    minimals = {}
+    for g6_str, G_minors in minors_of.items():
+        G_spec_floor = int(partition[g6_str])
+        if all(minor_floors[canonical[H]] != G_spec_floor for H in G_minors):
+            minimals.setdefault(G_spec_floor, set()).add(g6_str)
+    
+    return minimals, g6_strings
 
 
-def display_connected_minimal_graphs(spec_num, minimals_dict=None):
+def determine_minimals_batch(nn, num_edges, minimals_dict=None, uspcm_dict=None, completed_dict=None, save=False,
+                             path_prefix='data', file_format='txt', algorithm=None, processes=None, lattice=None):
     """
-    Prints the connected minor-minimal graphs with spectator number equal to spec_num.
+    Does the same as determine_minimals() for the graphs on nn vertices and num_edges edges, but classifies the
+    whole partition at once with classify_minimals() and updates minimals_dict and completed_dict in one pass.
     
-    :param spec_num: The spectator minor floor number.
+    :param uspcm_dict: Optional argument. By default, the partitions of the uspcm_dict are read from the files
+            saved in path_prefix, see read_partial_uspcm_dict().
     
-    :param minimals_dict: Optional argument. A dictionary of minor minimal graphs where the keys are 
-            the spectator minor floor number and the associated value is the set of graphs which are 
-            minor minimal with respect to that spectator minor floor number. If not provided, then the
-            read_minor_minimals() function will be used to fetch the dictionary from the github repo.
-    """
+    :param file_format: The format of the saved uspcm_dict partitions, see read_partial_uspcm_dict().
+    
+    :param algorithm: Optional argument, see classify_minimals().
     
+    :param processes: Optional argument, see classify_minimals().
+    
+    :param lattice: Optional argument, see classify_minimals().
+    
+    The other arguments are those of determine_minimals().
+    """
     if minimals_dict is None:
-        minimals_dict = read_minor_minimals()
+        minimals_dict_keys = [f'{kk}_spectators' for kk in range(MAX_VERTS)]
+        minimals_dict = dict(zip(minimals_dict_keys, [set() for kk in range(MAX_VERTS)]))
+    if completed_dict is None:
+        completed_dict = {f'{nn}_verts': {f'{num_edges}_edges': set()}}
     
-    if spec_num >= 5:
-        num = len(minimals_dict[f'{spec_num}_spectators'])
-        message = f"""Warning: There are {num} connected minor-minimal graphs on at most 10 vertices with spectator number {spec_num},
-are you sure you want to proceed?
+    partitions = _PartitionCache(uspcm_dict, path_prefix if uspcm_dict is None else None, file_format)
+    try:
+        minimals, g6_strings = _classify_minimals(nn, num_edges, partitions, algorithm, processes, lattice)
+    finally:
+        partitions.close()
+    
+    for G_spec_num, G_minimals in minimals.items():
+        minimals_dict.setdefault(f'{G_spec_num}_spectators', set()).update(G_minimals)
+    completed_dict[f'{nn}_verts'][f'{num_edges}_edges'].update(g6_strings)
+    
+    if save == True:
+        write_minimals_dict(nn, num_edges, minimals_dict, path_prefix)
+        mark_partition_complete('minimals_dict', nn, num_edges, path_prefix,
+                                sum(len(minimals) for minimals in minimals_dict.values()))
+        # Compacts the completed_dict journal into the partition file
+        write_partial_completed_dict(nn, num_edges, completed_dict, path_prefix)
+    
+    return minimals_dict, completed_dict
+
+
+
+##################################################################
+################### One step minor lattice #######################
+##################################################################
+
+# The minor lattice lists, for every graph in the partitions of the uspcm_dict, the graphs that are one step
+# minors of it (down) and the graphs that it is a one step minor of (up), as compressed sparse row arrays
+# saved with numpy.save() in path_prefix/minor_lattice and memory-mapped by MinorLattice. A graph is given by
+# its ID, its position in the sorted keys of its partition (see get_graph_ids()) plus the number of graphs in
+# the partitions before it.
+MINOR_LATTICE_ARRAYS = ('keys', 'partitions', 'down_indptr', 'down_indices', 'down_kinds', 'up_indptr',
+                        'up_indices', 'up_kinds')
+
+
+def _get_lattice_ids(g6_strings, keys, starts):
+    """
+    Returns a NumPy int64 array of the IDs in the minor lattice of the graphs with the given canonical
+    graph6_strings, with -1 for the graphs that are not in any partition.
+    """
+    import numpy as np
+    
+    ids = np.full(len(g6_strings), -1, dtype=np.int64)
+    groups = {}
+    for idx, g6_str in enumerate(g6_strings):
+        key = graph6_to_key(g6_str)
+        num_edges = bin(key & ((1 << GRAPH_KEY_VERTEX_SHIFT) - 1)).count('1')
+        groups.setdefault((key >> GRAPH_KEY_VERTEX_SHIFT, num_edges), []).append((idx, key))
+    
+    for partition, group in groups.items():
+        if partition not in keys:
+            continue
+        query = np.array([key for idx, key in group], dtype=np.uint64)
+        pos = np.searchsorted(keys[partition], query)
+        found = pos < len(keys[partition])
+        found[found] = keys[partition][pos[found]] == query[found]
+        ids[[idx for idx, key in group]] = np.where(found, starts[partition] + pos, -1)
+    
+    return ids
+
+
+def _get_lattice_block(block_keys, keys, starts, algorithm, processes):
+    """
+    Returns (degrees, down_indices, down_kinds), the block of the down arrays of the minor lattice (see
+    build_minor_lattice()) of the graphs with the given keys, as NumPy arrays.
+    """
+    import numpy as np
+    
+    # One entry per one step minor, with the minors numbered in the order they are first found
+    sources = []
+    kinds = []
+    minor_idx = []
+    unique = {}
+    for idx, key in enumerate(block_keys):
+        for kind, H_str in get_one_step_minors(key_to_graph6(key)):
+            sources.append(idx)
+            kinds.append(kind)
+            minor_idx.append(unique.setdefault(H_str, len(unique)))
+    ids = _get_lattice_ids(canonical_graph6_batch(list(unique), algorithm, processes), keys, starts)
+    
+    sources = np.array(sources, dtype=np.int64)
+    kinds = np.array(kinds, dtype=np.uint8)
+    targets = ids[np.array(minor_idx, dtype=np.int64)]
+    keep = targets >= 0
+    sources, targets, kinds = sources[keep], targets[keep], kinds[keep]
+    
+    # Sort by graph, then minor, then kind, and drop the repeated (minor, kind) pairs of each graph
+    order = np.lexsort((kinds, targets, sources))
+    sources, targets, kinds = sources[order], targets[order], kinds[order]
+    distinct = np.ones(len(sources), dtype=bool)
+    distinct[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1]) | (kinds[1:] != kinds[:-1])
+    
+    return np.bincount(sources[distinct], minlength=len(block_keys)), targets[distinct], kinds[distinct]
+
+
+def build_minor_lattice(path_prefix='data', max_verts=None, file_format='txt', algorithm=None, processes=None,
+                        batch_size=16384, chunk_size=1 << 24):
+    """
+    Builds and saves the minor lattice (see MinorLattice) of the graphs in the partitions of the uspcm_dict on
+    at most max_verts vertices saved in path_prefix, and returns it as a MinorLattice.
+    
+    The one step minors of each batch of graphs (see get_one_step_minors()) are canonically labelled together.
+    Those that are not in any partition, e.g. the graphs with three components, are left out. The down arrays
+    of each batch are appended to files as they are found, and the up arrays are filled in from them one chunk
+    at a time, so apart from the keys and the index pointers of the lattice, memory use is bounded by
+    batch_size and chunk_size rather than by the number of graphs.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    
+    :param max_verts: Optional argument. The largest number of vertices of the graphs. By default, MAX_VERTS.
+    
+    :param file_format: See read_partial_uspcm_dict().
+    
+    :param algorithm: Optional argument. The canonical labelling backend, see canonical_graph6().
+    
+    :param processes: Optional argument. The number of worker processes used to canonically label the
+            minors, see canonical_graph6_batch().
+    
+    :param batch_size: The number of graphs whose minors are labelled together.
+    
+    :param chunk_size: The number of entries of the down arrays that are transposed together.
+    """
+    import os
+    import numpy as np
+    
+    if max_verts is None:
+        max_verts = MAX_VERTS
+    partition_list = sorted(partition for partition in list_partition_files('uspcm_dict', path_prefix)
+                            if partition[0] <= max_verts)
+    keys = {}
+    starts = {}
+    num_graphs = 0
+    for partition in partition_list:
+        keys[partition] = np.sort(graph6_to_keys(list(read_partial_uspcm_dict(*partition, path_prefix, file_format))))
+        starts[partition] = num_graphs
+        num_graphs += len(keys[partition])
+    
+    directory = f'{path_prefix}/minor_lattice'
+    os.makedirs(directory, exist_ok=True)
+    
+    degrees = []
+    with open(f'{directory}/down_indices.tmp', 'wb') as indices_file, open(f'{directory}/down_kinds.tmp', 'wb') as kinds_file:
+        for partition in progressBar(partition_list, prefix='Minor lattice:', suffix='', length=40):
+            for start in range(0, len(keys[partition]), batch_size):
+                block_degrees, block_indices, block_kinds = _get_lattice_block(
+                    keys[partition][start:start + batch_size], keys, starts, algorithm, processes)
+                degrees.append(block_degrees)
+                block_indices.tofile(indices_file)
+                block_kinds.tofile(kinds_file)
+    degrees = np.concatenate(degrees or [np.zeros(0, np.int64)])
+    num_minors = int(degrees.sum())
+    
+    np.save(f'{directory}/keys.npy',
+            np.concatenate([keys[partition] for partition in partition_list] or [np.zeros(0, np.uint64)]))
+    np.save(f'{directory}/partitions.npy',
+            np.array([(nn, edcount, starts[(nn, edcount)]) for nn, edcount in partition_list], dtype=np.int64).reshape(-1, 3))
+    down_indptr = np.concatenate([[0], np.cumsum(degrees)]).astype(np.int64)
+    np.save(f'{directory}/down_indptr.npy', down_indptr)
+    del keys, degrees
+    
+    def read_tmp(name, dtype):
+        if num_minors == 0:
+            return np.zeros(0, dtype)
+        return np.memmap(f'{directory}/{name}.tmp', dtype=dtype, mode='r', shape=(num_minors,))
+    
+    down_indices = read_tmp('down_indices', np.int64)
+    down_kinds = read_tmp('down_kinds', np.uint8)
+    up_counts = np.zeros(num_graphs, dtype=np.int64)
+    for start in range(0, num_minors, chunk_size):
+        up_counts += np.bincount(down_indices[start:start + chunk_size], minlength=num_graphs)
+    up_indptr = np.concatenate([[0], np.cumsum(up_counts)]).astype(np.int64)
+    np.save(f'{directory}/up_indptr.npy', up_indptr)
+    
+    # The up arrays are the transpose of the down arrays. Each chunk of the down arrays is scattered after the
+    # entries of the earlier chunks, so the graphs that each graph is a minor of are in order.
+    arrays = {name: np.lib.format.open_memmap(f'{directory}/{name}.npy', mode='w+', dtype=dtype, shape=(num_minors,))
+              for name, dtype in (('down_indices', np.int64), ('down_kinds', np.uint8),
+                                  ('up_indices', np.int64), ('up_kinds', np.uint8))}
+    fill = up_indptr[:-1].copy()
+    del up_counts, up_indptr
+    for start in range(0, num_minors, chunk_size):
+        stop = min(start + chunk_size, num_minors)
+        targets = np.array(down_indices[start:stop])
+        kinds = np.array(down_kinds[start:stop])
+        arrays['down_indices'][start:stop] = targets
+        arrays['down_kinds'][start:stop] = kinds
+        sources = np.searchsorted(down_indptr, np.arange(start, stop), side='right') - 1
+        order = np.argsort(targets, kind='stable')
+        sorted_targets = targets[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sorted_targets[1:] != sorted_targets[:-1]
+        group_starts = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+        positions = fill[sorted_targets] + np.arange(len(order)) - group_starts
+        arrays['up_indices'][positions] = sources[order]
+        arrays['up_kinds'][positions] = kinds[order]
+        fill += np.bincount(targets, minlength=num_graphs)
+    for array in arrays.values():
+        array.flush()
+    del arrays, down_indices, down_kinds
+    for name in ('down_indices', 'down_kinds'):
+        os.remove(f'{directory}/{name}.tmp')
+    
+    return MinorLattice(path_prefix)
+
+
+class MinorLattice:
+    """
+    The minor lattice saved by build_minor_lattice(), memory-mapped so that only the parts that are used are
+    read. Finding the one step minors of a graph, or the graphs it is a one step minor of, takes one slice of
+    an array and no canonical labelling.
+    
+    :param path_prefix: The directory in which the minor_lattice directory is saved. By default, 'data'
+    
+    :param mmap_mode: See numpy.load(). None to read the arrays into memory.
+    """
+    
+    def __init__(self, path_prefix='data', mmap_mode='r'):
+        import numpy as np
+        
+        for name in MINOR_LATTICE_ARRAYS:
+            setattr(self, name, np.load(f'{path_prefix}/minor_lattice/{name}.npy', mmap_mode=mmap_mode))
+        bounds = [int(start) for start in self.partitions[:, 2]] + [len(self.keys)]
+        self._keys = {}
+        self._starts = {}
+        for idx, (nn, edcount, start) in enumerate(self.partitions):
+            self._keys[(int(nn), int(edcount))] = self.keys[bounds[idx]:bounds[idx + 1]]
+            self._starts[(int(nn), int(edcount))] = bounds[idx]
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def graph_ids(self, g6_strings):
+        """
+        Returns a NumPy int64 array of the IDs of the graphs with the given canonical graph6_strings, with -1
+        for the graphs that are not in the lattice.
+        """
+        return _get_lattice_ids(g6_strings, self._keys, self._starts)
+    
+    def graph_id(self, g6_str):
+        """
+        Returns the ID of the graph with the given canonical graph6_string, or -1 if it is not in the lattice.
+        """
+        return int(self.graph_ids([g6_str])[0])
+    
+    def graph6(self, graph_id):
+        """
+        Returns the canonical graph6_string of the graph with the given ID.
+        """
+        return key_to_graph6(self.keys[graph_id])
+    
+    def _neighbours(self, indptr, indices, kinds, graph_id, kind):
+        start, end = int(indptr[graph_id]), int(indptr[graph_id + 1])
+        if kind is None:
+            return indices[start:end]
+        return indices[start:end][kinds[start:end] == kind]
+    
+    def minors(self, graph_id, kind=None):
+        """
+        Returns a NumPy array of the IDs of the one step minors of the graph with the given ID.
+        
+        :param kind: Optional argument. One of MINOR_DELETION, MINOR_CONTRACTION or MINOR_VERTEX_DELETION to
+                only return that kind of minor.
+        """
+        return self._neighbours(self.down_indptr, self.down_indices, self.down_kinds, graph_id, kind)
+    
+    def supergraphs(self, graph_id, kind=None):
+        """
+        Returns a NumPy array of the IDs of the graphs that the graph with the given ID is a one step minor of.
+        
+        :param kind: Optional argument, see minors().
+        """
+        return self._neighbours(self.up_indptr, self.up_indices, self.up_kinds, graph_id, kind)
+    
+    def edge_minors(self, graph_id):
+        """
+        Returns a NumPy array of the IDs of the single edge deletions and contractions of the graph with the
+        given ID (and of the graph on no vertices for the graph on one vertex), the minors that deletions()
+        and contractions() find for a connected graph.
+        """
+        import numpy as np
+        
+        start, end = int(self.down_indptr[graph_id]), int(self.down_indptr[graph_id + 1])
+        kinds = self.down_kinds[start:end]
+        keep = kinds != MINOR_VERTEX_DELETION
+        if int(self.keys[graph_id]) >> GRAPH_KEY_VERTEX_SHIFT == 1:
+            keep = np.ones(len(kinds), dtype=bool)
+        return self.down_indices[start:end][keep]
+
+
+
+##############################################################################
+##############################################################################
+##############################################################################
+##############################################################################
+
+# The directories of the GitHub repo that the dictionaries are fetched from. Set these to fetch from a mirror,
+# e.g. a local http.server serving the data directory.
+USPCM_DICT_URL = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data/uspcm_dict'
+MINIMALS_DICT_URL = 'https://raw.githubusercontent.com/cerickson30/qBound/main/data'
+
+# Files fetched by get_partial_uspcm_dict() and read_minor_minimals() are kept in FETCH_CACHE_DIR next to a
+# .sha256 file holding '<content hash>  <url>', the hash and the URL they were fetched from. The last
+# FETCH_MEMO_SIZE parsed files are also kept in memory, least recently used first. In offline mode nothing is
+# downloaded, so only cached files can be read. See set_fetch_cache().
+FETCH_CACHE_DIR = '~/.cache/spectator_floor'
+FETCH_OFFLINE = False
+FETCH_MEMO_SIZE = 16
+_fetch_memo = {}
+
+
+def fetch_text(url, session=None, retries=3, backoff=0.5, timeout=60):
+    """
+    Returns the text of the file at url, retrying with exponential backoff if the connection fails or the
+    server returns a 5xx or 429 response.
+    
+    :param url: The URL of the file. A file:// URL or a path is read from the local disk.
+    
+    :param session: Optional argument. A requests.Session whose connection pool is reused.
+    
+    :param retries: The number of times to retry a failed request.
+    
+    :param backoff: The number of seconds to wait before the first retry, doubled before each further retry.
+    
+    :param timeout: The number of seconds to wait for the server.
+    """
+    import requests
+    import time
+    
+    # A local mirror of the data directory, e.g. for testing
+    if url.startswith('file://') or '://' not in url:
+        with open(url[len('file://'):] if url.startswith('file://') else url, 'r') as infile:
+            return infile.read()
+    
+    if session is None:
+        session = requests
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as error:
+            status = getattr(error.response, 'status_code', None)
+            # A missing file will still be missing on the next try
+            if attempt == retries or (status is not None and status < 500 and status != 429):
+                raise
+            time.sleep(backoff * 2**attempt)
+
+
+def get_full_uspcm_dict(url_path=None, max_workers=8, retries=3, backoff=0.5, max_verts=10):
+    """
+    Access the GitHub repo to put together the complete uspcm_dict, the dictionary of connected graphs 
+    on up to 10 vertices (inclusive) with the spectator number for each graph.
+
+    This is a nested dictionary, to access, e.g., the dictionary of connected graphs on 6 vertices and 
+    10 edges, use uspcm_dict['6_verts']['10_edges']. The innermost dictionary's keys are graph6_strings 
+    and the values are the spectator number for that graph.
+    
+    The partitions are downloaded by max_workers threads sharing one pool of connections, and each one is
+    parsed as soon as it arrives while the others are still downloading.
+    
+    :param url_path: Optional argument. The URL of the directory of partition files. By default,
+            USPCM_DICT_URL.
+    
+    :param max_workers: The largest number of requests in flight at once.
+    
+    :param retries: The number of times to retry a failed request, see fetch_text().
+    
+    :param backoff: The number of seconds to wait before the first retry, see fetch_text().
+    
+    :param max_verts: The largest number of vertices of the graphs to fetch.
+    """
+    
+    import requests
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    if url_path is None:
+        url_path = USPCM_DICT_URL
+    url_path = url_path.rstrip('/')
+
+    # Create the keys in the usual order, the partitions arrive in any order
+    uspcm_dict = {}
+    partitions = []
+    for num_verts in range(max_verts + 1):
+        edge_counts = [0] if num_verts < 2 else range(num_verts*(num_verts-1)//2, 0, -1)
+        uspcm_dict[f'{num_verts}_verts'] = {f'{num_edges}_edges': None for num_edges in edge_counts}
+        partitions += [(num_verts, num_edges) for num_edges in edge_counts]
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    
+    with session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_text, f'{url_path}/uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt',
+                               session, retries, backoff): (num_verts, num_edges)
+                   for num_verts, num_edges in partitions}
+        for future in as_completed(futures):
+            num_verts, num_edges = futures[future]
+            uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = eval(future.result())
+            
+    return uspcm_dict
+
+
+
+def set_fetch_cache(cache_dir=None, offline=None, memo_size=None):
+    """
+    Configures the cache of files fetched from the GitHub repo.
+    
+    :param cache_dir: Optional argument. The directory in which to keep fetched files, or False to not keep
+            them on disk.
+    
+    :param offline: Optional argument. If True, files are only ever read from the cache and never downloaded.
+    
+    :param memo_size: Optional argument. The number of parsed files to keep in memory.
+    """
+    global FETCH_CACHE_DIR, FETCH_OFFLINE, FETCH_MEMO_SIZE
+    
+    if cache_dir is not None:
+        FETCH_CACHE_DIR = cache_dir
+    if offline is not None:
+        FETCH_OFFLINE = offline
+    if memo_size is not None:
+        FETCH_MEMO_SIZE = memo_size
+        while len(_fetch_memo) > FETCH_MEMO_SIZE:
+            del _fetch_memo[next(iter(_fetch_memo))]
+        
+        
+def clear_fetch_memo():
+    """
+    Forgets the files parsed during this session, so they are read from the cache (or fetched) again.
+    """
+    _fetch_memo.clear()
+
+
+def fetch_cached(url, cache_name):
+    """
+    Returns the eval of the text of the file at url, read from the in-process memo, then from the on-disk
+    cache, then (unless offline) from url. A cached file whose content does not match its recorded hash, or
+    that was fetched from another URL (e.g. before USPCM_DICT_URL was changed), is fetched again. The
+    returned object is shared by every caller and must not be modified.
+    
+    :param url: The URL of the file, see fetch_text().
+    
+    :param cache_name: The name of the file in FETCH_CACHE_DIR.
+    """
+    import hashlib
+    import os
+    import tempfile
+    
+    if url in _fetch_memo:
+        # Move it to the end, as the most recently used
+        _fetch_memo[url] = _fetch_memo.pop(url)
+        return _fetch_memo[url]
+    
+    text = None
+    if FETCH_CACHE_DIR:
+        cache_dir = os.path.expanduser(FETCH_CACHE_DIR)
+        cache_filename = f'{cache_dir}/{cache_name}'
+        try:
+            with open(cache_filename, 'r') as infile:
+                cached_text = infile.read()
+            with open(cache_filename + '.sha256', 'r') as infile:
+                if infile.read().strip() == f'{hashlib.sha256(cached_text.encode()).hexdigest()}  {url}':
+                    text = cached_text
+        except OSError:
+            pass
+    
+    if text is None:
+        if FETCH_OFFLINE:
+            raise FileNotFoundError(f'{cache_name} from {url} is not in the cache {FETCH_CACHE_DIR} '
+                                    f'and offline mode is set')
+        text = fetch_text(url)
+        if FETCH_CACHE_DIR:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to temporary files of unique names first, so that an interrupted write is never mistaken for
+            # a cached file and processes filling the cache at the same time do not write to the same file
+            checksum = f'{hashlib.sha256(text.encode()).hexdigest()}  {url}\n'
+            for filename, contents in ((cache_filename, text), (cache_filename + '.sha256', checksum)):
+                fd, tmp_filename = tempfile.mkstemp(dir=cache_dir)
+                with os.fdopen(fd, 'w') as outfile:
+                    outfile.write(contents)
+                os.replace(tmp_filename, filename)
+    
+    partition = eval(text)
+    _fetch_memo[url] = partition
+    while len(_fetch_memo) > FETCH_MEMO_SIZE:
+        del _fetch_memo[next(iter(_fetch_memo))]
+    return partition
+
+
+
+def get_partial_uspcm_dict(num_verts, num_edges):
+    """
+    Access the GitHub repo to get just the part of the uspcm_dict for num_verts vertices and num_edges
+    edges, where num_verts is at most 10.
+
+    This is a nested dictionary, to access, e.g., the dictionary of connected graphs on 6 vertices and 
+    10 edges, use uspcm_dict['6_verts']['10_edges']. The innermost dictionary's keys are graph6_strings 
+    and the values are the spectator number for that graph.
+    
+    Each partition is only downloaded once, see fetch_cached(), and the innermost dictionary is shared by
+    every call for the same partition.
+    
+    :param num_verts: The number of vertices.
+    
+    :param num_edges: The number of edges.
+    """
+
+    uspcm_dict = {}
+    url_path = USPCM_DICT_URL
+    filename = f'uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt'
+
+    file_url = f'{url_path}/{filename}'
+    
+    uspcm_dict[f'{num_verts}_verts'] = {}
+    uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'] = fetch_cached(file_url, filename)
+
+    return uspcm_dict
+
+
+
+def read_minor_minimals():
+    """
+    Returns the dictionary of graphs which are minor minimal with respect to the spectator minor floor 
+    number from the GitHub repo. The file is only downloaded once, see fetch_cached().
+    """
+    import copy
+    
+    url = f'{MINIMALS_DICT_URL}/minimals_dict.txt'
+    return copy.deepcopy(fetch_cached(url, 'minimals_dict.txt'))
+
+
+
+def display_connected_minimal_graphs(spec_num, minimals_dict=None):
+    """
+    Prints the connected minor-minimal graphs with spectator number equal to spec_num.
+    
+    :param spec_num: The spectator minor floor number.
+    
+    :param minimals_dict: Optional argument. A dictionary of minor minimal graphs where the keys are 
+            the spectator minor floor number and the associated value is the set of graphs which are 
+            minor minimal with respect to that spectator minor floor number. If not provided, then the
+            read_minor_minimals() function will be used to fetch the dictionary from the github repo.
+    """
+    
+    if minimals_dict is None:
+        minimals_dict = read_minor_minimals()
+    
+    if spec_num >= 5:
+        num = len(minimals_dict[f'{spec_num}_spectators'])
+        message = f"""Warning: There are {num} connected minor-minimal graphs on at most 10 vertices with spectator number {spec_num},
+are you sure you want to proceed?
 Enter 'Yes' to print all {num} of the graphs.\n"""
         response = input(message)
         if response != 'Yes':
@@ -273,116 +1584,1241 @@ Enter 'Yes' to print all {num} of the graphs.\n"""
     
 
     
-    graph_list = list(minimals_dict[f'{spec_num}_spectators'])
-    nrows = ceil(len(graph_list)/3)
-    counter = 0
-    while len(graph_list) > 2:
+    graph_list = list(minimals_dict[f'{spec_num}_spectators'])
+    nrows = ceil(len(graph_list)/3)
+    counter = 0
+    while len(graph_list) > 2:
+
+        row = [graph_list.pop(0), graph_list.pop(0), graph_list.pop(0)]
+        G1 = Graph(row[0])
+        G2 = Graph(row[1])
+        G3 = Graph(row[2])
+        counter += 3
+
+        ga = graphics_array((G1.plot(title=row[0]), G2.plot(title=row[1]), G3.plot(title=row[2])))
+        ga.show(figsize=(15,3))
+        print('\n')
+
+
+    if len(graph_list) == 2:
+        row = [graph_list.pop(0), graph_list.pop(0)]
+        G1 = Graph(row[0])
+        G2 = Graph(row[1])
+        counter += 2
+
+        ga = graphics_array((G1.plot(title=row[0]), G2.plot(title=row[1])))
+        ga.show(figsize=(15,3))
+        print('\n')
+    elif len(graph_list) == 1:
+        row = [graph_list.pop(0)]
+        G1 = Graph(row[0])
+        counter += 1
+
+        G1.show(title=row[0], figsize=(15,3), fontsize=14)
+        print('\n')
+        
+        
+        
+def get_spectator_floor(graph, uspcm_dict=None, path_prefix=None, file_format='bin'):
+    """
+    Returns the spectator floor number of the given graph.
+    
+    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most MAX_VERTS vertices.
+    
+    :param uspcm_dict: Optional argument. A dictionary of spectator floor numbers, either the complete 
+            dictionary or partial dictionary with the spectator floor numbers for graphs on the number of 
+            vertices and edges that the graph argument has. The innermost dictionaries may be memory-mapped
+            binary partitions, e.g. from init_uspcm_dict(path_prefix, file_format='bin'). If not provided, the
+            get_partial_uspcm_dict() function will be used to fetch the partial dictionary from the github repo.
+            
+    :param path_prefix: Optional argument. If provided (and uspcm_dict is not), the spectator floor number is
+            looked up in the memory-mapped binary partition file saved in this directory by
+            write_partial_uspcm_dict(..., file_format='bin') instead of being fetched from the github repo.
+            Requires spectator_floor_number_read_write_functions.py to be loaded.
+            
+    :param file_format: Either 'bin' (default) to memory-map the binary partition file, or 'array' to read it
+            into a UspcmArrayPartition of sorted NumPy arrays. Only used if path_prefix is provided.
+            
+    To look up many graphs at once, use get_spectator_floors().
+    """
+    G, g6_str = get_canonical_graph(graph)
+        
+    if G.num_verts() > MAX_VERTS or G.is_connected() == False:
+        return f'This function only works for connected graphs on at most {MAX_VERTS} vertices'
+
+    num_verts = G.num_verts()
+    num_edges = G.num_edges()
+    
+    if uspcm_dict is None and path_prefix is not None:
+        with read_partial_uspcm_dict(num_verts, num_edges, path_prefix, file_format) as partial_uspcm_dict:
+            return partial_uspcm_dict[g6_str]
+    
+    if uspcm_dict is None:
+        uspcm_dict = get_partial_uspcm_dict(num_verts, num_edges)
+
+    return uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'][g6_str]
+
+
+
+class _PartitionCache:
+    """
+    The partitions of the uspcm_dict needed by get_spectator_floors() and iter_spectator_floors(), each fetched
+    (or read, or memory-mapped) at most once.
+    """
+    
+    def __init__(self, uspcm_dict=None, path_prefix=None, file_format='bin'):
+        self.uspcm_dict = uspcm_dict
+        self.path_prefix = path_prefix
+        self.file_format = file_format
+        self.partitions = {}
+    
+    def get(self, num_verts, num_edges):
+        if self.uspcm_dict is not None:
+            return self.uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges']
+        if (num_verts, num_edges) not in self.partitions:
+            if self.path_prefix is not None:
+                partition = read_partial_uspcm_dict(num_verts, num_edges, self.path_prefix, self.file_format)
+            else:
+                partition = get_partial_uspcm_dict(num_verts, num_edges)[f'{num_verts}_verts'][f'{num_edges}_edges']
+            self.partitions[(num_verts, num_edges)] = partition
+        return self.partitions[(num_verts, num_edges)]
+    
+    def close(self):
+        for partition in self.partitions.values():
+            if hasattr(partition, 'close'):
+                partition.close()
+        self.partitions = {}
+
+
+def _lookup_spectator_floors(g6_strings, partitions):
+    """
+    Returns the list of spectator floor numbers of the graphs with the given canonical graph6_strings, looking
+    up all of the graphs of each partition together.
+    """
+    floors = [None]*len(g6_strings)
+    groups = {}
+    for idx, g6_str in enumerate(g6_strings):
+        G = Graph(g6_str)
+        if G.num_verts() > MAX_VERTS or G.is_connected() == False:
+            floors[idx] = f'This function only works for connected graphs on at most {MAX_VERTS} vertices'
+            continue
+        groups.setdefault((G.num_verts(), G.num_edges()), []).append(idx)
+    
+    for (num_verts, num_edges), indices in groups.items():
+        partition = partitions.get(num_verts, num_edges)
+        if hasattr(partition, 'get_floors'):
+            # A UspcmArrayPartition looks up the whole group with one searchsorted()
+            group_floors = [int(floor) for floor in partition.get_floors([g6_strings[idx] for idx in indices])]
+        else:
+            group_floors = [partition[g6_strings[idx]] for idx in indices]
+        for idx, floor in zip(indices, group_floors):
+            floors[idx] = floor
+    
+    return floors
+
+
+def get_spectator_floors(graphs, uspcm_dict=None, path_prefix=None, file_format='bin', algorithm=None,
+                         processes=None):
+    """
+    Returns the list of spectator floor numbers of the given graphs, in the same order. The graphs are
+    canonically labelled together and grouped by number of vertices and edges, so each partition of the
+    uspcm_dict that is needed is fetched (or read) once rather than once per graph.
+    
+    :param graphs: An iterable of graphs, graph6_strings, or adjacency matrices of connected graphs on at most
+            MAX_VERTS vertices.
+    
+    :param uspcm_dict: Optional argument, see get_spectator_floor().
+    
+    :param path_prefix: Optional argument, see get_spectator_floor().
+    
+    :param file_format: Either 'bin' (default) or 'array', see get_spectator_floor().
+    
+    :param algorithm: Optional argument. The canonical labelling backend, see canonical_graph6().
+    
+    :param processes: Optional argument. The number of worker processes used to canonically label the graphs,
+            see canonical_graph6_batch().
+    """
+    partitions = _PartitionCache(uspcm_dict, path_prefix, file_format)
+    try:
+        return _lookup_spectator_floors(canonical_graph6_batch(graphs, algorithm, processes), partitions)
+    finally:
+        partitions.close()
+
+
+def iter_spectator_floors(graphs, uspcm_dict=None, path_prefix=None, file_format='bin', algorithm=None,
+                          processes=None, batch_size=10000):
+    """
+    Generator version of get_spectator_floors() for inputs too large to hold in memory: yields the spectator
+    floor number of each graph, in order, while reading only batch_size graphs at a time. The partitions of
+    the uspcm_dict are still fetched (or read) once, and kept until the generator is finished.
+    
+    :param graphs: An iterable of graphs, graph6_strings, or adjacency matrices of connected graphs on at most
+            MAX_VERTS vertices, e.g. an open file of graph6_strings.
+    
+    :param batch_size: The number of graphs canonically labelled and looked up together.
+    
+    The other arguments are those of get_spectator_floors().
+    """
+    from itertools import islice
+    
+    graphs = iter(graphs)
+    partitions = _PartitionCache(uspcm_dict, path_prefix, file_format)
+    try:
+        while True:
+            batch = [graph.strip() if type(graph) == str else graph for graph in islice(graphs, batch_size)]
+            if not batch:
+                break
+            yield from _lookup_spectator_floors(canonical_graph6_batch(batch, algorithm, processes), partitions)
+    finally:
+        partitions.close()
+
+
+
+def get_canonical_graph(graph, algorithm=None):
+    """
+    Returns the graph and graph6_string for the canonical labelling of the graph passed into this function.
+    
+    :param graph: A graph object, graph6_string, or adjacency matrix for a graph.
+    
+    :param algorithm: Optional argument. The canonical labelling backend, see canonical_graph6().
+    """
+    try:
+        mat = Matrix(graph)
+        G = Graph(mat)
+        g6_str = canonical_graph6(G, algorithm)
+    except TypeError:
+        if type(graph) == str:
+            G = Graph(graph)
+            g6_str = canonical_graph6(G, algorithm)
+        elif type(graph) == Graph:
+            G = graph
+            g6_str = canonical_graph6(G, algorithm)
+            
+    return G, g6_str
+
+
+
+# The keys of every stored dictionary are graph6_strings of the canonical labelling found by Sage's own
+# algorithm. The other backends find a different (but just as canonical) labelling, so each of them keeps a
+# table from its canonical graph6_string to the Sage one, which is filled in the first time a graph is seen
+# or ahead of time by build_canonical_translation(). While a worker of canonical_graph6_batch() labels a chunk,
+# the entries it adds are also collected in _new_canonical_translations, to be merged into the parent's table.
+CANONICAL_ALGORITHM = 'sage'
+CANONICAL_ALGORITHMS = ('sage', 'bliss', 'nauty')
+_canonical_translations = {}
+_new_canonical_translations = None
+
+# The orbits of the automorphism groups of the most recently labelled graphs with a non-trivial automorphism,
+# keyed by the Sage canonical graph6_string, as lists of the vertices of the canonically labelled graph.
+# They come for free with the Sage labelling (see canonical_graph6()) and are used by spectator_number().
+CANONICAL_ORBITS = {}
+CANONICAL_ORBITS_SIZE = 100000
+
+
+def set_canonical_algorithm(algorithm):
+    """
+    Sets the canonical labelling backend used by canonical_graph6(), get_canonical_graph() and Glabel() when no
+    algorithm is given.
+    
+    :param algorithm: One of 'sage', 'bliss' or 'nauty'. The bliss backend needs Sage's optional bliss
+            package and the nauty backend needs nauty's labelg program, otherwise the sage algorithm is used.
+            The first time the bliss or nauty backend sees a graph the sage algorithm is run as well, to
+            translate the labelling, so they are only faster once build_canonical_translation() has been run
+            on the keys of the stored dictionaries.
+    """
+    global CANONICAL_ALGORITHM
+    
+    if algorithm not in CANONICAL_ALGORITHMS:
+        raise ValueError(f'algorithm must be one of {CANONICAL_ALGORITHMS}, not {algorithm!r}')
+    CANONICAL_ALGORITHM = algorithm
+    
+    
+def _translate_canonical_label(algorithm, label):
+    """
+    Returns the graph6_string of the Sage canonical labelling of the graph whose canonical graph6_string
+    found by algorithm is label.
+    """
+    translation = _canonical_translations.setdefault(algorithm, {})
+    try:
+        return translation[label]
+    except KeyError:
+        g6_str = Graph(label).canonical_label(algorithm='sage').graph6_string()
+        translation[label] = g6_str
+        if _new_canonical_translations is not None:
+            _new_canonical_translations.setdefault(algorithm, {})[label] = g6_str
+        return g6_str
+
+
+def _nauty_canonical_labels(g6_strings):
+    """
+    Returns the list of graph6_strings of the canonical labellings found by nauty's labelg program, in
+    the same order as g6_strings, or None if labelg cannot be found.
+    """
+    import shutil
+    import subprocess
+    
+    try:
+        from sage.features.nauty import NautyExecutable
+        labelg = NautyExecutable('labelg').absolute_filename()
+    except Exception:
+        labelg = shutil.which('labelg') or shutil.which('nauty-labelg')
+    if labelg is None:
+        return None
+    
+    result = subprocess.run([labelg, '-q'], input='\n'.join(g6_strings) + '\n', capture_output=True, text=True,
+                            check=True)
+    return result.stdout.split()
+
+
+def canonical_graph6(G, algorithm=None):
+    """
+    Returns the graph6_string of the canonical labelling of G found by Sage's own algorithm, which is the
+    labelling of every key of the stored dictionaries, whichever backend is used to find it.
+    
+    :param G: A graph object.
+    
+    :param algorithm: Optional argument. One of 'sage', 'bliss' or 'nauty'. By default, the backend set by
+            set_canonical_algorithm(). The nauty backend starts the labelg program, so it is only faster
+            through canonical_graph6_batch(). A graph that is not in the translation table of the bliss or
+            nauty backend is also labelled by the sage algorithm, so run build_canonical_translation() on
+            the stored keys first.
+    """
+    if algorithm is None:
+        algorithm = CANONICAL_ALGORITHM
+    
+    if algorithm == 'nauty':
+        return canonical_graph6_batch([G], algorithm)[0]
+    if algorithm != 'sage':
+        try:
+            label = G.canonical_label(algorithm=algorithm).graph6_string()
+        except (ImportError, ValueError, NotImplementedError):
+            # The backend is not installed
+            return _sage_canonical_graph6(G)
+        return _translate_canonical_label(algorithm, label)
+    
+    return _sage_canonical_graph6(G)
+
+
+def _sage_canonical_graph6(G):
+    """
+    Returns the graph6_string of the canonical labelling found by Sage's own algorithm, the same as
+    G.canonical_label(algorithm='sage'), from the same search tree that gives the generators of the
+    automorphism group of G. The orbits of the canonically labelled graph are recorded in CANONICAL_ORBITS if
+    G has a non-trivial automorphism.
+    """
+    from sage.groups.perm_gps.partn_ref.refinement_graphs import search_tree
+    
+    n = G.num_verts()
+    if n <= 1 or G.has_loops() or G.has_multiple_edges():
+        return G.canonical_label(algorithm='sage').graph6_string()
+    
+    # On the vertices 0, ..., n-1 the generators and the certificate are in terms of the vertices themselves
+    K = G.relabel({v: idx for idx, v in enumerate(G)}, inplace=False)
+    generators, _, certificate = search_tree(K, [list(range(n))], certificate=True)
+    g6_str = K.relabel(certificate, inplace=False).graph6_string()
+    
+    if generators and g6_str not in CANONICAL_ORBITS:
+        parent = list(range(n))
+        def find(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+        for generator in generators:
+            for v, image in enumerate(generator):
+                parent[find(v)] = find(image)
+        orbits = {}
+        for v in range(n):
+            orbits.setdefault(find(v), []).append(certificate[v])
+        if len(CANONICAL_ORBITS) >= CANONICAL_ORBITS_SIZE:
+            del CANONICAL_ORBITS[next(iter(CANONICAL_ORBITS))]
+        CANONICAL_ORBITS[g6_str] = [sorted(orbit) for orbit in orbits.values()]
+    
+    return g6_str
+
+
+def _canonical_graph6_chunk(g6_strings, algorithm):
+    if algorithm == 'nauty':
+        labels = _nauty_canonical_labels(g6_strings)
+        if labels is not None:
+            return [_translate_canonical_label('nauty', label) for label in labels]
+        algorithm = 'sage'
+    
+    return [canonical_graph6(Graph(g6_str), algorithm) for g6_str in g6_strings]
+
+
+def _canonical_graph6_worker(g6_strings, algorithm):
+    """
+    Returns the Sage canonical graph6_strings of a chunk of graphs labelled in a worker of
+    canonical_graph6_batch(), and the entries that were added to the translation tables while labelling them.
+    """
+    global _new_canonical_translations
+    
+    _new_canonical_translations = {}
+    try:
+        return _canonical_graph6_chunk(g6_strings, algorithm), _new_canonical_translations
+    finally:
+        _new_canonical_translations = None
+
+
+def canonical_graph6_batch(graphs, algorithm=None, processes=None, chunksize=1000):
+    """
+    Returns the list of graph6_strings of the Sage canonical labellings (see canonical_graph6()) of the
+    given graphs, in the same order.
+    
+    :param graphs: An iterable of graph objects, graph6_strings or adjacency matrices.
+    
+    :param algorithm: Optional argument. One of 'sage', 'bliss' or 'nauty'. By default, the backend set by
+            set_canonical_algorithm(). With 'nauty' each chunk of graphs is labelled by a single run of labelg.
+    
+    :param processes: Optional argument. The number of worker processes that label chunks of the graphs.
+            By default, the graphs are labelled in this process. The translations the workers find are
+            added to the translation tables of this process.
+    
+    :param chunksize: The number of graphs in each chunk.
+    """
+    if algorithm is None:
+        algorithm = CANONICAL_ALGORITHM
+    
+    g6_strings = []
+    for graph in graphs:
+        if type(graph) == str:
+            g6_strings.append(graph)
+        elif type(graph) == Graph:
+            g6_strings.append(graph.graph6_string())
+        else:
+            g6_strings.append(Graph(Matrix(graph)).graph6_string())
+    chunks = [g6_strings[idx:idx + chunksize] for idx in range(0, len(g6_strings), chunksize)]
+    
+    if processes is None or processes <= 1 or len(chunks) <= 1:
+        return [g6_str for chunk in chunks for g6_str in _canonical_graph6_chunk(chunk, algorithm)]
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    labelled = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for chunk, translations in pool.map(_canonical_graph6_worker, chunks, [algorithm]*len(chunks)):
+            labelled.extend(chunk)
+            for backend, translation in translations.items():
+                _canonical_translations.setdefault(backend, {}).update(translation)
+    return labelled
+
+
+def build_canonical_translation(g6_strings, algorithm=None):
+    """
+    Fills in the table from the canonical graph6_strings found by algorithm to the Sage ones for the graphs
+    with the given Sage canonical graph6_strings, e.g. the keys of a partition of the uspcm_dict, so that
+    looking up those graphs never runs the sage algorithm. Until it has been run, the bliss and nauty backends
+    label every graph they have not seen with the sage algorithm as well, and are slower than it.
+    
+    :param g6_strings: An iterable of graph6_strings of Sage canonical labellings.
+    
+    :param algorithm: Optional argument. One of 'bliss' or 'nauty'. By default, the backend set by
+            set_canonical_algorithm().
+    """
+    if algorithm is None:
+        algorithm = CANONICAL_ALGORITHM
+    if algorithm == 'sage':
+        return
+    
+    g6_strings = list(g6_strings)
+    if algorithm == 'nauty':
+        labels = _nauty_canonical_labels(g6_strings)
+        if labels is None:
+            return
+    else:
+        try:
+            labels = [Graph(g6_str).canonical_label(algorithm=algorithm).graph6_string() for g6_str in g6_strings]
+        except (ImportError, ValueError, NotImplementedError):
+            return
+    
+    _canonical_translations.setdefault(algorithm, {}).update(zip(labels, g6_strings))
 
-        row = [graph_list.pop(0), graph_list.pop(0), graph_list.pop(0)]
-        G1 = Graph(row[0])
-        G2 = Graph(row[1])
-        G3 = Graph(row[2])
-        counter += 3
+        
 
-        ga = graphics_array((G1.plot(title=row[0]), G2.plot(title=row[1]), G3.plot(title=row[2])))
-        ga.show(figsize=(15,3))
-        print('\n')
+def get_graph(graph):
+    """
+    Returns the graph object for a graph object, graph6_string, or adjacency matrix, without relabelling it.
+    
+    :param graph: A graph object, graph6_string, or adjacency matrix for a graph.
+    """
+    if type(graph) == str:
+        return Graph(graph)
+    if type(graph) == Graph:
+        return graph
+    return Graph(Matrix(graph))
 
 
-    if len(graph_list) == 2:
-        row = [graph_list.pop(0), graph_list.pop(0)]
-        G1 = Graph(row[0])
-        G2 = Graph(row[1])
-        counter += 2
 
-        ga = graphics_array((G1.plot(title=row[0]), G2.plot(title=row[1])))
-        ga.show(figsize=(15,3))
-        print('\n')
-    elif len(graph_list) == 1:
-        row = [graph_list.pop(0)]
-        G1 = Graph(row[0])
-        counter += 1
+def _unique_geodesic_layers(adjacency, source, best=0, targets=None):
+    """
+    Runs a breadth first search from source in the graph with the given adjacency bitsets, counting the
+    shortest paths to each vertex up to two, and returns (length, target) for a longest unique shortest path
+    from source to a vertex of the bitset targets (by default, any vertex), or (0, source) if there is none
+    longer than best.
+    
+    The search stops at the first layer without a vertex reached by a unique shortest path, since a subpath
+    of a unique shortest path is a unique shortest path, as soon as the unvisited vertices are too few to
+    give a path longer than best, or once every target has been reached.
+    """
+    full = (1 << len(adjacency)) - 1
+    if targets is None:
+        targets = full
+    visited = 1 << source
+    once = visited
+    twice = 0
+    length, target = 0, source
+    depth = 0
+    while once:
+        if depth + bin(full & ~visited).count('1') <= max(best, length) or not targets & ~visited:
+            break
+        # The vertices of the next layer reached through one or at least two shortest paths
+        next_once = 0
+        next_twice = 0
+        frontier = once | twice
+        while frontier:
+            low = frontier & -frontier
+            frontier ^= low
+            reached = adjacency[low.bit_length() - 1] & ~visited
+            if twice & low:
+                next_twice |= reached
+            else:
+                next_twice |= next_once & reached
+                next_once |= reached
+        next_once &= ~next_twice
+        visited |= next_once | next_twice
+        once, twice = next_once, next_twice
+        depth += 1
+        if once & targets:
+            length, target = depth, (once & targets & -(once & targets)).bit_length() - 1
+    return length, target
 
-        G1.show(title=row[0], figsize=(15,3), fontsize=14)
-        print('\n')
-        
-        
-        
-def get_spectator_floor(graph, uspcm_dict=None):
+
+def get_parade_number(adjacency, orbits=None):
     """
-    Returns the spectator floor number of the given graph.
+    Returns (length, source, target) for a longest unique shortest path (parade) in the graph with the given
+    adjacency bitsets, see get_adjacency_bitsets(). The vertices are given by their indices.
     
-    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most 10 vertices.
+    Given the orbits of the automorphism group, the search is from one vertex of each orbit only, since an
+    automorphism takes the unique shortest paths from one vertex of an orbit to those from any other. The
+    paths are the same read in either direction, so each orbit of pairs of ends is also only searched once:
+    the search from the i-th orbit only looks for ends in the i-th and later orbits, and stops once it has
+    reached all of them.
     
-    :param uspcm_dict: Optional argument. A dictionary of spectator floor numbers, either the complete 
-            dictionary or partial dictionary with the spectator floor numbers for graphs on the number of 
-            vertices and edges that the graph argument has. If not provided, the get_partial_uspcm_dict() 
-            function will be used to fetch the partial dictionary from the github repo.
+    :param adjacency: The adjacency bitsets of a graph.
+    
+    :param orbits: Optional argument. A list of lists of the (indices of the) vertices in each orbit of the
+            automorphism group. By default, every vertex is its own orbit.
     """
-    G, g6_str = get_canonical_graph(graph)
-        
-    if G.num_verts() > 10 or G.is_connected() == False:
-        return "This function only works for connected graphs on at most 10 vertices"
+    n = len(adjacency)
+    if orbits is None:
+        orbits = [[v] for v in range(n)]
+    targets = (1 << n) - 1
+    best, best_source, best_target = 0, 0, 0
+    for orbit in orbits:
+        # No path is longer than one through every vertex
+        if best == n - 1:
+            break
+        length, target = _unique_geodesic_layers(adjacency, orbit[0], best, targets)
+        if length > best:
+            best, best_source, best_target = length, orbit[0], target
+        for v in orbit:
+            targets &= ~(1 << v)
+    return best, best_source, best_target
 
-    num_verts = G.num_verts()
-    num_edges = G.num_edges()
+
+def get_parade(adjacency, source, target):
+    """
+    Returns the list of (indices of the) vertices of the unique shortest path from source to target in the
+    graph with the given adjacency bitsets.
+    """
+    layers = [1 << source]
+    visited = layers[0]
+    while not visited >> target & 1:
+        reached = 0
+        frontier = layers[-1]
+        while frontier:
+            low = frontier & -frontier
+            frontier ^= low
+            reached |= adjacency[low.bit_length() - 1]
+        layers.append(reached & ~visited)
+        visited |= reached
     
-    if uspcm_dict is None:
-        uspcm_dict = get_partial_uspcm_dict(num_verts, num_edges)
+    path = [target]
+    for layer in reversed(layers[:-1]):
+        previous = adjacency[path[-1]] & layer
+        path.append(previous.bit_length() - 1)
+    return path[::-1]
 
-    return uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges'][g6_str]
 
+def get_spectator_lower_bound(adjacency):
+    """
+    Returns a lower bound of the spectator number of the graph with the given adjacency bitsets, from its
+    degrees only. A shortest path is no longer than the diameter of its component, which is at most
+    n - (largest degree) + 1, since a vertex is adjacent to at most three vertices of a shortest path, and at
+    most 3n/(smallest degree + 1) - 1, since the closed neighbourhoods of every third vertex of a shortest
+    path are disjoint.
+    
+    :param adjacency: The adjacency bitsets of a graph, see get_adjacency_bitsets().
+    """
+    nn = len(adjacency)
+    if nn == 0:
+        return 0
+    degrees = [bin(bits).count('1') for bits in adjacency]
+    longest = min(nn - 1, nn - max(degrees) + 1, 3*nn // (min(degrees) + 1) - 1)
+    return max(nn - 1 - longest, 0)
 
 
-def get_canonical_graph(graph):
+def spectator_number(graph, certificate=False, orbits=None):
     """
-    Returns the graph and graph6_string for the canonical labelling of the graph passed into this function.
+    Returns the spectator number of the graph, which is the number of vertices that are not on a longest
+    unique shortest path (parade) of the graph, and the same number usp_comp() finds from the powers of the
+    adjacency matrix. See get_parade_number().
+    
+    Vertices in the same orbit of the automorphism group are the ends of the same lengths of unique shortest
+    paths, so given the orbits only one vertex of each orbit, and one pair of each orbit of pairs of ends, is
+    searched (see get_parade_number()).
     
     :param graph: A graph object, graph6_string, or adjacency matrix for a graph.
+    
+    :param certificate: If True, returns (spectator number, parade) where parade is the list of vertices of
+            a longest unique shortest path.
+    
+    :param orbits: Optional argument. A list of lists of the vertices in each orbit of the automorphism group
+            of the graph, e.g. from G.automorphism_group(orbits=True, return_group=False), or True to find them.
+            By default, the orbits recorded in CANONICAL_ORBITS when the canonical graph6_string graph was
+            found by canonical_graph6() (as it is for the minors from deletions() and contractions()) are used,
+            and otherwise every vertex is searched from. False to search from every vertex.
     """
-    try:
-        mat = Matrix(graph)
-        G = Graph(mat)
-        g6_str = G.canonical_label(algorithm='sage').graph6_string()
-    except TypeError:
-        if type(graph) == str:
-            G = Graph(graph)
-            g6_str = G.canonical_label(algorithm='sage').graph6_string()
-        elif type(graph) == Graph:
-            G = graph
-            g6_str = G.canonical_label(algorithm='sage').graph6_string()
-            
-    return G, g6_str
+    G = get_graph(graph)
+    vertices, adjacency = get_adjacency_bitsets(G)
+    if orbits is None and type(graph) == str:
+        orbits = CANONICAL_ORBITS.get(graph)
+    elif orbits is True:
+        orbits = G.automorphism_group(orbits=True, return_group=False) if vertices else []
+    if orbits:
+        index = {v: idx for idx, v in enumerate(vertices)}
+        orbits = [[index[v] for v in orbit] for orbit in orbits]
+    else:
+        orbits = None
+    length, source, target = get_parade_number(adjacency, orbits)
+    spec_num = max(len(vertices) - 1 - length, 0)
+    if certificate:
+        if not vertices:
+            return spec_num, []
+        return spec_num, [vertices[v] for v in get_parade(adjacency, source, target)]
+    return spec_num
+
+
+
+# The algorithm used by has_minor() when none is given: 'bitset' for the search in find_minor_model(), or
+# 'milp' for Sage's Graph.minor(), which solves an integer program.
+MINOR_ALGORITHM = 'bitset'
+_connected_subsets_cache = {}
+
+
+def get_adjacency_bitsets(G):
+    """
+    Returns the list of vertices of G and the list whose i-th entry has bit j set when the i-th and j-th
+    vertices are adjacent.
+    
+    :param G: A graph object.
+    """
+    vertices = list(G)
+    index = {v: idx for idx, v in enumerate(vertices)}
+    adjacency = [0]*len(vertices)
+    for u, v in G.edges(labels=False):
+        if u != v:
+            adjacency[index[u]] |= 1 << index[v]
+            adjacency[index[v]] |= 1 << index[u]
+    return vertices, adjacency
+
+
+def _connected_subsets(adjacency):
+    """
+    Returns the list of (subset, neighbours) of every connected set of vertices of the graph with the given
+    adjacency bitsets, smallest first, where neighbours is the set of vertices outside subset adjacent to it.
+    """
+    key = tuple(adjacency)
+    if key not in _connected_subsets_cache:
+        if len(_connected_subsets_cache) >= 1024:
+            _connected_subsets_cache.clear()
+        subsets = []
+        for subset in range(1, 1 << len(adjacency)):
+            reached = subset & -subset
+            frontier = reached
+            while frontier:
+                low = frontier & -frontier
+                frontier ^= low
+                new = adjacency[low.bit_length() - 1] & subset & ~reached
+                reached |= new
+                frontier |= new
+            if reached == subset:
+                neighbours = 0
+                rest = subset
+                while rest:
+                    low = rest & -rest
+                    rest ^= low
+                    neighbours |= adjacency[low.bit_length() - 1]
+                subsets.append((subset, neighbours & ~subset))
+        subsets.sort(key=lambda pair: (bin(pair[0]).count('1'), pair[0]))
+        _connected_subsets_cache[key] = subsets
+    return _connected_subsets_cache[key]
+
+
+def find_minor_model(G_adjacency, H_adjacency, H_orbits=None):
+    """
+    Returns a list of disjoint connected sets of vertices of G (as bitsets), one for each vertex of H, such
+    that there is an edge of G between the sets of any two adjacent vertices of H, which shows that H is a
+    minor of G. Returns None if H is not a minor of G.
+    
+    The vertices of H are given branch sets one at a time in breadth first order, so that each branch set can
+    be chosen among the connected sets bordering the branch sets of its neighbours. Vertices of H with the
+    same neighbours (twins) are interchangeable, so their branch sets are only tried with their smallest
+    vertices in increasing order, and likewise for the first vertex and the rest of its orbit under the
+    automorphisms of H.
+    
+    :param G_adjacency: The adjacency bitsets of G, see get_adjacency_bitsets(). Only practical for graphs on
+            at most about 12 vertices, since every connected set of vertices of G is listed.
+    
+    :param H_adjacency: The adjacency bitsets of H.
+    
+    :param H_orbits: Optional argument. A list of lists of the (indices of the) vertices in each orbit of the
+            automorphism group of H.
+    """
+    n_G = len(G_adjacency)
+    n_H = len(H_adjacency)
+    if n_H == 0:
+        return []
+    degrees = [bin(adjacency).count('1') for adjacency in H_adjacency]
+    if n_H > n_G or sum(degrees) > sum(bin(adjacency).count('1') for adjacency in G_adjacency):
+        return None
+    
+    # Breadth first order of H, starting each component at a vertex of largest degree
+    order = []
+    placed = 0
+    while len(order) < n_H:
+        start = max((h for h in range(n_H) if not placed >> h & 1), key=lambda h: degrees[h])
+        queue = [start]
+        placed |= 1 << start
+        while queue:
+            h = queue.pop(0)
+            order.append(h)
+            for u in sorted((u for u in range(n_H) if H_adjacency[h] >> u & 1 and not placed >> u & 1),
+                            key=lambda u: -degrees[u]):
+                placed |= 1 << u
+                queue.append(u)
+    position = {h: idx for idx, h in enumerate(order)}
+    
+    # The earlier positions adjacent to each position, and the positions whose neighbours are not all placed
+    earlier = [[position[u] for u in range(n_H) if H_adjacency[h] >> u & 1 and position[u] < idx]
+               for idx, h in enumerate(order)]
+    last_neighbour = [max([position[u] for u in range(n_H) if H_adjacency[h] >> u & 1], default=-1) for h in order]
+    
+    # The previous position of a twin, whose branch set must have a smaller lowest vertex
+    twin_before = [-1]*n_H
+    for idx, h in enumerate(order):
+        for prev in range(idx - 1, -1, -1):
+            u = order[prev]
+            if (H_adjacency[u] & ~(1 << h)) == (H_adjacency[h] & ~(1 << u)):
+                twin_before[idx] = prev
+                break
+    first_orbit = set()
+    if H_orbits is not None:
+        for orbit in H_orbits:
+            if order[0] in orbit:
+                first_orbit = {position[u] for u in orbit if u != order[0]}
+    
+    subsets = _connected_subsets(tuple(G_adjacency))
+    full = (1 << n_G) - 1
+    branch = [0]*n_H
+    borders = [0]*n_H
+    
+    def search(idx, used):
+        if idx == n_H:
+            return True
+        free_count = bin(full & ~used).count('1')
+        for subset, neighbours in subsets:
+            if subset & used:
+                continue
+            size = bin(subset).count('1')
+            if free_count - size < n_H - idx - 1:
+                break
+            if bin(neighbours).count('1') < degrees[order[idx]]:
+                continue
+            if any(not neighbours & branch[prev] for prev in earlier[idx]):
+                continue
+            low = subset & -subset
+            if twin_before[idx] >= 0 and low < branch[twin_before[idx]] & -branch[twin_before[idx]]:
+                continue
+            if idx in first_orbit and low < branch[0] & -branch[0]:
+                continue
+            new_used = used | subset
+            branch[idx] = subset
+            borders[idx] = neighbours
+            # Every placed branch set with neighbours still to be placed must border a free vertex
+            if all(borders[prev] & ~new_used for prev in range(idx + 1) if last_neighbour[prev] > idx):
+                if search(idx + 1, new_used):
+                    return True
+        branch[idx] = 0
+        return False
+    
+    if not search(0, 0):
+        return None
+    return [branch[position[h]] for h in range(n_H)]
+
+
+def is_minor_model(G_adjacency, H_adjacency, model):
+    """
+    Returns True if model (a list of bitsets of vertices of G, one for each vertex of H, see find_minor_model())
+    is a set of disjoint connected branch sets with an edge of G between the branch sets of adjacent vertices
+    of H, i.e. a certificate that H is a minor of G.
+    
+    :param G_adjacency: The adjacency bitsets of G, see get_adjacency_bitsets().
+    
+    :param H_adjacency: The adjacency bitsets of H.
+    
+    :param model: A list of bitsets.
+    """
+    if len(model) != len(H_adjacency):
+        return False
+    
+    used = 0
+    borders = []
+    for subset in model:
+        if not subset or subset & used or subset >> len(G_adjacency):
+            return False
+        used |= subset
+        reached = subset & -subset
+        frontier = reached
+        neighbours = 0
+        while frontier:
+            low = frontier & -frontier
+            frontier ^= low
+            neighbours |= G_adjacency[low.bit_length() - 1]
+            new = G_adjacency[low.bit_length() - 1] & subset & ~reached
+            reached |= new
+            frontier |= new
+        if reached != subset:
+            return False
+        borders.append(neighbours)
+    
+    return all(borders[h] & model[u] for h in range(len(H_adjacency)) for u in range(len(H_adjacency))
+               if H_adjacency[h] >> u & 1)
+
+
+def get_minor_model(G, H):
+    """
+    Returns a dictionary whose keys are the vertices of H and whose values are lists of vertices of G (the
+    branch sets) showing that H is a minor of G, in the same form as Sage's Graph.minor(), or None if H is not
+    a minor of G. See find_minor_model().
+    
+    :param G: A graph object.
+    
+    :param H: A graph object.
+    """
+    G_vertices, G_adjacency = get_adjacency_bitsets(G)
+    H_vertices, H_adjacency = get_adjacency_bitsets(H)
+    H_orbits = None
+    if H.num_verts() > 1:
+        H_index = {v: idx for idx, v in enumerate(H_vertices)}
+        H_orbits = [[H_index[v] for v in orbit] for orbit in H.automorphism_group(orbits=True, return_group=False)]
+    
+    model = find_minor_model(G_adjacency, H_adjacency, H_orbits)
+    if model is None:
+        return None
+    return {H_vertices[h]: [G_vertices[v] for v in range(len(G_vertices)) if subset >> v & 1]
+            for h, subset in enumerate(model)}
+
 
+class MinorCache:
+    """
+    Cache of the answers of has_minor() indexed by the canonical graph6_strings of G and H, with the branch sets
+    (in the canonical labellings) of each minor found. The most recently used max_entries answers are kept in
+    memory, and every answer is kept in an SQLite database if filename is given, so that it can be shared
+    across sessions and by worker processes. Branch sets read from the database are checked with
+    is_minor_model() before they are trusted.
+    
+    :param filename: Optional argument. The SQLite database file. By default, answers are only kept in memory.
+    
+    :param max_entries: The number of answers kept in memory.
+    """
+    
+    def __init__(self, filename=None, max_entries=100000):
+        from collections import OrderedDict
+        
+        self.filename = filename
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._db = None
+        self._pid = None
+    
+    def _connection(self):
+        import os
+        import sqlite3
+        
+        if self.filename is None:
+            return None
+        # A connection cannot be shared with a forked worker process, so each process opens its own
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.filename, timeout=60)
+            self._pid = os.getpid()
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS minors (g_key TEXT NOT NULL, h_key TEXT NOT NULL, '
+                             'found INTEGER NOT NULL, model TEXT, PRIMARY KEY (g_key, h_key)) WITHOUT ROWID')
+        return self._db
+    
+    def _remember(self, key, answer):
+        self._memo[key] = answer
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+    
+    def get(self, g_key, h_key):
+        """
+        Returns (found, model) for the canonical graph6_strings g_key and h_key, where model is the list of
+        branch sets as bitsets if found is True, or None if the answer is not in the cache.
+        """
+        key = (g_key, h_key)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+        
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute('SELECT found, model FROM minors WHERE g_key = ? AND h_key = ?', key).fetchone()
+        if row is None:
+            return None
+        found = bool(row[0])
+        model = None if row[1] is None else [int(subset, 16) for subset in row[1].split(',') if subset]
+        if found and not is_minor_model(get_adjacency_bitsets(Graph(g_key))[1],
+                                        get_adjacency_bitsets(Graph(h_key))[1], model):
+            return None
         
+        self._remember(key, (found, model))
+        return found, model
+    
+    def put(self, g_key, h_key, found, model):
+        """
+        Records whether the graph with canonical graph6_string h_key is a minor of the graph with canonical
+        graph6_string g_key, and the branch sets (as bitsets) if it is.
+        """
+        self._remember((g_key, h_key), (found, model))
+        db = self._connection()
+        if db is not None:
+            db.execute('INSERT OR REPLACE INTO minors VALUES (?, ?, ?, ?)',
+                       (g_key, h_key, int(found), None if model is None else ','.join(f'{subset:x}' for subset in model)))
+            db.commit()
+    
+    def __len__(self):
+        db = self._connection()
+        if db is None:
+            return len(self._memo)
+        return db.execute('SELECT COUNT(*) FROM minors').fetchone()[0]
+    
+    def close(self):
+        if self._db is not None and self._pid is not None:
+            import os
+            if self._pid == os.getpid():
+                self._db.close()
+        self._db = None
+
+
+# The MinorCache used by has_minor() when none is given, see set_minor_cache(). None to not cache answers.
+MINOR_CACHE = None
 
-def has_minor(G, H):
+
+def set_minor_cache(filename=None, max_entries=100000):
+    """
+    Sets (and returns) the MinorCache used by has_minor() when none is given.
+    
+    :param filename: Optional argument. The SQLite database file in which to keep the answers. By default,
+            answers are only kept in memory.
+    
+    :param max_entries: The number of answers kept in memory.
+    """
+    global MINOR_CACHE
+    
+    if MINOR_CACHE is not None:
+        MINOR_CACHE.close()
+    MINOR_CACHE = MinorCache(filename, max_entries)
+    return MINOR_CACHE
+
+
+def has_minor(G, H, algorithm=None, certificate=False, cache=None):
     """
     Determines if graph H is a minor of graph G
     
     :param G: A graph object, graph6_string, or adjacency matrix for a graph.
     
     :param H: A graph object, graph6_string, or adjacency matrix for a graph.
-    """
-    g,_ = get_canonical_graph(G)
-    h,_ = get_canonical_graph(H)
+    
+    :param algorithm: Optional argument. Either 'bitset' to use get_minor_model(), or 'milp' to use Sage's
+            Graph.minor(). By default, MINOR_ALGORITHM.
+    
+    :param certificate: If True, returns (True, model) or (False, None) where model is a dictionary of the
+            branch sets in G of the vertices of H.
             
+    :param cache: Optional argument. The MinorCache in which to look up and record the answer. By default,
+            MINOR_CACHE. False to not use a cache.
+    """
+    if algorithm is None:
+        algorithm = MINOR_ALGORITHM
+    if cache is None:
+        cache = MINOR_CACHE
+    g = get_graph(G)
+    h = get_graph(H)
+    
+    if cache is not None and cache is not False:
+        # Answer for the canonical labellings, which are what the cache is indexed by
+        g_key = canonical_graph6(g)
+        h_key = canonical_graph6(h)
+        answer = cache.get(g_key, h_key)
+        if answer is None:
+            found, canonical_model = has_minor(Graph(g_key), Graph(h_key), algorithm, certificate=True, cache=False)
+            h_vertices = list(Graph(h_key))
+            answer = (found, None if canonical_model is None else
+                      [sum(1 << v for v in canonical_model[u]) for u in h_vertices])
+            cache.put(g_key, h_key, *answer)
+        found, bitsets = answer
+        if not certificate:
+            return found
+        if not found:
+            return False, None
+        # Translate the branch sets back to the vertices of G and H
+        g_relabel = g.canonical_label(algorithm='sage', certificate=True)[1]
+        h_relabel = h.canonical_label(algorithm='sage', certificate=True)[1]
+        g_vertex = {c: v for v, c in g_relabel.items()}
+        return True, {v: [g_vertex[c] for c in range(g.num_verts()) if bitsets[c_h] >> c & 1]
+                      for v, c_h in h_relabel.items()}
+    
+    if algorithm == 'milp':
+        try:
+            model = g.minor(h)
+        except ValueError:
+            model = None
+    elif algorithm == 'bitset':
+        model = get_minor_model(g, h)
+    else:
+        raise ValueError(f"algorithm must be 'bitset' or 'milp', not {algorithm!r}")
+    
+    if certificate:
+        return model is not None, model
+    return model is not None
+
+
+def benchmark_has_minor(pairs=None, algorithms=('bitset', 'milp'), repeat=1):
+    """
+    Prints and returns a dictionary of the total time in seconds that has_minor() takes to test every pair
+    (G, H) with each algorithm, and checks that the algorithms agree.
+    
+    :param pairs: Optional argument. A list of pairs (G, H) of graphs, graph6_strings or adjacency matrices.
+            By default, 20 random graphs on 9 vertices, each against K_4, K_5, K_{3,3} and the wheel on 6
+            vertices.
+    
+    :param algorithms: The algorithms to time, see has_minor().
+    
+    :param repeat: The number of times to test every pair with each algorithm. The best time is reported.
+    """
+    import time
+    
+    if pairs is None:
+        patterns = [graphs.CompleteGraph(4), graphs.CompleteGraph(5), graphs.CompleteBipartiteGraph(3, 3),
+                    graphs.WheelGraph(6)]
+        pairs = [(graphs.RandomGNP(9, 0.2 + 0.6*idx/19), H) for idx in range(20) for H in patterns]
+    pairs = [(get_graph(G), get_graph(H)) for G, H in pairs]
+    
+    times = {}
+    answers = {}
+    for algorithm in algorithms:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            answers[algorithm] = [has_minor(G, H, algorithm) for G, H in pairs]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times[algorithm] = best
+        print(f'{algorithm:>8}: {best:8.3f} s for {len(pairs)} pairs ({sum(answers[algorithm])} minors)')
+    
+    if len(set(tuple(answer) for answer in answers.values())) > 1:
+        print('Warning: the algorithms disagree')
+    
+    return times
+
+
+
+# Invariants that cannot increase when an edge is deleted or contracted (or an isolated vertex deleted), so a
+# graph H can only be a minor of G if every invariant of H is at most that of G. Planarity and outerplanarity
+# are recorded as 0 for (outer)planar graphs and 1 otherwise, so that they compare the same way.
+MINOR_INVARIANTS = ('num_verts', 'num_edges', 'cycle_rank', 'nonplanar', 'non_outerplanar', 'treewidth')
+_obstruction_indexes = {}
+
+
+def get_minor_invariants(G, treewidth=True):
+    """
+    Returns the tuple of the minor-monotone invariants of G listed in MINOR_INVARIANTS.
+    
+    :param G: A graph object.
+    
+    :param treewidth: If False, the treewidth (the most expensive invariant) is recorded as 0.
+    """
+    return (G.num_verts(),
+            G.num_edges(),
+            G.num_edges() - G.num_verts() + G.connected_components_number(),
+            0 if G.is_planar() else 1,
+            0 if G.is_circular_planar() else 1,
+            G.treewidth() if treewidth and G.num_verts() > 0 else 0)
+
+
+def get_obstruction_index(minimals_dict, spec_num, filename=None):
+    """
+    Returns the list of (minor invariants, graph6_string) of the graphs that are minor minimal with respect to
+    the spectator floor number spec_num, sorted by invariants. The index is built once per session for each
+    set of minimal graphs.
+    
+    :param minimals_dict: A dictionary of minor minimal graphs, see find_minimal_representation().
+    
+    :param spec_num: The spectator minor floor number.
+    
+    :param filename: Optional argument. A file in which the index for every spectator floor number is saved
+            the first time it is built and read from afterwards.
+    """
+    import os
+    
+    minimals = frozenset(minimals_dict[f'{spec_num}_spectators'])
+    if (spec_num, minimals) in _obstruction_indexes:
+        return _obstruction_indexes[(spec_num, minimals)]
+    
+    saved_index = {}
+    if filename is not None and os.path.exists(filename):
+        with open(filename, 'r') as infile:
+            saved_index = eval(infile.read())
+    
+    index = saved_index.get(f'{spec_num}_spectators')
+    if index is None or set(g6_str for invariants, g6_str in index) != minimals:
+        index = sorted((get_minor_invariants(Graph(g6_str)), g6_str) for g6_str in minimals)
+        if filename is not None:
+            saved_index[f'{spec_num}_spectators'] = index
+            with open(filename, 'w') as outfile:
+                outfile.write(str(saved_index))
+    
+    _obstruction_indexes[(spec_num, minimals)] = index
+    return index
+
+
+def get_minor_candidates(G, index):
+    """
+    Returns the list of graph6_strings in the obstruction index (see get_obstruction_index()) of the graphs that
+    could be proper minors of G, i.e. the graphs whose minor invariants are all at most those of G and that
+    have fewer vertices or fewer edges than G. The treewidth of G is only computed if there are candidates
+    left after comparing the other invariants.
+    
+    :param G: A graph object.
+    
+    :param index: An obstruction index.
+    """
+    G_invariants = get_minor_invariants(G, treewidth=False)
+    candidates = [(invariants, g6_str) for invariants, g6_str in index
+                  if all(h <= g for h, g in zip(invariants[:-1], G_invariants[:-1]))
+                  and invariants[:2] != G_invariants[:2]]
+    if candidates:
+        G_treewidth = get_minor_invariants(G)[-1]
+        candidates = [(invariants, g6_str) for invariants, g6_str in candidates if invariants[-1] <= G_treewidth]
+    
+    return [g6_str for invariants, g6_str in candidates]
+
+
+
+def _minor_test(args):
+    """
+    Returns (H_str, True) if the graph with graph6_string H_str is a minor of the graph with graph6_string
+    g6_str, (H_str, False) if it is not, and (H_str, None) if the test took longer than timeout seconds.
+    """
+    g6_str, H_str, timeout = args
+    G = Graph(g6_str)
+    H = Graph(H_str)
+    
+    if timeout is None:
+        return H_str, has_minor(G, H)
+    
+    from cysignals.alarm import alarm, cancel_alarm, AlarmInterrupt
+    
     try:
-        m = g.minor(h)
-        return True
-    except:
-        return False
+        alarm(timeout)
+        try:
+            found = has_minor(G, H)
+        finally:
+            cancel_alarm()
+    except AlarmInterrupt:
+        return H_str, None
+    return H_str, found
+
+
+def find_minor(G, candidates, processes=None, timeout=None):
+    """
+    Returns the graph6_string of the first graph in candidates found to be a minor of G, or None if none of
+    them are minors of G. 
+    
+    Candidates are tested in the order given, so smaller graphs (which are both more likely to be minors and
+    quicker to test) should come first, as they do in get_minor_candidates(). With more than one process, the
+    candidates are tested by a pool of worker processes, and every worker is stopped as soon as one of them
+    finds a minor, so the graph returned is not always the first minor in candidates.
+    
+    :param G: A graph object.
     
+    :param candidates: A list of graph6_strings.
     
+    :param processes: Optional argument. The number of worker processes. By default, the candidates are
+            tested one at a time in this process.
+    
+    :param timeout: Optional argument. The number of seconds after which a single test is put aside. Tests that
+            were put aside are run again without a time limit once every other candidate has been tested, so
+            the answer does not depend on the timeout.
+    """
+    g6_str = G.graph6_string()
+    tasks = [(g6_str, H_str, timeout) for H_str in candidates]
+    timed_out = []
+    
+    if processes is None or processes <= 1:
+        for task in tasks:
+            H_str, found = _minor_test(task)
+            if found:
+                return H_str
+            if found is None:
+                timed_out.append(H_str)
+    else:
+        from multiprocessing import Pool
+        
+        pool = Pool(processes)
+        try:
+            for H_str, found in pool.imap_unordered(_minor_test, tasks):
+                if found:
+                    return H_str
+                if found is None:
+                    timed_out.append(H_str)
+        finally:
+            # Stop the workers that are still testing other candidates
+            pool.terminate()
+            pool.join()
+    
+    for H_str in timed_out:
+        if _minor_test((g6_str, H_str, None))[1]:
+            return H_str
+    return None
 
-def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None):
+
+
+def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None, index_filename=None, processes=None,
+                                  timeout=None):
     """
     Determines if the graph, G, passed in as an argument is minor minimal, if G is minor minimal, then its
     graph6_string is returned. If G is not minor minimal, then the function returns the graph6_string of
     a minor of G which has the same spectator minor floor number as G and is minor minimal with respect to
     that spectator minor floor number.
     
-    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most 10 vertices
+    :param graph: A graph, graph6_string, or adjacency matrix for a connected graph on at most MAX_VERTS vertices
     
     :param uspcm_dict: Optional argument. A dictionary of spectator floor numbers, either the complete 
             dictionary or partial dictionary with the spectator floor numbers for graphs on the same number 
@@ -393,11 +2829,21 @@ def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None):
             spectator minor floor number and the associated value is the set of graphs which are minor 
             minimal with respect to that spectator minor floor number. If not provided, then the
             read_minor_minimals() function will be used to fetch the dictionary from the github repo.
+            
+    :param index_filename: Optional argument. The file in which the obstruction index is saved, see
+            get_obstruction_index(). Only the minimal graphs whose minor-monotone invariants allow them to be
+            minors of G are tested with has_minor().
+            
+    :param processes: Optional argument. The number of worker processes that test the minimal graphs, see
+            find_minor().
+    
+    :param timeout: Optional argument. The number of seconds after which a single minor test is put aside
+            until the other minimal graphs have been tested, see find_minor().
     """
     G, g6_str = get_canonical_graph(graph)
         
-    if G.num_verts() > 10 or G.is_connected() == False:
-        return "This function only works for connected graphs on at most 10 vertices"
+    if G.num_verts() > MAX_VERTS or G.is_connected() == False:
+        return f'This function only works for connected graphs on at most {MAX_VERTS} vertices'
 
     num_verts = G.num_verts()
     num_edges = G.num_edges()
@@ -414,13 +2860,14 @@ def find_minimal_representation(graph, uspcm_dict=None, minimals_dict=None):
         else:
             G.show(title = f'G: {g6_str}, spec_floor = {G_spec_floor}')
         return g6_str
-    for H_str in minimals_dict[f'{G_spec_floor}_spectators']:
-        if has_minor(G, H_str):
-            print(f'{H_str} is a minor of {graph}, both have spectator floor of {G_spec_floor}, so {graph} is NOT minor-minimal')
-            ga = graphics_array((G.plot(title = f'G: {g6_str}, spec_floor = {G_spec_floor}'),
-                                Graph(H_str).plot(title = f'H: {H_str}, spec_floor = {G_spec_floor}')))
-            ga.show()
-            return H_str
+    index = get_obstruction_index(minimals_dict, G_spec_floor, index_filename)
+    H_str = find_minor(G, get_minor_candidates(G, index), processes, timeout)
+    if H_str is not None:
+        print(f'{H_str} is a minor of {graph}, both have spectator floor of {G_spec_floor}, so {graph} is NOT minor-minimal')
+        ga = graphics_array((G.plot(title = f'G: {g6_str}, spec_floor = {G_spec_floor}'),
+                            Graph(H_str).plot(title = f'H: {H_str}, spec_floor = {G_spec_floor}')))
+        ga.show()
+        return H_str
         
         
         
@@ -459,4 +2906,102 @@ def progressBar(iterable, prefix = '', suffix = '', decimals = 1, length = 100,
         yield item
         printProgressBar(i + 1)
     # Print New Line on Complete
-    print()
\ No newline at end of file
+    print()
+
+
+
+def benchmark_full_uspcm_dict(path_prefix='data', worker_counts=(1, 2, 4, 8, 16), max_verts=9, repeat=1):
+    """
+    Prints and returns a dictionary of the time in seconds that get_full_uspcm_dict() takes to fetch the
+    partitions of the uspcm_dict on at most max_verts vertices from a local HTTP server (python -m
+    http.server, in a separate process) serving path_prefix/uspcm_dict, for each number of requests in flight.
+    
+    :param path_prefix: The directory of the data whose uspcm_dict directory is served. By default, 'data'
+    
+    :param worker_counts: The numbers of requests in flight to time.
+    
+    :param max_verts: The largest number of vertices of the graphs to fetch.
+    
+    :param repeat: The number of times to fetch the dictionary for each number of workers. The best time is
+            reported.
+    """
+    import socket
+    import subprocess
+    import sys
+    import time
+    
+    # The server runs in its own process, so that it does not share the GIL with the threads being timed
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen([sys.executable, '-m', 'http.server', str(port), '--bind', '127.0.0.1',
+                               '--directory', f'{path_prefix}/uspcm_dict'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url_path = f'http://127.0.0.1:{port}'
+    
+    times = {}
+    try:
+        # Wait for the server to accept connections
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError(f'The HTTP server exited with code {server.returncode}')
+                time.sleep(0.05)
+        
+        for workers in worker_counts:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                get_full_uspcm_dict(url_path, max_workers=workers, max_verts=max_verts)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[workers] = best
+            print(f'{workers:>3} in flight  {best:8.3f} s  ({times[worker_counts[0]] / best:.2f}x)')
+    finally:
+        server.terminate()
+        server.wait()
+    
+    return times
+
+
+def benchmark_spectator_numbers(num_verts, num_edges, path_prefix='data', batch_size=16384, repeat=1):
+    """
+    Prints and returns a dictionary of the time in seconds to compute the spectator number of every graph in
+    the partition of the uspcm_dict on num_verts vertices and num_edges edges, one graph at a time with
+    spectator_number() ('loop') and all together with get_spectator_numbers() ('batch'). Raises a ValueError
+    if the two disagree on any graph.
+    
+    :param path_prefix: The directory in which to find the partitioned files. By default, 'data'
+    
+    :param batch_size: See get_spectator_numbers().
+    
+    :param repeat: The number of times to compute the spectator numbers each way. The best time is reported.
+    """
+    import time
+    
+    g6_strings = list(read_partial_uspcm_dict(num_verts, num_edges, path_prefix))
+    keys = graph6_to_keys(g6_strings)
+    
+    times = {}
+    results = {}
+    for method in ('loop', 'batch'):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if method == 'loop':
+                results[method] = [spectator_number(g6_str) for g6_str in g6_strings]
+            else:
+                results[method] = get_spectator_numbers(keys, num_verts, batch_size).tolist()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times[method] = best
+        speedup = times['loop'] / best if best else float('inf')
+        print(f'{len(g6_strings)} graphs, {method:>5}  {best:8.3f} s  ({speedup:.2f}x)')
+    
+    if results['loop'] != results['batch']:
+        raise ValueError(f'The spectator numbers of {num_verts}_verts {num_edges}_edges disagree')
+    
+    return times
@@ -5,7 +5,534 @@ def Glabel(G):
     
     :param G: A graph object.
     """
-    return G.canonical_label(algorithm='sage')().graph6_string()
+    return G.canonical_label(algorithm='sage').graph6_string()
+
+
+# The largest number of vertices of the graphs in the dictionaries, see set_max_verts().
+MAX_VERTS = 10
+
+
+def set_max_verts(max_verts):
+    """
+    Sets the largest number of vertices of the graphs in the dictionaries built by the init_* functions,
+    build_manifest() and LazyPartitionDict, and of the graphs processed by spec_floor_layers() and
+    build_minor_lattice(). Partitions on 11 vertices are too large to hold in memory, see the sharded
+    partitions below.
+    
+    :param max_verts: At most GRAPH_KEY_MAX_VERTS, so that every graph fits in a 64-bit key.
+    """
+    global MAX_VERTS
+    
+    if not 1 <= max_verts <= GRAPH_KEY_MAX_VERTS:
+        raise ValueError(f'max_verts must be between 1 and {GRAPH_KEY_MAX_VERTS}, not {max_verts}')
+    MAX_VERTS = max_verts
+
+
+##########################################################################################
+############################### Checkpoint Journal #######################################
+##########################################################################################
+
+def get_journal_filename(dict_name, num_verts, num_edges, path_prefix='data'):
+    """
+    Returns the name of the append-only journal file for the seen_dict or completed_dict partition of graphs
+    on num_verts vertices and num_edges edges.
+    
+    :param dict_name: Either 'seen_dict' or 'completed_dict'.
+    
+    :param num_verts: The number of vertices that each graph listed in the journal contains.
+    
+    :param num_edges: The number of edges that each graph listed in the journal contains.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    return f'{path_prefix}/{dict_name}/{dict_name}_{num_verts}_verts_{num_edges}_edges.journal'
+
+
+def read_journal(filename):
+    """
+    Returns the set of graph6_strings recorded in a journal file, or an empty set if there is no journal.
+    
+    Every entry is written as a single line, so a final line without a newline was cut off by an interruption
+    while it was being appended and is ignored.
+    
+    :param filename: The name of the journal file.
+    """
+    try:
+        with open(filename, 'r') as infile:
+            lines = infile.read().split('\n')
+    except FileNotFoundError:
+        return set()
+    
+    # The last element is '' if the journal ends with a complete line, otherwise it is a torn entry
+    return set(line for line in lines[:-1] if line)
+
+
+def append_journal(filename, g6_strings):
+    """
+    Appends graph6_strings to a journal file, one per line, and returns the number of entries in the journal.
+    
+    The cost only depends on the number of graph6_strings appended, not on the size of the partition. The
+    number of entries is worked out from the size of the file since every graph6_string in a partition has
+    the same length.
+    
+    :param filename: The name of the journal file.
+    
+    :param g6_strings: An iterable of graph6_strings.
+    """
+    import os
+    
+    g6_strings = list(g6_strings)
+    if not g6_strings:
+        return 0
+    
+    entry_size = len(g6_strings[0]) + 1
+    try:
+        size = os.path.getsize(filename)
+        if size % entry_size:
+            # Drop an entry that was cut off by an interruption so the new entries start on their own line
+            os.truncate(filename, size - size % entry_size)
+    except FileNotFoundError:
+        pass
+    
+    with open(filename, 'a') as outfile:
+        outfile.write(''.join(g6_str + '\n' for g6_str in g6_strings))
+        size = outfile.tell()
+        
+    return size // entry_size
+
+
+def remove_journal(filename):
+    """
+    Deletes a journal file once its entries have been compacted into the partition file.
+    
+    :param filename: The name of the journal file.
+    """
+    import os
+    
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+
+##########################################################################################
+#################################### Manifest ############################################
+##########################################################################################
+
+# Each data directory has a single manifest.json that records, for every partition of the uspcm_dict,
+# seen_dict, completed_dict and minimals_dict, its status together with the number of entries, the size
+# and the checksum of the partition file. It has the same nesting as the dictionaries, e.g.
+# manifest['seen_dict']['4_verts']['5_edges'] = {'status': 'complete', 'entries': 5, 'bytes': 40, 'checksum': '1c291ca3'}
+# The manifest is only written when a partition is started, compacted (see write_partial_seen_dict()) or
+# completed, not at every save, so the size and checksum of a partition whose file is still being rewritten
+# are not recorded.
+PARTITION_PENDING = 'pending'
+PARTITION_IN_PROGRESS = 'in-progress'
+PARTITION_COMPLETE = 'complete'
+
+# Manifests that have been read, keyed by path_prefix, along with the modification time and size of the
+# file when it was read so that a manifest updated by another process is read again.
+_manifest_cache = {}
+
+
+def get_manifest_filename(path_prefix='data'):
+    """
+    Returns the name of the manifest file of the data directory.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    return f'{path_prefix}/manifest.json'
+
+
+def read_manifest(path_prefix='data'):
+    """
+    Returns the manifest of the data directory, or None if the data directory does not have a manifest yet
+    (see build_manifest()).
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    import json
+    import os
+    
+    filename = get_manifest_filename(path_prefix)
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    
+    cached = _manifest_cache.get(path_prefix)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+    
+    with open(filename, 'r') as infile:
+        manifest = json.load(infile)
+    _manifest_cache[path_prefix] = ((stat.st_mtime_ns, stat.st_size), manifest)
+    
+    return manifest
+
+
+def write_manifest(manifest, path_prefix='data'):
+    """
+    Writes the manifest of the data directory. The manifest is written to a temporary file which then
+    replaces the old manifest, so an interruption leaves either the old or the new manifest, never a
+    partially written one.
+    
+    :param manifest: The manifest dictionary.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    import json
+    import os
+    
+    filename = get_manifest_filename(path_prefix)
+    with open(filename + '.tmp', 'w') as outfile:
+        json.dump(manifest, outfile, sort_keys=True)
+        outfile.flush()
+        os.fsync(outfile.fileno())
+    os.replace(filename + '.tmp', filename)
+    
+    stat = os.stat(filename)
+    _manifest_cache[path_prefix] = ((stat.st_mtime_ns, stat.st_size), manifest)
+
+
+def get_checksum(data):
+    """
+    Returns the checksum (CRC-32, as 8 hexadecimal digits) of the bytes of a partition file.
+    
+    :param data: The contents of the file, as bytes or str.
+    """
+    import zlib
+    
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    return f'{zlib.crc32(data):08x}'
+
+
+def get_file_checksum(filename):
+    """
+    Returns the checksum (see get_checksum()) of a partition file, reading it in chunks.
+    
+    :param filename: The name of the file.
+    """
+    import zlib
+    
+    crc = 0
+    with open(filename, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1 << 20), b''):
+            crc = zlib.crc32(chunk, crc)
+    return f'{crc:08x}'
+
+
+def update_manifest(dict_name, num_verts, num_edges, filename, num_entries, path_prefix='data', status=None):
+    """
+    Records the number of entries, size and checksum of a partition file that has just been written.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param num_verts: The number of vertices of the graphs in the partition.
+    
+    :param num_edges: The number of edges of the graphs in the partition.
+    
+    :param filename: The name of the partition file that was written.
+    
+    :param num_entries: The number of graphs in the partition.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    
+    :param status: Optional argument. The new status of the partition. By default, a partition that is
+            already complete stays complete and any other partition becomes in-progress.
+            
+    The size and checksum of a binary (.bin) partition file are recorded as 'bin_bytes' and 'bin_checksum', so
+    that they do not replace those of the text file of the same partition.
+    """
+    import os
+    
+    # Other worker processes may be updating the manifest at the same time (see WorkQueue)
+    with FileLock(get_manifest_filename(path_prefix) + '.lock'):
+        manifest = read_manifest(path_prefix) or {}
+        entry = manifest.setdefault(dict_name, {}).setdefault(f'{num_verts}_verts', {}).setdefault(f'{num_edges}_edges', {})
+        
+        if status is None:
+            status = PARTITION_COMPLETE if entry.get('status') == PARTITION_COMPLETE else PARTITION_IN_PROGRESS
+        entry['status'] = status
+        entry['entries'] = int(num_entries)
+        prefix = 'bin_' if filename.endswith('.bin') else ''
+        entry[prefix + 'bytes'] = os.path.getsize(filename)
+        entry[prefix + 'checksum'] = get_file_checksum(filename)
+        
+        write_manifest(manifest, path_prefix)
+
+
+def get_partition_status(dict_name, num_verts, num_edges, path_prefix='data'):
+    """
+    Returns the status ('pending', 'in-progress' or 'complete') of a partition recorded in the manifest, or
+    None if the data directory has no manifest or the manifest has no record of the partition.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param num_verts: The number of vertices of the graphs in the partition.
+    
+    :param num_edges: The number of edges of the graphs in the partition.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    manifest = read_manifest(path_prefix) or {}
+    entry = manifest.get(dict_name, {}).get(f'{num_verts}_verts', {}).get(f'{num_edges}_edges')
+    
+    return None if entry is None else entry['status']
+
+
+def get_partition_entries(dict_name, num_verts, num_edges, path_prefix='data'):
+    """
+    Returns the number of entries of the partition file recorded in the manifest, or 0 if the data directory
+    has no manifest or the manifest has no record of the partition file.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param num_verts: The number of vertices of the graphs in the partition.
+    
+    :param num_edges: The number of edges of the graphs in the partition.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    manifest = read_manifest(path_prefix) or {}
+    entry = manifest.get(dict_name, {}).get(f'{num_verts}_verts', {}).get(f'{num_edges}_edges', {})
+    
+    return entry.get('entries', 0)
+
+
+def mark_partition_in_progress(dict_name, num_verts, num_edges, path_prefix='data'):
+    """
+    Records in the manifest that a partition file is about to be rewritten: a pending partition becomes
+    in-progress, and the size and checksum recorded for the partition files are dropped since they will no
+    longer match. The manifest is only written if this changes it, so this can be called at every save.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param num_verts: The number of vertices of the graphs in the partition.
+    
+    :param num_edges: The number of edges of the graphs in the partition.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    manifest = read_manifest(path_prefix) or {}
+    entry = manifest.get(dict_name, {}).get(f'{num_verts}_verts', {}).get(f'{num_edges}_edges', {})
+    if entry.get('status') in (PARTITION_IN_PROGRESS, PARTITION_COMPLETE) and 'checksum' not in entry and 'bin_checksum' not in entry:
+        return
+    
+    with FileLock(get_manifest_filename(path_prefix) + '.lock'):
+        manifest = read_manifest(path_prefix) or {}
+        entry = manifest.setdefault(dict_name, {}).setdefault(f'{num_verts}_verts', {}).setdefault(f'{num_edges}_edges', {})
+        if entry.get('status') != PARTITION_COMPLETE:
+            entry['status'] = PARTITION_IN_PROGRESS
+        for key in ('bytes', 'checksum', 'bin_bytes', 'bin_checksum'):
+            entry.pop(key, None)
+        
+        write_manifest(manifest, path_prefix)
+
+
+def mark_partition_complete(dict_name, num_verts, num_edges, path_prefix='data', num_entries=None):
+    """
+    Records in the manifest that a partition has been completely processed, so that it is skipped (and
+    does not have to be loaded) when the computation is resumed, together with the size and checksum of its
+    primary partition files as they are now.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param num_verts: The number of vertices of the graphs in the partition.
+    
+    :param num_edges: The number of edges of the graphs in the partition.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    
+    :param num_entries: Optional argument. The number of graphs in the partition. By default, the number
+            already recorded (if any) is kept.
+    """
+    import os
+    
+    filename = f'{path_prefix}/{dict_name}/{dict_name}_{num_verts}_verts_{num_edges}_edges'
+    with FileLock(get_manifest_filename(path_prefix) + '.lock'):
+        manifest = read_manifest(path_prefix) or {}
+        entry = manifest.setdefault(dict_name, {}).setdefault(f'{num_verts}_verts', {}).setdefault(f'{num_edges}_edges', {})
+        entry['status'] = PARTITION_COMPLETE
+        if num_entries is not None:
+            entry['entries'] = int(num_entries)
+        for extension, prefix in (('.txt', ''), ('.bin', 'bin_')):
+            if os.path.exists(filename + extension):
+                entry[prefix + 'bytes'] = os.path.getsize(filename + extension)
+                entry[prefix + 'checksum'] = get_file_checksum(filename + extension)
+        
+        write_manifest(manifest, path_prefix)
+
+
+def checksum_matches_manifest(dict_name, num_verts, num_edges, data, path_prefix='data'):
+    """
+    Returns False if the manifest records a different checksum for the partition than the checksum of data,
+    which means the primary partition file was not completely written. Returns True otherwise, including when
+    there is nothing to check against.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param num_verts: The number of vertices of the graphs in the partition.
+    
+    :param num_edges: The number of edges of the graphs in the partition.
+    
+    :param data: The contents of the primary partition file.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    manifest = read_manifest(path_prefix) or {}
+    entry = manifest.get(dict_name, {}).get(f'{num_verts}_verts', {}).get(f'{num_edges}_edges', {})
+    
+    return 'checksum' not in entry or entry['checksum'] == get_checksum(data)
+
+
+def file_matches_manifest(dict_name, num_verts, num_edges, filename, path_prefix='data'):
+    """
+    Does the same as checksum_matches_manifest() for a binary (.bin) partition file, comparing the size of the
+    file before reading it to compute its checksum.
+    
+    :param filename: The name of the primary binary partition file.
+    
+    The other arguments are those of checksum_matches_manifest().
+    """
+    import os
+    
+    manifest = read_manifest(path_prefix) or {}
+    entry = manifest.get(dict_name, {}).get(f'{num_verts}_verts', {}).get(f'{num_edges}_edges', {})
+    if 'bin_checksum' not in entry:
+        return True
+    
+    return os.path.getsize(filename) == entry['bin_bytes'] and get_file_checksum(filename) == entry['bin_checksum']
+
+
+def get_last_manifest_numbers(dict_name, path_prefix='data'):
+    """
+    Returns the number of vertices and number of edges of the last partition of dict_name that has been
+    started, i.e. the largest number of vertices and, for that number of vertices, the smallest number of
+    edges of a partition that is not pending. This is what the get_last_*_dict_numbers() functions work out
+    from the names of the files, but only reads the manifest.
+    
+    Returns None if the data directory has no manifest or the manifest has no record of dict_name.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    manifest = read_manifest(path_prefix)
+    if manifest is None or dict_name not in manifest:
+        return None
+    
+    started = [(int(vert_key.split('_')[0]), int(edge_key.split('_')[0]))
+               for vert_key, edge_dict in manifest[dict_name].items()
+               for edge_key, entry in edge_dict.items() if entry['status'] != PARTITION_PENDING]
+    if not started:
+        return (0, 0)
+    
+    max_n = max(nn for nn, ee in started)
+    return (max_n, min(ee for nn, ee in started if nn == max_n))
+
+
+def get_resume_point(path_prefix='data'):
+    """
+    Returns the number of vertices and number of edges of the first partition (in the order in which they
+    are processed: increasing number of vertices, decreasing number of edges) that has not been completely
+    processed by both passes, i.e. the values to use for start_n and shortcut_edges when resuming. Only the
+    manifest is read. Returns None if the data directory has no manifest.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    manifest = read_manifest(path_prefix)
+    if manifest is None:
+        return None
+    
+    nn = 2
+    while True:
+        for ee in range(nn*(nn-1)//2, 0, -1):
+            for dict_name in ['seen_dict', 'completed_dict']:
+                if get_partition_status(dict_name, nn, ee, path_prefix) != PARTITION_COMPLETE:
+                    return (nn, ee)
+        nn += 1
+
+
+def list_partition_files(dict_name, path_prefix='data'):
+    """
+    Returns a dictionary whose keys are (num_verts, num_edges) and whose values are the names of the primary
+    partition files of dict_name found in the data directory.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict', 'completed_dict' or 'minimals_dict'.
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    """
+    import os
+    
+    partition_files = {}
+    for filename in os.listdir(f'{path_prefix}/{dict_name}'):
+        if not (filename.endswith('_edges.txt') or filename.endswith('_edges.bin')):
+            continue
+        num_verts = int(filename[len(dict_name) + 1:filename.index('_verts_')])
+        num_edges = int(filename[filename.index('_verts_') + len('_verts_'):filename.index('_edges')])
+        # Prefer the text file if both exist, it is the one that the other files are converted from
+        if (num_verts, num_edges) not in partition_files or filename.endswith('.txt'):
+            partition_files[(num_verts, num_edges)] = f'{path_prefix}/{dict_name}/{filename}'
+    
+    return partition_files
+
+
+def build_manifest(path_prefix='data', max_verts=None):
+    """
+    Builds the manifest of a data directory from the partition files it already contains. Every partition
+    before the last partition of each dictionary is recorded as complete, the last one as in-progress, and
+    partitions on at most max_verts vertices without a file as pending. This reads every partition file once,
+    afterwards the writers keep the manifest up to date (see mark_partition_in_progress() and
+    mark_partition_complete()).
+    
+    :param path_prefix: The directory in which the partitioned files are saved. By default, 'data'
+    
+    :param max_verts: Optional argument. The largest number of vertices of the graphs that will be processed.
+            By default, MAX_VERTS.
+    """
+    import os
+    
+    if max_verts is None:
+        max_verts = MAX_VERTS
+    
+    manifest = {}
+    for dict_name in ['uspcm_dict', 'seen_dict', 'completed_dict', 'minimals_dict']:
+        manifest[dict_name] = {}
+        for nn in range(max_verts + 1):
+            manifest[dict_name][f'{nn}_verts'] = {}
+            for ee in (range(nn*(nn-1)//2, 0, -1) if nn >= 2 else [0]):
+                manifest[dict_name][f'{nn}_verts'][f'{ee}_edges'] = {'status': PARTITION_PENDING}
+        
+        if not os.path.isdir(f'{path_prefix}/{dict_name}'):
+            continue
+        partition_files = list_partition_files(dict_name, path_prefix)
+        if not partition_files:
+            continue
+        
+        max_n = max(nn for nn, ee in partition_files)
+        last_edges = min(ee for nn, ee in partition_files if nn == max_n)
+        for (nn, ee), filename in partition_files.items():
+            if filename.endswith('.bin'):
+                with UspcmPartition(filename) as partition:
+                    num_entries = len(partition)
+            else:
+                with open(filename, 'r') as infile:
+                    num_entries = len(eval(infile.read()))
+            
+            prefix = 'bin_' if filename.endswith('.bin') else ''
+            manifest[dict_name].setdefault(f'{nn}_verts', {})[f'{ee}_edges'] = {
+                'status': PARTITION_IN_PROGRESS if (nn, ee) == (max_n, last_edges) else PARTITION_COMPLETE,
+                'entries': num_entries,
+                prefix + 'bytes': os.path.getsize(filename),
+                prefix + 'checksum': get_file_checksum(filename)}
+    
+    write_manifest(manifest, path_prefix)
+    
+    return manifest
+
 
 
 ##########################################################################################
@@ -25,9 +552,15 @@ def get_last_seen_dict_numbers(path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, saves these files in a directory called 'data'
+            
+    If the data directory has a manifest, only the manifest is read instead of the names of the files.
     """
     import os
     
+    manifest_numbers = get_last_manifest_numbers('seen_dict', path_prefix)
+    if manifest_numbers is not None:
+        return manifest_numbers
+    
     files_list = os.listdir(path_prefix + '/seen_dict')
     max_n = 0
     for filename in files_list:
@@ -41,10 +574,8 @@ def get_last_seen_dict_numbers(path_prefix='data'):
     for filename in files_list:
         if f'_{max_n}_verts' in filename:
             start_idx = filename.find('_verts_') + len('_verts_')
-            try:
-                stop_idx = filename.index('_edges-backup.txt')
-            except ValueError:
-                stop_idx = filename.index('_edges.txt')
+            # Handles the partition files, their backups, and the journal of a partially finished partition
+            stop_idx = filename.index('_edges')
             if int(filename[start_idx:stop_idx]) < edges:
                 edges = int(filename[start_idx:stop_idx])
 
@@ -54,8 +585,8 @@ def get_last_seen_dict_numbers(path_prefix='data'):
 
 def read_partial_seen_dict(num_verts, num_edges, path_prefix='data'):
     """
-    Reads a file (or backup) containing a set of graph6_strings of graphs on num_verts vertices 
-    and num_edges edges whose spectator minor floor number has been calculated and saved.
+    Reads a file (or backup) and its journal containing a set of graph6_strings of graphs on num_verts
+    vertices and num_edges edges whose spectator minor floor number has been calculated and saved.
     
     :param num_verts: The number of vertices that each graph listed in the file contains.
     
@@ -64,15 +595,33 @@ def read_partial_seen_dict(num_verts, num_edges, path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, reads looks for these files in a directory called 'data'
+            
+    Any graph6_strings appended to the journal of the partition since it was last written are added to the
+    returned set.
     """
+    import os
+    
+    journal_filename = get_journal_filename('seen_dict', num_verts, num_edges, path_prefix)
     try:
         # Try the primary file
         with open(f'{path_prefix}/seen_dict/seen_dict_{num_verts}_verts_{num_edges}_edges.txt', 'r') as infile:
-            return eval(infile.read())
+            text = infile.read()
+        if not checksum_matches_manifest('seen_dict', num_verts, num_edges, text, path_prefix):
+            raise ValueError('The primary file was not completely written')
+        partial_seen_dict = eval(text)
     except:
-        # If primary file is corrupted (empty), try backup
-        with open(f'{path_prefix}/seen_dict/seen_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'r') as infile:
-            return eval(infile.read())
+        try:
+            # If primary file is corrupted (empty), try backup
+            with open(f'{path_prefix}/seen_dict/seen_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'r') as infile:
+                partial_seen_dict = eval(infile.read())
+        except FileNotFoundError:
+            # The partition has not been compacted yet, so everything is in the journal
+            if not os.path.exists(journal_filename):
+                raise
+            partial_seen_dict = set()
+    
+    # Replay the graphs appended since the partition file was last written
+    return partial_seen_dict | read_journal(journal_filename)
         
         
 def write_partial_seen_dict(num_verts, num_edges, seen_dict, path_prefix='data'):
@@ -90,16 +639,65 @@ def write_partial_seen_dict(num_verts, num_edges, seen_dict, path_prefix='data')
     :param path_prefix: The directory in which to save the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, saves these files in a directory called 'data'
+            
+    Since the file contains every graph in the partition, this also compacts (deletes) the journal that
+    append_partial_seen_dict() has been adding to.
     """
     with open(f'{path_prefix}/seen_dict/seen_dict_{num_verts}_verts_{num_edges}_edges.txt', 'w') as outfile:
         outfile.write(str(seen_dict[f'{num_verts}_verts'][f'{num_edges}_edges']))
     
+    # Record the primary file in the manifest before the backup is overwritten
+    update_manifest('seen_dict', num_verts, num_edges,
+                    f'{path_prefix}/seen_dict/seen_dict_{num_verts}_verts_{num_edges}_edges.txt',
+                    len(seen_dict[f'{num_verts}_verts'][f'{num_edges}_edges']), path_prefix)
+    
     # In case there's an interuption while the connection is open, make a backup
     with open(f'{path_prefix}/seen_dict/seen_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'w') as outfile:
-        outfile.write(str(seen_dict[f'{num_verts}_verts'][f'{num_edges}_edges'])) 
+        outfile.write(str(seen_dict[f'{num_verts}_verts'][f'{num_edges}_edges']))
+    
+    # Everything in the journal is now in the partition file
+    remove_journal(get_journal_filename('seen_dict', num_verts, num_edges, path_prefix))
+        
+        
+def append_partial_seen_dict(num_verts, num_edges, g6_strings, seen_dict, path_prefix='data', compact_min=1000,
+                             compact=True):
+    """
+    Checkpoints newly seen graphs by appending their graph6_strings to the journal of the partition of
+    graphs on num_verts vertices and num_edges edges, instead of rewriting the whole partition file. Once the
+    journal holds at least compact_min entries and at least as many entries as the partition file, it is
+    compacted into the partition file by write_partial_seen_dict(). The partition file at least doubles at each
+    compaction, so there are only logarithmically many compactions and the journal that is replayed on a
+    resume is never much larger than the file.
+    
+    :param num_verts: The number of vertices that each graph in g6_strings contains.
+    
+    :param num_edges: The number of edges that each graph in g6_strings contains.
+    
+    :param g6_strings: An iterable of graph6_strings that have already been added to
+            seen_dict[f'{num_verts}_verts'][f'{num_edges}_edges'].
+    
+    :param seen_dict: A nested dictionary that contains sets of graphs whose spectator minor floor number
+            has been calculated.
+    
+    :param path_prefix: The directory in which to save the partitioned files. By default, 'data'
+    
+    :param compact_min: The smallest journal that will be compacted into the partition file.
+    
+    :param compact: If False, the graphs are only appended to the journal. Compacting writes every graph in
+            seen_dict[f'{num_verts}_verts'][f'{num_edges}_edges'], so it must only be allowed once everything
+            that those graphs depend on has been saved.
+    """
+    journal_filename = get_journal_filename('seen_dict', num_verts, num_edges, path_prefix)
+    num_entries = append_journal(journal_filename, g6_strings)
+    
+    # The number of graphs in the partition file when it was last written
+    num_compacted = get_partition_entries('seen_dict', num_verts, num_edges, path_prefix)
+    if compact and num_entries >= max(compact_min, num_compacted):
+        write_partial_seen_dict(num_verts, num_edges, seen_dict, path_prefix)
         
 
-def init_seen_dict(path_prefix='data'):
+def init_seen_dict(path_prefix='data', load_complete=True, lazy=False, memory_budget=None,
+                   workers=None):
     """
     Returns the nested dictionary containing lists of graph6_strings of graphs whose spectator minor
     floor number has been calculated and saved after rebuilding this dictionary from the partitioned
@@ -113,12 +711,31 @@ def init_seen_dict(path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, reads looks for these files in a directory called 'data'
+            
+    :param load_complete: If False, partitions that the manifest records as complete are left as empty sets
+            instead of being read, since resuming the computation only needs the partitions that are not
+            complete (see get_resume_point()). Has no effect if the data directory has no manifest.
+            
+    :param lazy: If True, returns a LazyPartitionDict that reads each partition the first time it is accessed
+            instead of reading every partition now.
+    
+    :param memory_budget: Optional argument, only used if lazy is True. The number of bytes of complete
+            partitions to keep in memory, see LazyPartitionDict.
+    
+    :param workers: Optional argument. The number of worker processes (or threads) used to read the
+            partitions, see load_partitions(). By default, the partitions are read one after another.
     """
     max_n, edcount = get_last_seen_dict_numbers(path_prefix)
+    
+    if lazy:
+        seen_dict = LazyPartitionDict('seen_dict', read_partial_seen_dict, set, max_n, edcount, path_prefix, memory_budget)
+        seen_dict['0_verts']['0_edges'] = set(Glabel(Graph(0)))
+        seen_dict['1_verts']['0_edges'] = set(Glabel(Graph(1)))
+        return seen_dict
 
-    vertex_keys = [f'{nn}_verts' for nn in range(11)]
-    seen_dict = dict(zip(vertex_keys, [{} for nn in range(11)]))
-    for nn in range(11):
+    vertex_keys = [f'{nn}_verts' for nn in range(MAX_VERTS + 1)]
+    seen_dict = dict(zip(vertex_keys, [{} for nn in range(MAX_VERTS + 1)]))
+    for nn in range(MAX_VERTS + 1):
         edge_dict_keys = [f"{ee}_edges" for ee in range(Integer((nn*(nn-1))/2), 0, -1)]
         seen_dict[f"{nn}_verts"] = dict(zip(edge_dict_keys,[set() for ee in range(len(edge_dict_keys))]))
 
@@ -127,15 +744,21 @@ def init_seen_dict(path_prefix='data'):
     # add the graph on 1 vertex
     seen_dict['1_verts']['0_edges'] = set(Glabel(Graph(1)))
     
+    partitions = []
     if max_n >= 2:
         # add lower vertex number graphs
         for n_verts in range(2, max_n):
             for m_edges in range(n_verts*(n_verts-1)//2, 0, -1):
-                seen_dict[f'{n_verts}_verts'][f'{m_edges}_edges'] = read_partial_seen_dict(n_verts, m_edges, path_prefix)
+                if load_complete or get_partition_status('seen_dict', n_verts, m_edges, path_prefix) != PARTITION_COMPLETE:
+                    partitions.append((n_verts, m_edges))
 
         # add previously computed for max_n
         for m_edges in range(max_n*(max_n-1)//2, edcount-1, -1):
-            seen_dict[f'{max_n}_verts'][f'{m_edges}_edges'] = read_partial_seen_dict(max_n, m_edges, path_prefix)
+            if load_complete or get_partition_status('seen_dict', max_n, m_edges, path_prefix) != PARTITION_COMPLETE:
+                partitions.append((max_n, m_edges))
+
+    for (n_verts, m_edges), partition in load_partitions('seen_dict', partitions, path_prefix, workers=workers):
+        seen_dict[f'{n_verts}_verts'][f'{m_edges}_edges'] = partition
     
     return seen_dict
 
@@ -158,9 +781,15 @@ def get_last_completed_dict_numbers(path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, saves these files in a directory called 'data'
+            
+    If the data directory has a manifest, only the manifest is read instead of the names of the files.
     """
     import os
     
+    manifest_numbers = get_last_manifest_numbers('completed_dict', path_prefix)
+    if manifest_numbers is not None:
+        return manifest_numbers
+    
     files_list = os.listdir(path_prefix + '/completed_dict')
     max_n = 0
     for filename in files_list:
@@ -174,10 +803,8 @@ def get_last_completed_dict_numbers(path_prefix='data'):
     for filename in files_list:
         if f'_{max_n}_verts' in filename:
             start_idx = filename.find('_verts_') + len('_verts_')
-            try:
-                stop_idx = filename.index('_edges-backup.txt')
-            except ValueError:
-                stop_idx = filename.index('_edges.txt')
+            # Handles the partition files, their backups, and the journal of a partially finished partition
+            stop_idx = filename.index('_edges')
             if int(filename[start_idx:stop_idx]) < edges:
                 edges = int(filename[start_idx:stop_idx])
 
@@ -187,8 +814,8 @@ def get_last_completed_dict_numbers(path_prefix='data'):
 ## Read partial seen_dict for a given number of vertices and edges
 def read_partial_completed_dict(num_verts, num_edges, path_prefix='data'):
     """
-    Reads a file (or backup) containing a set of graph6_strings of graphs on num_verts vertices 
-    and num_edges edges that have had their potential minor minimality with respect to the spectator
+    Reads a file (or backup) and its journal containing a set of graph6_strings of graphs on num_verts
+    vertices and num_edges edges that have had their potential minor minimality with respect to the spectator
     minor floor number checked.
     
     :param num_verts: The number of vertices that each graph listed in the file contains.
@@ -198,15 +825,33 @@ def read_partial_completed_dict(num_verts, num_edges, path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, reads looks for these files in a directory called 'data'
+            
+    Any graph6_strings appended to the journal of the partition since it was last written are added to the
+    returned set.
     """
+    import os
+    
+    journal_filename = get_journal_filename('completed_dict', num_verts, num_edges, path_prefix)
     try:
         # try the primary file
         with open(f'{path_prefix}/completed_dict/completed_dict_{num_verts}_verts_{num_edges}_edges.txt', 'r') as infile:
-            return eval(infile.read())
+            text = infile.read()
+        if not checksum_matches_manifest('completed_dict', num_verts, num_edges, text, path_prefix):
+            raise ValueError('The primary file was not completely written')
+        partial_completed_dict = eval(text)
     except:
-        # If primary file is corrupted (empty), try backup
-        with open(f'{path_prefix}/completed_dict/completed_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'r') as infile:
-            return eval(infile.read())
+        try:
+            # If primary file is corrupted (empty), try backup
+            with open(f'{path_prefix}/completed_dict/completed_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'r') as infile:
+                partial_completed_dict = eval(infile.read())
+        except FileNotFoundError:
+            # The partition has not been compacted yet, so everything is in the journal
+            if not os.path.exists(journal_filename):
+                raise
+            partial_completed_dict = set()
+    
+    # Replay the graphs appended since the partition file was last written
+    return partial_completed_dict | read_journal(journal_filename)
         
         
 def write_partial_completed_dict(num_verts, num_edges, completed_dict, path_prefix='data'):
@@ -225,16 +870,65 @@ def write_partial_completed_dict(num_verts, num_edges, completed_dict, path_pref
     :param path_prefix: The directory in which to save the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, saves these files in a directory called 'data'
+            
+    Since the file contains every graph in the partition, this also compacts (deletes) the journal that
+    append_partial_completed_dict() has been adding to.
     """
     with open(f'{path_prefix}/completed_dict/completed_dict_{num_verts}_verts_{num_edges}_edges.txt', 'w') as outfile:
         outfile.write(str(completed_dict[f'{num_verts}_verts'][f'{num_edges}_edges']))
     
+    # Record the primary file in the manifest before the backup is overwritten
+    update_manifest('completed_dict', num_verts, num_edges,
+                    f'{path_prefix}/completed_dict/completed_dict_{num_verts}_verts_{num_edges}_edges.txt',
+                    len(completed_dict[f'{num_verts}_verts'][f'{num_edges}_edges']), path_prefix)
+    
     # Just in case there's an interuption while the connection is open, make a backup
     with open(f'{path_prefix}/completed_dict/completed_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'w') as outfile:
-        outfile.write(str(completed_dict[f'{num_verts}_verts'][f'{num_edges}_edges'])) 
+        outfile.write(str(completed_dict[f'{num_verts}_verts'][f'{num_edges}_edges']))
+    
+    # Everything in the journal is now in the partition file
+    remove_journal(get_journal_filename('completed_dict', num_verts, num_edges, path_prefix))
+        
+        
+def append_partial_completed_dict(num_verts, num_edges, g6_strings, completed_dict, path_prefix='data', compact_min=1000,
+                                  compact=True):
+    """
+    Checkpoints newly completed graphs by appending their graph6_strings to the journal of the partition of
+    graphs on num_verts vertices and num_edges edges, instead of rewriting the whole partition file. Once the
+    journal holds at least compact_min entries and at least as many entries as the partition file, it is
+    compacted into the partition file by write_partial_completed_dict(). The partition file at least doubles at each
+    compaction, so there are only logarithmically many compactions and the journal that is replayed on a
+    resume is never much larger than the file.
+    
+    :param num_verts: The number of vertices that each graph in g6_strings contains.
+    
+    :param num_edges: The number of edges that each graph in g6_strings contains.
+    
+    :param g6_strings: An iterable of graph6_strings that have already been added to
+            completed_dict[f'{num_verts}_verts'][f'{num_edges}_edges'].
+    
+    :param completed_dict: A nested dictionary that contains sets of graphs that have been checked for
+            minor minimality.
+    
+    :param path_prefix: The directory in which to save the partitioned files. By default, 'data'
+    
+    :param compact_min: The smallest journal that will be compacted into the partition file.
+    
+    :param compact: If False, the graphs are only appended to the journal. Compacting writes every graph in
+            completed_dict[f'{num_verts}_verts'][f'{num_edges}_edges'], so it must only be allowed once everything
+            that those graphs depend on has been saved.
+    """
+    journal_filename = get_journal_filename('completed_dict', num_verts, num_edges, path_prefix)
+    num_entries = append_journal(journal_filename, g6_strings)
+    
+    # The number of graphs in the partition file when it was last written
+    num_compacted = get_partition_entries('completed_dict', num_verts, num_edges, path_prefix)
+    if compact and num_entries >= max(compact_min, num_compacted):
+        write_partial_completed_dict(num_verts, num_edges, completed_dict, path_prefix)
         
 
-def init_completed_dict(path_prefix='data'):
+def init_completed_dict(path_prefix='data', load_complete=True, lazy=False, memory_budget=None,
+                        workers=None):
     """
     Returns the nested dictionary containing lists of graph6_strings of graphs that have been checked 
     for minor minimality with respect to the spectator minor floor number after rebuilding this dictionary 
@@ -248,12 +942,31 @@ def init_completed_dict(path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs that have been checked for minor minimality. By default, reads looks
             for these files in a directory called 'data'
+            
+    :param load_complete: If False, partitions that the manifest records as complete are left as empty sets
+            instead of being read, since resuming the computation only needs the partitions that are not
+            complete (see get_resume_point()). Has no effect if the data directory has no manifest.
+            
+    :param lazy: If True, returns a LazyPartitionDict that reads each partition the first time it is accessed
+            instead of reading every partition now.
+    
+    :param memory_budget: Optional argument, only used if lazy is True. The number of bytes of complete
+            partitions to keep in memory, see LazyPartitionDict.
+    
+    :param workers: Optional argument. The number of worker processes (or threads) used to read the
+            partitions, see load_partitions(). By default, the partitions are read one after another.
     """
     max_n, edcount = get_last_completed_dict_numbers(path_prefix)
+    
+    if lazy:
+        completed_dict = LazyPartitionDict('completed_dict', read_partial_completed_dict, set, max_n, edcount, path_prefix, memory_budget)
+        completed_dict['0_verts']['0_edges'] = set(Glabel(Graph(0)))
+        completed_dict['1_verts']['0_edges'] = set(Glabel(Graph(1)))
+        return completed_dict
 
-    vertex_keys = [f'{nn}_verts' for nn in range(11)]
-    completed_dict = dict(zip(vertex_keys, [{} for nn in range(11)]))
-    for nn in range(11):
+    vertex_keys = [f'{nn}_verts' for nn in range(MAX_VERTS + 1)]
+    completed_dict = dict(zip(vertex_keys, [{} for nn in range(MAX_VERTS + 1)]))
+    for nn in range(MAX_VERTS + 1):
         edge_dict_keys = [f"{ee}_edges" for ee in range(Integer((nn*(nn-1))/2), 0, -1)]
         completed_dict[f"{nn}_verts"] = dict(zip(edge_dict_keys,[set() for ee in range(len(edge_dict_keys))]))
 
@@ -262,15 +975,21 @@ def init_completed_dict(path_prefix='data'):
     # add the graph on 1 vertex
     completed_dict['1_verts']['0_edges'] = set(Glabel(Graph(1)))
     
+    partitions = []
     if max_n >= 2:
         # add lower vertex number graphs
         for n_verts in range(2, max_n):
             for m_edges in range(n_verts*(n_verts-1)//2, 0, -1):
-                completed_dict[f'{n_verts}_verts'][f'{m_edges}_edges'] = read_partial_completed_dict(n_verts, m_edges, path_prefix)
+                if load_complete or get_partition_status('completed_dict', n_verts, m_edges, path_prefix) != PARTITION_COMPLETE:
+                    partitions.append((n_verts, m_edges))
 
         # add previously computed for max_n
         for m_edges in range(max_n*(max_n-1)//2, edcount-1, -1):
-            completed_dict[f'{max_n}_verts'][f'{m_edges}_edges'] = read_partial_completed_dict(max_n, m_edges, path_prefix)
+            if load_complete or get_partition_status('completed_dict', max_n, m_edges, path_prefix) != PARTITION_COMPLETE:
+                partitions.append((max_n, m_edges))
+
+    for (n_verts, m_edges), partition in load_partitions('completed_dict', partitions, path_prefix, workers=workers):
+        completed_dict[f'{n_verts}_verts'][f'{m_edges}_edges'] = partition
     
     return completed_dict
 
@@ -291,9 +1010,15 @@ def get_last_minimals_dict_numbers(path_prefix='data'):
     
     :param path_prefix: The directory in which to find the files containing the dictionary of minor
             minimal graphs. By default, saves these files in a directory called 'data'
+            
+    If the data directory has a manifest, only the manifest is read instead of the names of the files.
     """
     import os
     
+    manifest_numbers = get_last_manifest_numbers('minimals_dict', path_prefix)
+    if manifest_numbers is not None:
+        return manifest_numbers
+    
     files_list = os.listdir(path_prefix + '/minimals_dict')
     max_n = 0
     for filename in files_list:
@@ -333,6 +1058,7 @@ def write_minimals_dict(num_verts, num_edges, minimals_dict, path_prefix='data')
     :param path_prefix: The directory in which to save the file containing the dictionary of minor minimal
             graphs. By default, saves these files in a directory called 'data'
     """
+    mark_partition_in_progress('minimals_dict', num_verts, num_edges, path_prefix)
     with open(path_prefix +
               f'/minimals_dict/minimals_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'w') as outfile:
         outfile.write(str(minimals_dict))
@@ -358,17 +1084,20 @@ def read_minimals_dict(path_prefix='data'):
     
     try:
         # try the primary file
-        with open(path_prefix + f'/minimals_dict/minimals_dict_{num_verts}_verts_{num_edges}_edges.txt', 'r') as infile:
-            return eval(infile.read())
+        with open(path_prefix + f'/minimals_dict/minimals_dict_{max_n}_verts_{edge_count}_edges.txt', 'r') as infile:
+            text = infile.read()
+        if not checksum_matches_manifest('minimals_dict', max_n, edge_count, text, path_prefix):
+            raise ValueError('The primary file was not completely written')
+        return eval(text)
     except:
         # If primary file is corrupted (empty), try backup
         try:
-            with open(path_prefix + f'/minimals_dict/minimals_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'r') as infile:
+            with open(path_prefix + f'/minimals_dict/minimals_dict_{max_n}_verts_{edge_count}_edges-backup.txt', 'r') as infile:
                 return eval(infile.read())
         except:
             # If both seen_dict.txt and seen_dict_backup.txt are corrupted, or don't exist, initialize uspcm_dict
-            minimals_dict_keys = [f'{kk}_spectators' for kk in range(10)]
-            minimals_dict = dict(zip(minimals_dict_keys, [set() for kk in range(10)]))
+            minimals_dict_keys = [f'{kk}_spectators' for kk in range(MAX_VERTS)]
+            minimals_dict = dict(zip(minimals_dict_keys, [set() for kk in range(MAX_VERTS)]))
             minimals_dict['0_spectators'].add('@')
             
             return minimals_dict        
@@ -392,9 +1121,15 @@ def get_last_uspcm_dict_numbers(path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, saves these files in a directory called 'data'
+            
+    If the data directory has a manifest, only the manifest is read instead of the names of the files.
     """
     import os
     
+    manifest_numbers = get_last_manifest_numbers('uspcm_dict', path_prefix)
+    if manifest_numbers is not None:
+        return manifest_numbers
+    
     files_list = os.listdir(path_prefix + '/uspcm_dict')
     max_n = 0
     for filename in files_list:
@@ -408,10 +1143,8 @@ def get_last_uspcm_dict_numbers(path_prefix='data'):
     for filename in files_list:
         if f'_{max_n}_verts' in filename:
             start_idx = filename.find('_verts_') + len('_verts_')
-            try:
-                stop_idx = filename.index('_edges-backup.txt')
-            except ValueError:
-                stop_idx = filename.index('_edges.txt')
+            # Handles both the text (.txt) and binary (.bin) partition files, and their backups
+            stop_idx = filename.index('_edges')
             if int(filename[start_idx:stop_idx]) < edges:
                 edges = int(filename[start_idx:stop_idx])
 
@@ -419,7 +1152,7 @@ def get_last_uspcm_dict_numbers(path_prefix='data'):
         
         
 ## Read partial uspcm_dict for a given number of vertices and edges
-def read_partial_uspcm_dict(num_verts, num_edges, path_prefix='data'):
+def read_partial_uspcm_dict(num_verts, num_edges, path_prefix='data', file_format='txt'):
     """
     Reads a file (or backup) containing a dictionary whose keys are graph6_strings of graphs on num_verts 
     vertices and num_edges edges whose spectator minor floor number has been calculated and whose values
@@ -432,18 +1165,58 @@ def read_partial_uspcm_dict(num_verts, num_edges, path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, reads looks for these files in a directory called 'data'
+            
+    :param file_format: Either 'txt' (default) to eval the text file into a dictionary, or 'bin' to
+            memory-map the binary partition file written by write_partial_uspcm_dict(). With 'bin' the
+            returned UspcmPartition is a read-only mapping that answers lookups directly from the file.
+            With 'array' the binary partition file (or the text file, if there is no binary file) is read
+            into a UspcmArrayPartition of sorted NumPy arrays. With 'sharded' the shards saved by
+            build_sharded_partition() are memory-mapped by a ShardedUspcmPartition. Unlike the other
+            formats, which also have the disconnected deletions of the graphs on num_edges + 1 edges, a
+            sharded partition by default only has the connected graphs; its connected attribute (read from
+            shards.json) says which.
     """
+    if file_format == 'sharded':
+        return ShardedUspcmPartition(get_shard_directory(num_verts, num_edges, path_prefix))
+    
+    if file_format == 'array':
+        try:
+            filename = f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges.bin'
+            if not file_matches_manifest('uspcm_dict', num_verts, num_edges, filename, path_prefix):
+                raise ValueError('The primary file was not completely written')
+            return UspcmArrayPartition.from_bin(filename)
+        except (OSError, ValueError):
+            try:
+                return UspcmArrayPartition.from_bin(f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges-backup.bin')
+            except (OSError, ValueError):
+                return UspcmArrayPartition.from_dict(read_partial_uspcm_dict(num_verts, num_edges, path_prefix),
+                                                     num_verts, num_edges)
+    
+    if file_format == 'bin':
+        try:
+            # try the primary file
+            filename = f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges.bin'
+            if not file_matches_manifest('uspcm_dict', num_verts, num_edges, filename, path_prefix):
+                raise ValueError('The primary file was not completely written')
+            return UspcmPartition(filename)
+        except (OSError, ValueError):
+            # If primary file is corrupted (truncated or bad header), try backup
+            return UspcmPartition(f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges-backup.bin')
+        
     try:
         # try the primary file
         with open(f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt', 'r') as infile:
-            return eval(infile.read())
+            text = infile.read()
+        if not checksum_matches_manifest('uspcm_dict', num_verts, num_edges, text, path_prefix):
+            raise ValueError('The primary file was not completely written')
+        return eval(text)
     except:
         # If primary file is corrupted (empty), try backup
         with open(f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges-backup.txt', 'r') as infile:
             return eval(infile.read())
         
         
-def write_partial_uspcm_dict(num_verts, num_edges, uspcm_dict, path_prefix='data'):
+def write_partial_uspcm_dict(num_verts, num_edges, uspcm_dict, path_prefix='data', file_format='txt'):
     """
     Writes a file (and backup) containing a dictionary of graphs on num_verts vertices and num_edges edges
     that have had their spectator minor floor number calculated. The keys in the dictionary are graph6_strings 
@@ -460,7 +1233,23 @@ def write_partial_uspcm_dict(num_verts, num_edges, uspcm_dict, path_prefix='data
     :param path_prefix: The directory in which to save the partitioned files that can be used to rebuild
             the dictionary of graphs and their spectator minor floor number.
             By default, saves these files in a directory called 'data'
+            
+    :param file_format: Either 'txt' (default) to write the str() of the dictionary, or 'bin' (or 'array') to
+            write the binary columnar partition file read by read_partial_uspcm_dict(..., file_format='bin').
     """
+    if file_format in ('bin', 'array'):
+        partial_uspcm_dict = uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges']
+        mark_partition_in_progress('uspcm_dict', num_verts, num_edges, path_prefix)
+        write_uspcm_partition_bin(f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges.bin',
+                                  num_verts, num_edges, partial_uspcm_dict)
+        
+        # Just in case there's an interuption while the file is open, make a backup
+        write_uspcm_partition_bin(f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges-backup.bin',
+                                  num_verts, num_edges, partial_uspcm_dict)
+        return
+    
+    # The manifest records the size and checksum of the partition file once the partition is complete
+    mark_partition_in_progress('uspcm_dict', num_verts, num_edges, path_prefix)
     with open(f'{path_prefix}/uspcm_dict/uspcm_dict_{num_verts}_verts_{num_edges}_edges.txt', 'w') as outfile:
         outfile.write(str(uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges']))
     
@@ -469,7 +1258,8 @@ def write_partial_uspcm_dict(num_verts, num_edges, uspcm_dict, path_prefix='data
         outfile.write(str(uspcm_dict[f'{num_verts}_verts'][f'{num_edges}_edges']))  
         
         
-def init_uspcm_dict(path_prefix='data'):
+def init_uspcm_dict(path_prefix='data', file_format='txt', load_complete=True, lazy=False, memory_budget=None,
+                    workers=None):
     """
     Returns the nested dictionary whose innermost dictionary contains the graph6_strings and associated
     spectator minor floor number of those graphs after rebuilding this dictionary from the partitioned
@@ -483,12 +1273,38 @@ def init_uspcm_dict(path_prefix='data'):
     :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
             the dictionary of graphs whose spectator minor floor number has been calculated.
             By default, reads looks for these files in a directory called 'data'
+            
+    :param file_format: Either 'txt' (default) or 'bin'. With 'bin' each innermost dictionary is a memory-mapped
+            UspcmPartition, so the full Python dictionary of graph6_strings is never built. With 'array' each
+            innermost dictionary is a UspcmArrayPartition of sorted NumPy arrays.
+            
+    :param load_complete: If False, complete partitions on fewer than max_n - 1 vertices are left as empty
+            dictionaries instead of being read. Resuming the computation on max_n vertices only looks up graphs
+            on max_n and max_n - 1 vertices. Has no effect if the data directory has no manifest.
+            
+    :param lazy: If True, returns a LazyPartitionDict that reads each partition the first time it is accessed
+            instead of reading every partition now.
+    
+    :param memory_budget: Optional argument, only used if lazy is True. The number of bytes of complete
+            partitions to keep in memory, see LazyPartitionDict.
+    
+    :param workers: Optional argument. The number of worker processes (or threads) used to read the
+            partitions, see load_partitions(). By default, the partitions are read one after another.
     """
     max_n, edcount = get_last_uspcm_dict_numbers(path_prefix)
+    
+    if lazy:
+        def read_uspcm_partition(num_verts, num_edges, path_prefix):
+            return read_partial_uspcm_dict(num_verts, num_edges, path_prefix, file_format)
+        uspcm_dict = LazyPartitionDict('uspcm_dict', read_uspcm_partition, dict, max_n, edcount, path_prefix, memory_budget,
+                                       min_edges=0)
+        uspcm_dict['0_verts']['0_edges'] = {Glabel(Graph(0)): 0}
+        uspcm_dict['1_verts']['0_edges'] = {Glabel(Graph(1)): 0}
+        return uspcm_dict
 
-    vertex_keys = [f'{nn}_verts' for nn in range(11)]
-    uspcm_dict = dict(zip(vertex_keys, [{} for nn in range(11)]))
-    for nn in range(11):
+    vertex_keys = [f'{nn}_verts' for nn in range(MAX_VERTS + 1)]
+    uspcm_dict = dict(zip(vertex_keys, [{} for nn in range(MAX_VERTS + 1)]))
+    for nn in range(MAX_VERTS + 1):
         edge_dict_keys = [f'{ee}_edges' for ee in range(Integer((nn*(nn-1))/2), -1, -1)]
         uspcm_dict[f'{nn}_verts'] = dict(zip(edge_dict_keys,[{} for ee in range(len(edge_dict_keys))]))
 
@@ -497,54 +1313,1752 @@ def init_uspcm_dict(path_prefix='data'):
     # add the graph on 1 vertex
     uspcm_dict['1_verts']['0_edges'] = {Glabel(Graph(1)): 0}
     
+    partitions = []
     if max_n >= 2:
         # add lower vertex number graphs
         for n_verts in range(2, max_n):
             for m_edges in range(n_verts*(n_verts-1)//2, 0, -1):
     #             print(n_verts, m_edges)
-                uspcm_dict[f'{n_verts}_verts'][f'{m_edges}_edges'] = read_partial_uspcm_dict(n_verts, m_edges, path_prefix)
+                if (load_complete or n_verts >= max_n - 1
+                        or get_partition_status('uspcm_dict', n_verts, m_edges, path_prefix) != PARTITION_COMPLETE):
+                    partitions.append((n_verts, m_edges))
 
         # add previously computed for max_n
         for m_edges in range(max_n*(max_n-1)//2, edcount-1, -1):
     #         print(max_n, m_edges)
-            uspcm_dict[f'{max_n}_verts'][f'{m_edges}_edges'] = read_partial_uspcm_dict(max_n, m_edges, path_prefix)
+            partitions.append((max_n, m_edges))
+
+    for (n_verts, m_edges), partition in load_partitions('uspcm_dict', partitions, path_prefix, file_format, workers=workers):
+        uspcm_dict[f'{n_verts}_verts'][f'{m_edges}_edges'] = partition
     
     return uspcm_dict
 
 
 
 ##########################################################################################
-############################## Initialize All Dicts ######################################
+############################## USPCM Binary Partitions ###################################
 ##########################################################################################
 
-def get_spectator_number_dictionaries(path_prefix='data'):
+# Binary partition layout (all integers little-endian):
+#   header:  8-byte magic, num_verts (uint32), num_edges (uint32), count (uint64), key_width (uint32),
+#            padded to USPCM_BIN_HEADER_SIZE bytes
+#   keys:    count fixed-width graph6_strings (every graph on num_verts vertices has a graph6_string
+#            of the same length), sorted so that lookups can binary search the memory-mapped file
+#   floors:  count uint8 spectator minor floor numbers, in the same order as the keys
+USPCM_BIN_MAGIC = b'USPCMv1\x00'
+USPCM_BIN_HEADER_FORMAT = '<8sIIQI'
+USPCM_BIN_HEADER_SIZE = 32
+
+
+def write_uspcm_partition_bin(filename, num_verts, num_edges, partial_uspcm_dict):
     """
-    Returns the uspcm_dict, minimals_dict, seen_dict, and completed_dict that have either been reconstructed
-    from saved files or initialized if no saved files exist.
+    Writes a single binary columnar partition file: the sorted graph6_strings of partial_uspcm_dict packed
+    as fixed-width records followed by a column of uint8 spectator minor floor numbers.
     
-    uspcm_dict: Nested dictionary of the form 
-            uspcm_dict[f'{nn}_verts'][f'{ee}_edges'][graph6_string] = spectator minor floor number, where 
-            nn is the number of vertices, ee is the number of edges, and graph6_string is the graph6_string 
-            of that graph.
+    :param filename: The name of the binary file to write.
     
-    minimals_dict: Dictionary of the form minimals_dict[f'{kk}_spectators'] = set of graphs which have
-            spectator minor floor number equal to kk and which are minor minimal with respect to the spectator
-            minor floor number.
-            
-    seen_dict: Nested dictionary of the form seen_dict[f'{nn}_verts'][f'{ee}_edges'] = a set of graph6_strings
-            of graphs whose spectator minor floor number has been calculated and saved to file.
+    :param num_verts: The number of vertices that each graph in partial_uspcm_dict contains.
+    
+    :param num_edges: The number of edges that each graph in partial_uspcm_dict contains.
+    
+    :param partial_uspcm_dict: A dictionary (or UspcmPartition) whose keys are graph6_strings of graphs on
+            num_verts vertices and num_edges edges and whose values are spectator minor floor numbers.
+    """
+    import struct
+    
+    keys = sorted(partial_uspcm_dict)
+    key_width = len(keys[0]) if keys else 0
+    if any(len(key) != key_width for key in keys):
+        raise ValueError(f'graph6_strings in the {num_verts}_verts {num_edges}_edges partition differ in length')
+    
+    header = struct.pack(USPCM_BIN_HEADER_FORMAT, USPCM_BIN_MAGIC, num_verts, num_edges, len(keys), key_width)
+    with open(filename, 'wb') as outfile:
+        outfile.write(header.ljust(USPCM_BIN_HEADER_SIZE, b'\x00'))
+        outfile.write(''.join(keys).encode('ascii'))
+        outfile.write(bytes(int(partial_uspcm_dict[key]) for key in keys))
+
+
+from collections.abc import Mapping
+
+class UspcmPartition(Mapping):
+    """
+    Read-only, memory-mapped view of a binary partition file written by write_uspcm_partition_bin().
+    
+    Behaves like the dictionary returned by read_partial_uspcm_dict(): partition[graph6_string] is the spectator
+    minor floor number, and `in`, len(), iteration, keys(), values(), items() and get() all work. Lookups binary
+    search the sorted key column of the mapped file, so the partition is never loaded into a Python dictionary.
+    
+    :param filename: The name of the binary partition file.
+    """
+    
+    def __init__(self, filename):
+        import mmap
+        import os
+        import struct
+        
+        self.filename = filename
+        with open(filename, 'rb') as infile:
+            size = os.fstat(infile.fileno()).st_size
+            if size < USPCM_BIN_HEADER_SIZE:
+                raise ValueError(f'{filename} is too short to be a binary uspcm_dict partition')
+            self._mm = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
             
-    completed_dict: Nested dictionary of the form completed_dict[f'{nn}_verts'][f'{ee}_edges'] = a set of 
-            graph6_strings of graphs which have been determined as to whether or not they are minor minimal
-            with respect to the spectator minor floor number.
+        magic, self.num_verts, self.num_edges, self._count, self._key_width = struct.unpack_from(
+            USPCM_BIN_HEADER_FORMAT, self._mm, 0)
+        self._floors_offset = USPCM_BIN_HEADER_SIZE + self._count*self._key_width
+        if magic != USPCM_BIN_MAGIC or size != self._floors_offset + self._count:
+            self._mm.close()
+            raise ValueError(f'{filename} is not a complete binary uspcm_dict partition')
     
-    :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
-            the dictionaries.
+    def _key_at(self, idx):
+        start = USPCM_BIN_HEADER_SIZE + idx*self._key_width
+        return self._mm[start:start + self._key_width]
+    
+    def _index(self, g6_str):
+        """
+        Returns the position of g6_str in the sorted key column, or -1 if it is not in the partition.
+        """
+        try:
+            key = g6_str.encode('ascii')
+        except AttributeError:
+            return -1
+        if len(key) != self._key_width:
+            return -1
+        
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key_at(lo) == key:
+            return lo
+        return -1
+    
+    def __getitem__(self, g6_str):
+        idx = self._index(g6_str)
+        if idx < 0:
+            raise KeyError(g6_str)
+        return self._mm[self._floors_offset + idx]
+    
+    def __contains__(self, g6_str):
+        return self._index(g6_str) >= 0
+    
+    def __len__(self):
+        return self._count
+    
+    def __iter__(self):
+        for idx in range(self._count):
+            yield self._key_at(idx).decode('ascii')
+    
+    def __repr__(self):
+        return f'UspcmPartition({self.filename!r}, {self._count} graphs)'
+    
+    def close(self):
+        self._mm.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+        
+        
+def convert_uspcm_dict_to_binary(path_prefix='data'):
+    """
+    Writes a binary partition file (and backup) next to every text partition file of the uspcm_dict that can
+    be read, so that init_uspcm_dict(path_prefix, file_format='bin') can memory-map the whole dictionary.
+    
+    :param path_prefix: The directory in which to find the partitioned files of the uspcm_dict.
+            By default, looks for these files in a directory called 'data'
+    """
+    import os
+    
+    for filename in sorted(os.listdir(path_prefix + '/uspcm_dict')):
+        if not filename.endswith('_edges.txt'):
+            continue
+        num_verts = int(filename[len('uspcm_dict_'):filename.index('_verts_')])
+        num_edges = int(filename[filename.index('_verts_') + len('_verts_'):filename.index('_edges')])
+        partial_uspcm_dict = {f'{num_verts}_verts': {f'{num_edges}_edges':
+                                                     read_partial_uspcm_dict(num_verts, num_edges, path_prefix)}}
+        write_partial_uspcm_dict(num_verts, num_edges, partial_uspcm_dict, path_prefix, file_format='bin')
+
+
+
+##########################################################################################
+############################### USPCM Array Partitions ###################################
+##########################################################################################
+
+# A graph on at most GRAPH_KEY_MAX_VERTS vertices is encoded as a 64-bit integer key: the number of vertices in
+# the top 8 bits and the n(n-1)/2 bits of the upper triangle of the adjacency matrix, in graph6 order, in the
+# low GRAPH_KEY_VERTEX_SHIFT bits. Graphs on the same number of vertices sort in the same order by key as by
+# graph6_string, since graph6 pads the adjacency bits with zeros and maps each 6 bits to a character in order.
+GRAPH_KEY_VERTEX_SHIFT = 56
+GRAPH_KEY_MAX_VERTS = 11
+
+
+def graph6_to_key(g6_str):
+    """
+    Returns the 64-bit integer key of the graph with the given graph6_string.
+    
+    :param g6_str: The graph6_string of a graph on at most GRAPH_KEY_MAX_VERTS vertices.
+    """
+    num_verts = ord(g6_str[0]) - 63
+    num_bits = num_verts*(num_verts - 1) // 2
+    if not 0 <= num_verts <= GRAPH_KEY_MAX_VERTS or len(g6_str) != 1 + -(-num_bits // 6):
+        raise ValueError(f'{g6_str!r} is not the graph6_string of a graph on at most {GRAPH_KEY_MAX_VERTS} vertices')
+    
+    adjacency = 0
+    for char in g6_str[1:]:
+        adjacency = adjacency << 6 | (ord(char) - 63)
+    adjacency >>= 6*(len(g6_str) - 1) - num_bits
+    
+    return num_verts << GRAPH_KEY_VERTEX_SHIFT | adjacency
+
+
+def key_to_graph6(key):
+    """
+    Returns the graph6_string of the graph with the given 64-bit integer key, see graph6_to_key().
+    
+    :param key: An integer (or NumPy unsigned integer) key.
+    """
+    key = int(key)
+    num_verts = key >> GRAPH_KEY_VERTEX_SHIFT
+    num_bits = num_verts*(num_verts - 1) // 2
+    num_chars = -(-num_bits // 6)
+    adjacency = (key & ((1 << GRAPH_KEY_VERTEX_SHIFT) - 1)) << (6*num_chars - num_bits)
+    
+    return chr(num_verts + 63) + ''.join(chr((adjacency >> 6*(num_chars - 1 - idx) & 63) + 63)
+                                         for idx in range(num_chars))
+
+
+def graph6_bytes_to_keys(key_bytes, num_verts):
+    """
+    Returns a NumPy uint64 array of the keys of graphs on num_verts vertices.
+    
+    :param key_bytes: A NumPy uint8 array with one row of graph6 characters for each graph.
+    
+    :param num_verts: The number of vertices of every graph.
+    """
+    import numpy as np
+    
+    if len(key_bytes) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    
+    num_bits = num_verts*(num_verts - 1) // 2
+    if not 0 <= num_verts <= GRAPH_KEY_MAX_VERTS or key_bytes.shape[1] != 1 + -(-num_bits // 6):
+        raise ValueError(f'Rows of width {key_bytes.shape[1]} are not graph6_strings of graphs on {num_verts} vertices')
+    if (key_bytes[:, 0] != num_verts + 63).any():
+        raise ValueError(f'Not every graph6_string is of a graph on {num_verts} vertices')
+    
+    keys = np.zeros(len(key_bytes), dtype=np.uint64)
+    for col in range(1, key_bytes.shape[1]):
+        keys = (keys << np.uint64(6)) | (key_bytes[:, col].astype(np.uint64) - np.uint64(63))
+    keys >>= np.uint64(6*(key_bytes.shape[1] - 1) - num_bits)
+    keys |= np.uint64(num_verts << GRAPH_KEY_VERTEX_SHIFT)
+    
+    return keys
+
+
+def graph6_to_keys(g6_strings):
+    """
+    Returns a NumPy uint64 array of the keys of the graphs with the given graph6_strings, see graph6_to_key().
+    
+    :param g6_strings: A list of graph6_strings of graphs that all have the same number of vertices.
+    """
+    import numpy as np
+    
+    g6_strings = list(g6_strings)
+    if not g6_strings:
+        return np.zeros(0, dtype=np.uint64)
+    
+    width = len(g6_strings[0])
+    if any(len(g6_str) != width for g6_str in g6_strings):
+        raise ValueError('graph6_strings of graphs with different numbers of vertices cannot be encoded together')
+    key_bytes = np.frombuffer(''.join(g6_strings).encode('ascii'), dtype=np.uint8).reshape(len(g6_strings), width)
+    
+    return graph6_bytes_to_keys(key_bytes, int(key_bytes[0, 0]) - 63)
+
+
+class UspcmArrayPartition(Mapping):
+    """
+    Read-only partition of the uspcm_dict held as a sorted NumPy uint64 array of graph keys (see graph6_to_key())
+    and a NumPy uint8 array of the spectator minor floor numbers, about 9 bytes per graph.
+    
+    Behaves like the dictionary returned by read_partial_uspcm_dict(), and get_floors() looks up many
+    graph6_strings at once with a single searchsorted().
+    
+    :param keys: A NumPy uint64 array of graph keys.
+    
+    :param floors: A NumPy uint8 array of the spectator minor floor numbers, in the same order as keys.
+    
+    :param num_verts: The number of vertices that each graph in the partition contains.
+    
+    :param num_edges: The number of edges that each graph in the partition contains.
+    """
+    
+    def __init__(self, keys, floors, num_verts, num_edges):
+        import numpy as np
+        
+        keys = np.asarray(keys, dtype=np.uint64)
+        floors = np.asarray(floors, dtype=np.uint8)
+        if len(keys) != len(floors):
+            raise ValueError('keys and floors must have the same length')
+        if len(keys) > 1 and (keys[1:] < keys[:-1]).any():
+            order = np.argsort(keys, kind='stable')
+            keys, floors = keys[order], floors[order]
+        
+        self.keys = keys
+        self.floors = floors
+        self.num_verts = num_verts
+        self.num_edges = num_edges
+    
+    @classmethod
+    def from_dict(cls, partial_uspcm_dict, num_verts, num_edges):
+        """
+        Returns the UspcmArrayPartition with the same graphs and spectator minor floor numbers as the dictionary
+        partial_uspcm_dict of graphs on num_verts vertices and num_edges edges.
+        """
+        g6_strings = list(partial_uspcm_dict)
+        return cls(graph6_to_keys(g6_strings), [partial_uspcm_dict[g6_str] for g6_str in g6_strings],
+                   num_verts, num_edges)
+    
+    @classmethod
+    def from_bin(cls, filename):
+        """
+        Returns the UspcmArrayPartition read from a binary partition file written by write_uspcm_partition_bin().
+        """
+        import numpy as np
+        import struct
+        
+        with open(filename, 'rb') as infile:
+            data = infile.read()
+        if len(data) < USPCM_BIN_HEADER_SIZE:
+            raise ValueError(f'{filename} is too short to be a binary uspcm_dict partition')
+        magic, num_verts, num_edges, count, key_width = struct.unpack_from(USPCM_BIN_HEADER_FORMAT, data, 0)
+        floors_offset = USPCM_BIN_HEADER_SIZE + count*key_width
+        if magic != USPCM_BIN_MAGIC or len(data) != floors_offset + count:
+            raise ValueError(f'{filename} is not a complete binary uspcm_dict partition')
+        
+        key_bytes = np.frombuffer(data, dtype=np.uint8, count=count*key_width, offset=USPCM_BIN_HEADER_SIZE)
+        keys = graph6_bytes_to_keys(key_bytes.reshape(count, key_width), num_verts)
+        floors = np.frombuffer(data, dtype=np.uint8, count=count, offset=floors_offset).copy()
+        
+        return cls(keys, floors, num_verts, num_edges)
+    
+    def _indices(self, keys):
+        """
+        Returns the positions of the keys in self.keys, or -1 for the keys that are not in the partition.
+        """
+        import numpy as np
+        
+        idx = np.searchsorted(self.keys, keys)
+        found = idx < len(self.keys)
+        found[found] = self.keys[idx[found]] == keys[found]
+        return np.where(found, idx, -1)
+    
+    def get_floors(self, g6_strings):
+        """
+        Returns a NumPy uint8 array of the spectator minor floor numbers of the graphs with the given
+        graph6_strings. Raises a KeyError if one of the graphs is not in the partition.
+        
+        :param g6_strings: A list of graph6_strings of graphs on num_verts vertices and num_edges edges.
+        """
+        g6_strings = list(g6_strings)
+        idx = self._indices(graph6_to_keys(g6_strings))
+        if (idx < 0).any():
+            raise KeyError(g6_strings[int((idx < 0).argmax())])
+        return self.floors[idx]
+    
+    def __getitem__(self, g6_str):
+        import numpy as np
+        
+        try:
+            key = graph6_to_key(g6_str)
+        except (TypeError, ValueError):
+            raise KeyError(g6_str)
+        # A Python int would be compared with the uint64 keys as a float64, which cannot hold every key
+        idx = int(self.keys.searchsorted(np.uint64(key)))
+        if idx == len(self.keys) or int(self.keys[idx]) != key:
+            raise KeyError(g6_str)
+        return int(self.floors[idx])
+    
+    def __contains__(self, g6_str):
+        try:
+            self[g6_str]
+        except KeyError:
+            return False
+        return True
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def __iter__(self):
+        for key in self.keys:
+            yield key_to_graph6(key)
+    
+    def __repr__(self):
+        return f'UspcmArrayPartition({self.num_verts}_verts, {self.num_edges}_edges, {len(self.keys)} graphs)'
+    
+    def __str__(self):
+        # The same text as the dictionary, so write_partial_uspcm_dict() writes the usual partition file
+        return str(dict(self.items()))
+    
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.floors.nbytes
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+
+
+
+##########################################################################################
+################################## Progress Bitmaps ######################################
+##########################################################################################
+
+# Once every supergraph of the partition of graphs on n vertices and m edges has been processed, the partition
+# of the uspcm_dict no longer gains graphs, and the rank of a graph's key among the sorted keys of the
+# partition is a dense ID from 0 to len(partition) - 1. The seen_dict and completed_dict partitions are
+# subsets of the uspcm_dict partition, so they can be stored as bitmaps indexed by that ID (one bit per graph
+# instead of a graph6_string), and the spectator minor floor numbers as the uint8 floors of a
+# UspcmArrayPartition in the same order.
+
+from collections.abc import MutableSet
+
+
+def get_graph_ids(keys, g6_strings):
+    """
+    Returns a NumPy int64 array of the dense IDs (positions in keys) of the graphs with the given
+    graph6_strings, with -1 for the graphs that are not in the partition.
+    
+    :param keys: The sorted NumPy uint64 array of the keys of the graphs in a partition, e.g. the keys of a
+            UspcmArrayPartition.
+    
+    :param g6_strings: A list of graph6_strings of graphs on the same number of vertices.
+    """
+    import numpy as np
+    
+    query = graph6_to_keys(g6_strings)
+    ids = np.searchsorted(keys, query).astype(np.int64)
+    found = ids < len(keys)
+    found[found] = keys[ids[found]] == query[found]
+    ids[~found] = -1
+    
+    return ids
+
+
+class PartitionBitmap(MutableSet):
+    """
+    Set of graph6_strings of graphs in a single partition, stored as one bit for each graph of the partition
+    indexed by its dense ID (see get_graph_ids()). Supports add(), discard(), `in`, len() and iteration like the
+    sets of the seen_dict and completed_dict, but can only hold graphs whose keys are in keys.
+    
+    :param keys: The sorted NumPy uint64 array of the keys of every graph in the partition.
+    
+    :param g6_strings: Optional argument. An iterable of graph6_strings to add to the bitmap.
+    """
+    
+    def __init__(self, keys, g6_strings=()):
+        import numpy as np
+        
+        self.keys = keys
+        self.bits = np.zeros((len(keys) + 7) // 8, dtype=np.uint8)
+        self._count = 0
+        self.update(g6_strings)
+    
+    def _id(self, g6_str):
+        import numpy as np
+        
+        try:
+            key = np.uint64(graph6_to_key(g6_str))
+        except (TypeError, ValueError):
+            return -1
+        idx = int(self.keys.searchsorted(key))
+        if idx == len(self.keys) or self.keys[idx] != key:
+            return -1
+        return idx
+    
+    def update(self, g6_strings):
+        """
+        Adds every graph6_string of g6_strings to the bitmap at once. Raises a KeyError if one of the graphs is
+        not in the partition.
+        """
+        import numpy as np
+        
+        g6_strings = list(g6_strings)
+        if not g6_strings:
+            return
+        ids = get_graph_ids(self.keys, g6_strings)
+        if (ids < 0).any():
+            raise KeyError(g6_strings[int((ids < 0).argmax())])
+        np.bitwise_or.at(self.bits, ids >> 3, (1 << (ids & 7)).astype(np.uint8))
+        self._count = int(np.unpackbits(self.bits).sum())
+    
+    def add(self, g6_str):
+        idx = self._id(g6_str)
+        if idx < 0:
+            raise KeyError(g6_str)
+        if not self.bits[idx >> 3] & (1 << (idx & 7)):
+            self.bits[idx >> 3] |= 1 << (idx & 7)
+            self._count += 1
+    
+    def discard(self, g6_str):
+        idx = self._id(g6_str)
+        if idx >= 0 and self.bits[idx >> 3] & (1 << (idx & 7)):
+            self.bits[idx >> 3] &= ~(1 << (idx & 7)) & 0xff
+            self._count -= 1
+    
+    def __contains__(self, g6_str):
+        idx = self._id(g6_str)
+        return idx >= 0 and bool(self.bits[idx >> 3] & (1 << (idx & 7)))
+    
+    def ids(self):
+        """
+        Returns a NumPy array of the dense IDs of the graphs in the bitmap.
+        """
+        import numpy as np
+        
+        return np.flatnonzero(np.unpackbits(self.bits, count=len(self.keys), bitorder='little'))
+    
+    def __iter__(self):
+        for key in self.keys[self.ids()]:
+            yield key_to_graph6(key)
+    
+    def __len__(self):
+        return self._count
+    
+    def __repr__(self):
+        return f'PartitionBitmap({self._count} of {len(self.keys)} graphs)'
+    
+    def __str__(self):
+        # The same text as the set, so write_partial_seen_dict() and write_partial_completed_dict() write the
+        # usual partition files
+        return str(set(self))
+    
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+def convert_progress_to_bitmaps(uspcm_dict, seen_dict, completed_dict, partitions=None):
+    """
+    Replaces partitions of the uspcm_dict by UspcmArrayPartitions and the same partitions of the seen_dict and
+    completed_dict by PartitionBitmaps indexed by the dense IDs of the graphs, so that each graph is held once
+    as a 64-bit key with its floor as a uint8 and one bit each for the seen_dict and completed_dict.
+    
+    Only partitions that no longer gain graphs can be converted. The first pass adds graphs to (and updates
+    the floors of) the uspcm_dict partition with one edge fewer than the partition it is working on, so by
+    default only partitions on fewer vertices than the largest graphs in the uspcm_dict are converted.
+    
+    Returns the list of (num_verts, num_edges) of the partitions that were converted.
+    
+    :param uspcm_dict: The nested dictionary of spectator minor floor numbers, see init_uspcm_dict().
+    
+    :param seen_dict: The nested dictionary of seen graphs, see init_seen_dict(), or None.
+    
+    :param completed_dict: The nested dictionary of completed graphs, see init_completed_dict(), or None.
+    
+    :param partitions: Optional argument. A list of (num_verts, num_edges) of the partitions to convert.
+    """
+    if partitions is None:
+        max_n = max(int(vert_key.split('_')[0]) for vert_key, edge_dict in uspcm_dict.items()
+                    if any(len(partition) for partition in edge_dict.values()))
+        partitions = [(int(vert_key.split('_')[0]), int(edge_key.split('_')[0]))
+                      for vert_key, edge_dict in uspcm_dict.items() if int(vert_key.split('_')[0]) < max_n
+                      for edge_key in edge_dict]
+    
+    for num_verts, num_edges in partitions:
+        vert_key, edge_key = f'{num_verts}_verts', f'{num_edges}_edges'
+        partition = uspcm_dict[vert_key][edge_key]
+        if not isinstance(partition, UspcmArrayPartition):
+            partition = UspcmArrayPartition.from_dict(partition, num_verts, num_edges)
+            uspcm_dict[vert_key][edge_key] = partition
+        
+        for progress_dict in (seen_dict, completed_dict):
+            if progress_dict is not None and edge_key in progress_dict.get(vert_key, {}):
+                progress_dict[vert_key][edge_key] = PartitionBitmap(partition.keys, progress_dict[vert_key][edge_key])
+    
+    return partitions
+
+
+
+##########################################################################################
+############################## Lazy Partition Loading ####################################
+##########################################################################################
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+
+def get_partition_size(partition):
+    """
+    Returns an estimate of the number of bytes of memory used by a partition: the container itself plus its
+    graph6_strings. The small integer values of a partition of the uspcm_dict are shared by Python and a
+    memory-mapped UspcmPartition only uses the (reclaimable) page cache, so neither is counted.
+    
+    :param partition: A set or dictionary of graph6_strings, or a UspcmPartition.
+    """
+    import sys
+    
+    size = sys.getsizeof(partition)
+    if isinstance(partition, (set, dict)):
+        size += sum(sys.getsizeof(g6_str) for g6_str in partition)
+    return size
+
+
+class LazyVertexDict(MutableMapping):
+    """
+    The dictionary of partitions on a single number of vertices of a LazyPartitionDict, whose keys are of the
+    form '5_edges'. A partition is read from disk the first time it is accessed.
+    """
+    
+    def __init__(self, owner, vert_key, edge_keys):
+        self._owner = owner
+        self._vert_key = vert_key
+        self._edge_keys = list(edge_keys)
+        self._partitions = {}
+    
+    def __getitem__(self, edge_key):
+        if edge_key in self._partitions:
+            self._owner._touch(self._vert_key, edge_key)
+            return self._partitions[edge_key]
+        if edge_key not in self._edge_keys:
+            raise KeyError(edge_key)
+        return self._owner._load(self, edge_key)
+    
+    def __setitem__(self, edge_key, partition):
+        if edge_key not in self._edge_keys:
+            self._edge_keys.append(edge_key)
+        self._owner._pin(self._vert_key, edge_key)
+        self._partitions[edge_key] = partition
+    
+    def __delitem__(self, edge_key):
+        self._edge_keys.remove(edge_key)
+        self._owner._pin(self._vert_key, edge_key)
+        self._partitions.pop(edge_key, None)
+    
+    def __contains__(self, edge_key):
+        return edge_key in self._edge_keys
+    
+    def __iter__(self):
+        return iter(list(self._edge_keys))
+    
+    def __len__(self):
+        return len(self._edge_keys)
+    
+    def __repr__(self):
+        return f'LazyVertexDict({self._vert_key!r}, loaded={list(self._partitions)})'
+    
+    
+class LazyPartitionDict(MutableMapping):
+    """
+    Nested dictionary with the same ['4_verts']['5_edges'] access pattern as the dictionaries built by
+    init_uspcm_dict(), init_seen_dict() and init_completed_dict(), except that each partition is read from
+    disk the first time it is accessed rather than when the dictionary is created.
+    
+    Partitions that the manifest records as complete (or, without a manifest, partitions on fewer than max_n
+    vertices) are never modified by the computation, so when memory_budget is given the least recently used
+    of them are dropped once the partitions held in memory exceed the budget, and read again if they are
+    accessed later. Every other partition, and every partition that is assigned to, is kept in memory.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict' or 'completed_dict'.
+    
+    :param reader: The function reader(num_verts, num_edges, path_prefix) that reads a partition, e.g.
+            read_partial_seen_dict.
+    
+    :param empty: The function that returns an empty partition, i.e. set or dict.
+    
+    :param max_n: The number of vertices of the last partition saved, see get_last_seen_dict_numbers().
+    
+    :param edcount: The number of edges of the last partition saved, see get_last_seen_dict_numbers().
+    
+    :param path_prefix: The directory in which to find the partitioned files. By default, 'data'
+    
+    :param memory_budget: Optional argument. The number of bytes (estimated by get_partition_size()) of
+            complete partitions to hold in memory. By default, no partition is ever dropped.
+    
+    :param min_edges: The number of edges of the sparsest partition of each number of vertices, 0 for the
+            uspcm_dict and 1 for the seen_dict and completed_dict.
+    
+    :param max_verts: Optional argument. The largest number of vertices of the graphs in the dictionary. By
+            default, MAX_VERTS.
+    """
+    
+    def __init__(self, dict_name, reader, empty, max_n, edcount, path_prefix='data', memory_budget=None,
+                 min_edges=1, max_verts=None):
+        self.dict_name = dict_name
+        self.path_prefix = path_prefix
+        self.memory_budget = memory_budget
+        self._reader = reader
+        self._empty = empty
+        self._max_n = max_n
+        self._edcount = edcount
+        self._layers = {}
+        if max_verts is None:
+            max_verts = MAX_VERTS
+        for nn in range(max_verts + 1):
+            edge_keys = [f'{ee}_edges' for ee in range(nn*(nn-1)//2, min_edges - 1, -1)]
+            self._layers[f'{nn}_verts'] = LazyVertexDict(self, f'{nn}_verts', edge_keys)
+        # (vert_key, edge_key) -> estimated size of the loaded partitions that can be dropped, least recently used first
+        self._evictable = OrderedDict()
+        self._evictable_size = 0
+    
+    def _is_saved(self, num_verts, num_edges):
+        # The partitions that init_*_dict() would read from disk
+        if num_verts < 2 or num_edges < 1:
+            return False
+        return num_verts < self._max_n or (num_verts == self._max_n and num_edges >= self._edcount)
+    
+    def _is_complete(self, num_verts, num_edges):
+        status = get_partition_status(self.dict_name, num_verts, num_edges, self.path_prefix)
+        if status is None:
+            return num_verts < self._max_n
+        return status == PARTITION_COMPLETE
+    
+    def _load(self, layer, edge_key):
+        num_verts = int(layer._vert_key.split('_')[0])
+        num_edges = int(edge_key.split('_')[0])
+        
+        if not self._is_saved(num_verts, num_edges):
+            partition = self._empty()
+            layer._partitions[edge_key] = partition
+            return partition
+        
+        partition = self._reader(num_verts, num_edges, self.path_prefix)
+        layer._partitions[edge_key] = partition
+        if self.memory_budget is not None and self._is_complete(num_verts, num_edges):
+            size = get_partition_size(partition)
+            self._evictable[(layer._vert_key, edge_key)] = size
+            self._evictable_size += size
+            self._evict()
+        
+        return partition
+    
+    def _evict(self):
+        # Drop the least recently used complete partitions, but never the one that was just accessed
+        while self._evictable_size > self.memory_budget and len(self._evictable) > 1:
+            (vert_key, edge_key), size = self._evictable.popitem(last=False)
+            self._evictable_size -= size
+            self._layers[vert_key]._partitions.pop(edge_key, None)
+    
+    def _touch(self, vert_key, edge_key):
+        if (vert_key, edge_key) in self._evictable:
+            self._evictable.move_to_end((vert_key, edge_key))
+    
+    def _pin(self, vert_key, edge_key):
+        size = self._evictable.pop((vert_key, edge_key), None)
+        if size is not None:
+            self._evictable_size -= size
+    
+    def loaded_partitions(self):
+        """
+        Returns the list of (vert_key, edge_key) of the partitions that are currently held in memory.
+        """
+        return [(vert_key, edge_key) for vert_key, layer in self._layers.items() for edge_key in layer._partitions]
+    
+    def __getitem__(self, vert_key):
+        return self._layers[vert_key]
+    
+    def __setitem__(self, vert_key, edge_dict):
+        layer = LazyVertexDict(self, vert_key, [])
+        self._layers[vert_key] = layer
+        for edge_key, partition in edge_dict.items():
+            layer[edge_key] = partition
+    
+    def __delitem__(self, vert_key):
+        for edge_key in self._layers[vert_key]:
+            self._pin(vert_key, edge_key)
+        del self._layers[vert_key]
+    
+    def __iter__(self):
+        return iter(list(self._layers))
+    
+    def __len__(self):
+        return len(self._layers)
+    
+    def __repr__(self):
+        return f'LazyPartitionDict({self.dict_name!r}, {len(self.loaded_partitions())} partitions loaded)'
+
+
+
+##########################################################################################
+############################ Parallel Partition Loading ##################################
+##########################################################################################
+
+def read_partition(dict_name, num_verts, num_edges, path_prefix='data', file_format='txt'):
+    """
+    Reads a single partition of the uspcm_dict, seen_dict or completed_dict with read_partial_uspcm_dict(),
+    read_partial_seen_dict() or read_partial_completed_dict().
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict' or 'completed_dict'.
+    
+    :param file_format: Only used for the uspcm_dict, see read_partial_uspcm_dict().
+    """
+    if dict_name == 'uspcm_dict':
+        return read_partial_uspcm_dict(num_verts, num_edges, path_prefix, file_format)
+    if dict_name == 'seen_dict':
+        return read_partial_seen_dict(num_verts, num_edges, path_prefix)
+    if dict_name == 'completed_dict':
+        return read_partial_completed_dict(num_verts, num_edges, path_prefix)
+    raise ValueError(f'Unknown dictionary {dict_name!r}')
+
+
+def _read_partition_args(args):
+    return read_partition(*args)
+
+
+def load_partitions(dict_name, partitions, path_prefix='data', file_format='txt', workers=None, executor=None,
+                    chunksize=4):
+    """
+    Returns the list of ((num_verts, num_edges), partition) of the given partitions of the uspcm_dict, seen_dict
+    or completed_dict, in the same order as partitions.
+    
+    Reading a text partition is dominated by eval(), which holds the GIL, so by default the partitions are read
+    by a pool of worker processes and sent back pickled, which is much faster to load than the text. The
+    memory-mapped binary partitions of the uspcm_dict cannot be sent between processes and are only opened
+    (not parsed) when read, so those are read by a pool of threads.
+    
+    :param dict_name: One of 'uspcm_dict', 'seen_dict' or 'completed_dict'.
+    
+    :param partitions: A list of (num_verts, num_edges) of the partitions to read.
+    
+    :param path_prefix: The directory in which to find the partitioned files. By default, 'data'
+    
+    :param file_format: Only used for the uspcm_dict, see read_partial_uspcm_dict().
+    
+    :param workers: Optional argument. The number of worker processes or threads. By default (or if workers
+            is 1 or less), the partitions are read one after another in this process.
+    
+    :param executor: Optional argument. Either 'process' or 'thread'. By default, 'thread' for binary
+            partitions and 'process' otherwise.
+    
+    :param chunksize: The number of partitions sent to a worker process at a time.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    
+    args = [(dict_name, num_verts, num_edges, path_prefix, file_format) for num_verts, num_edges in partitions]
+    if workers is None or workers <= 1 or len(args) <= 1:
+        return [(partition, read_partition(*arg)) for partition, arg in zip(partitions, args)]
+    
+    if executor is None:
+        executor = 'thread' if dict_name == 'uspcm_dict' and file_format == 'bin' else 'process'
+    if executor == 'process':
+        if dict_name == 'uspcm_dict' and file_format == 'bin':
+            raise ValueError("Binary partitions can only be read with executor='thread'")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_partition_args, args, chunksize=chunksize))
+    elif executor == 'thread':
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_partition_args, args))
+    else:
+        raise ValueError(f"executor must be 'process' or 'thread', not {executor!r}")
+    
+    return list(zip(partitions, results))
+
+
+def benchmark_partition_loading(path_prefix='data', worker_counts=None, dict_name='uspcm_dict', file_format='txt',
+                                executor=None, repeat=1):
+    """
+    Prints and returns a dictionary of the time in seconds to rebuild the uspcm_dict (or seen_dict or
+    completed_dict) from its partitioned files using each number of workers. The key None is the time to read
+    the partitions one after another.
+    
+    :param path_prefix: The directory in which to find the partitioned files. By default, 'data'
+    
+    :param worker_counts: Optional argument. A list of numbers of workers. By default, 2, 4, 8, ... up to the
+            number of cores.
+    
+    :param dict_name: One of 'uspcm_dict' (default), 'seen_dict' or 'completed_dict'.
+    
+    :param file_format: Only used for the uspcm_dict, see read_partial_uspcm_dict().
+    
+    :param executor: Optional argument, see load_partitions().
+    
+    :param repeat: The number of times to rebuild the dictionary for each number of workers. The best time
+            is reported.
+    """
+    import os
+    import time
+    
+    if worker_counts is None:
+        cores = os.cpu_count() or 1
+        worker_counts = [2**kk for kk in range(1, cores.bit_length()) if 2**kk < cores] + [cores]
+    
+    times = {}
+    for workers in [None] + [workers for workers in worker_counts if workers > 1]:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if dict_name == 'uspcm_dict':
+                init_uspcm_dict(path_prefix, file_format, workers=workers)
+            elif dict_name == 'seen_dict':
+                init_seen_dict(path_prefix, workers=workers)
+            else:
+                init_completed_dict(path_prefix, workers=workers)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times[workers] = best
+        speedup = times[None] / best if best else float('inf')
+        print(f'{dict_name}: {"sequential" if workers is None else f"{workers} workers":>12}  '
+              f'{best:8.3f} s  ({speedup:.2f}x)')
+    
+    return times
+
+
+
+##########################################################################################
+############################# Batched Spectator Numbers ##################################
+##########################################################################################
+
+# The graphs of a partition all have the same number of vertices, so their adjacency matrices are stacked
+# into one (N, n, n) array and the breadth first searches from every vertex of every graph are run together.
+
+
+def keys_to_adjacency(keys, num_verts):
+    """
+    Returns a NumPy boolean array of shape (len(keys), num_verts, num_verts) of the adjacency matrices of the
+    graphs with the given keys, see graph6_to_key().
+    
+    :param keys: A NumPy uint64 array of graph keys.
+    
+    :param num_verts: The number of vertices of every graph.
+    """
+    import numpy as np
+    
+    num_bits = num_verts*(num_verts - 1) // 2
+    # graph6 lists the upper triangle column by column, from the highest bit of the key down
+    rows = [ii for jj in range(num_verts) for ii in range(jj)]
+    cols = [jj for jj in range(num_verts) for ii in range(jj)]
+    shifts = np.arange(num_bits - 1, -1, -1, dtype=np.uint64)
+    bits = ((np.asarray(keys, dtype=np.uint64)[:, None] >> shifts) & np.uint64(1)).astype(bool)
+    
+    adjacency = np.zeros((len(keys), num_verts, num_verts), dtype=bool)
+    adjacency[:, rows, cols] = bits
+    adjacency[:, cols, rows] = bits
+    
+    return adjacency
+
+
+def get_spectator_numbers(keys, num_verts, batch_size=16384):
+    """
+    Returns a NumPy int64 array of the spectator numbers (see spectator_number() in spectator_floor_functions.py)
+    of the graphs with the given keys.
+    
+    Each step multiplies the number of shortest paths (up to two) from every vertex to the last layer reached
+    by the adjacency matrices, which gives the next layer of every breadth first search and its number of
+    shortest paths. A graph drops out of the batch at the first step without a vertex reached by a unique
+    shortest path.
+    
+    :param keys: A NumPy uint64 array of graph keys (see graph6_to_key()), or a list of graph6_strings.
+    
+    :param num_verts: The number of vertices of every graph.
+    
+    :param batch_size: The number of graphs whose matrices are held in memory at once, at about 1 kB each.
+    """
+    import numpy as np
+    
+    if not isinstance(keys, np.ndarray):
+        keys = graph6_to_keys(keys)
+    
+    parade_lengths = np.zeros(len(keys), dtype=np.uint8)
+    for start in range(0, len(keys), batch_size):
+        adjacency = keys_to_adjacency(keys[start:start + batch_size], num_verts).astype(np.float32)
+        active = np.arange(start, start + len(adjacency))
+        counts = np.broadcast_to(np.eye(num_verts, dtype=np.float32), adjacency.shape).copy()
+        reached = counts > 0
+        
+        for depth in range(1, num_verts):
+            counts = np.minimum(counts @ adjacency, 2)
+            counts[reached] = 0
+            reached |= counts > 0
+            unique = (counts == 1).any(axis=(1, 2))
+            parade_lengths[active[unique]] = depth
+            if not unique.all():
+                adjacency, counts, reached, active = adjacency[unique], counts[unique], reached[unique], active[unique]
+            if len(active) == 0:
+                break
+    
+    return np.maximum(num_verts - 1 - parade_lengths.astype(np.int64), 0)
+
+
+def get_spectator_lower_bounds(keys, num_verts, batch_size=16384):
+    """
+    Returns a NumPy int64 array of the lower bounds of the spectator numbers of the graphs with the given keys
+    found from their degrees, see get_spectator_lower_bound() in spectator_floor_functions.py.
+    
+    :param keys: A NumPy uint64 array of graph keys, see graph6_to_key().
+    
+    :param num_verts: The number of vertices of every graph.
+    
+    :param batch_size: See get_spectator_numbers().
+    """
+    import numpy as np
+    
+    lower_bounds = np.zeros(len(keys), dtype=np.int64)
+    if num_verts == 0:
+        return lower_bounds
+    
+    for start in range(0, len(keys), batch_size):
+        degrees = keys_to_adjacency(keys[start:start + batch_size], num_verts).sum(axis=2)
+        longest = np.minimum(num_verts - 1, np.minimum(num_verts - degrees.max(axis=1) + 1,
+                                                       3*num_verts // (degrees.min(axis=1) + 1) - 1))
+        lower_bounds[start:start + len(degrees)] = np.maximum(num_verts - 1 - longest, 0)
+    
+    return lower_bounds
+
+
+def build_uspcm_partition(g6_strings, batch_size=16384):
+    """
+    Returns a dictionary whose keys are the given graph6_strings and whose values are the spectator numbers
+    of the graphs, i.e. a partition of the uspcm_dict before the spectator minor floors are propagated by
+    spec_floor().
+    
+    :param g6_strings: A list of graph6_strings of graphs that all have the same number of vertices.
+    
+    :param batch_size: See get_spectator_numbers().
+    """
+    g6_strings = list(g6_strings)
+    if not g6_strings:
+        return dict()
+    
+    num_verts = ord(g6_strings[0][0]) - 63
+    spec_nums = get_spectator_numbers(graph6_to_keys(g6_strings), num_verts, batch_size)
+    
+    return dict(zip(g6_strings, (int(spec_num) for spec_num in spec_nums)))
+
+
+
+##########################################################################################
+################################ Sharded Partitions ######################################
+##########################################################################################
+
+# A partition on 11 vertices can have around 10^8 graphs, too many to hold as a dictionary (or even as one
+# array while it is being built). A sharded partition is kept in path_prefix/uspcm_dict_shards as num_shards
+# shards, each holding the keys (see graph6_to_key()) whose hash is the shard number. The canonically
+# labelled keys are streamed into unsorted files of uint64 records, one per shard, and each shard is then
+# sorted and deduplicated in chunks of at most chunk_size keys, merged, and given its spectator numbers, so
+# that only one chunk or one shard is in memory at a time. Each shard is left as a file of sorted uint64 keys
+# and a file of uint8 spectator minor floor numbers in the same order, both memory-mapped by
+# ShardedUspcmPartition.
+
+# Fibonacci hashing spreads the keys evenly over the shards whatever their structure
+SHARD_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def get_shard_directory(num_verts, num_edges, path_prefix='data', dict_name='uspcm_dict'):
+    """
+    Returns the name of the directory holding the shards of the partition on num_verts vertices and
+    num_edges edges.
+    """
+    return f'{path_prefix}/{dict_name}_shards/{dict_name}_{num_verts}_verts_{num_edges}_edges'
+
+
+def get_shard_ids(keys, num_shards):
+    """
+    Returns a NumPy int64 array of the number of the shard of each key.
+    
+    :param keys: A NumPy uint64 array of graph keys.
+    
+    :param num_shards: The number of shards of the partition.
+    """
+    import numpy as np
+    
+    hashed = np.asarray(keys, dtype=np.uint64) * np.uint64(SHARD_HASH_MULTIPLIER)
+    return ((hashed >> np.uint64(32)) % np.uint64(num_shards)).astype(np.int64)
+
+
+def _find_geng():
+    import shutil
+    
+    try:
+        from sage.features.nauty import NautyExecutable
+        return NautyExecutable('geng').absolute_filename()
+    except Exception:
+        return shutil.which('geng') or shutil.which('nauty-geng')
+
+
+def iter_geng(num_verts, num_edges, connected=True, res=None, mod=None, geng=None):
+    """
+    Generator function to stream the graph6_strings of the graphs on num_verts vertices and num_edges edges,
+    one for each isomorphism class, from nauty's geng program without holding them in memory. They are
+    labelled by geng, not canonically labelled like the keys of the dictionaries.
+    
+    :param connected: If True (default), only the connected graphs.
+    
+    :param res: Optional argument, with mod. Only the res-th of mod parts of the graphs, so that the
+            enumeration can be split between mod processes.
+    
+    :param mod: Optional argument, see res.
+    
+    :param geng: Optional argument. The geng program. By default, the one installed with Sage or found on the
+            PATH.
+    """
+    import subprocess
+    
+    if geng is None:
+        geng = _find_geng()
+    if geng is None:
+        raise OSError('The nauty geng program cannot be found')
+    
+    args = [geng, '-q'] + (['-c'] if connected else []) + [str(num_verts), f'{num_edges}:{num_edges}']
+    if mod is not None:
+        args.append(f'{res}/{mod}')
+    with subprocess.Popen(args, stdout=subprocess.PIPE, text=True) as process:
+        for line in process.stdout:
+            if line.strip():
+                yield line.strip()
+
+
+class ShardWriter:
+    """
+    Appends uint64 keys to the unsorted record files of the shards of a partition, holding up to buffer_size
+    keys in memory for each shard.
+    
+    :param directory: The directory of the shards, see get_shard_directory().
+    
+    :param num_shards: The number of shards.
+    
+    :param buffer_size: The number of keys of a shard held in memory before they are appended to its file.
+    """
+    
+    def __init__(self, directory, num_shards, buffer_size=65536):
+        import os
+        
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.num_shards = num_shards
+        self.buffer_size = buffer_size
+        self._buffers = [[] for shard in range(num_shards)]
+        self._sizes = [0]*num_shards
+    
+    def record_filename(self, shard):
+        return f'{self.directory}/shard_{shard:04d}.u64'
+    
+    def add(self, keys):
+        """
+        Adds the NumPy uint64 array of keys to their shards.
+        """
+        import numpy as np
+        
+        keys = np.asarray(keys, dtype=np.uint64)
+        shard_ids = get_shard_ids(keys, self.num_shards)
+        order = np.argsort(shard_ids, kind='stable')
+        counts = np.bincount(shard_ids, minlength=self.num_shards)
+        for shard, shard_keys in enumerate(np.split(keys[order], np.cumsum(counts)[:-1])):
+            if len(shard_keys):
+                self._buffers[shard].append(shard_keys)
+                self._sizes[shard] += len(shard_keys)
+                if self._sizes[shard] >= self.buffer_size:
+                    self.flush(shard)
+    
+    def flush(self, shard=None):
+        """
+        Appends the keys held in memory for the shard (or for every shard) to the record files.
+        """
+        for shard in (range(self.num_shards) if shard is None else [shard]):
+            if self._buffers[shard]:
+                with open(self.record_filename(shard), 'ab') as outfile:
+                    for shard_keys in self._buffers[shard]:
+                        outfile.write(shard_keys.tobytes())
+                self._buffers[shard] = []
+                self._sizes[shard] = 0
+    
+    def close(self):
+        self.flush()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _merge_sorted_runs(run_filenames, outfile, block_size):
+    """
+    Writes the union of the files of sorted unique uint64 keys to the open file outfile, reading at most
+    block_size keys of each file at a time, and returns the number of keys written.
+    """
+    import numpy as np
+    
+    runs = [np.memmap(filename, dtype=np.uint64, mode='r') for filename in run_filenames]
+    blocks = [np.array(run[:block_size]) for run in runs]
+    positions = [len(block) for block in blocks]
+    count = 0
+    
+    while any(len(block) for block in blocks):
+        # Every key up to the smallest last key of the blocks is in the blocks
+        bound = min(block[-1] for block in blocks if len(block))
+        parts = []
+        for idx, block in enumerate(blocks):
+            cut = np.searchsorted(block, bound, side='right')
+            parts.append(block[:cut])
+            blocks[idx] = block[cut:]
+            if len(blocks[idx]) == 0 and positions[idx] < len(runs[idx]):
+                blocks[idx] = np.array(runs[idx][positions[idx]:positions[idx] + block_size])
+                positions[idx] += len(blocks[idx])
+        merged = np.unique(np.concatenate(parts))
+        outfile.write(merged.tobytes())
+        count += len(merged)
+    
+    del runs
+    return count
+
+
+def sort_shard(record_filename, keys_filename, chunk_size=1 << 24):
+    """
+    Sorts and deduplicates the uint64 keys of an unsorted record file into keys_filename and returns the
+    number of distinct keys. Records that do not fit in one chunk of chunk_size keys are sorted one chunk at a
+    time into temporary runs, which are then merged.
+    
+    :param record_filename: The file of uint64 records written by ShardWriter.
+    
+    :param keys_filename: The file in which to write the sorted unique keys.
+    
+    :param chunk_size: The largest number of keys sorted in memory at once.
+    """
+    import os
+    import numpy as np
+    
+    if not os.path.exists(record_filename) or os.path.getsize(record_filename) == 0:
+        open(keys_filename, 'wb').close()
+        return 0
+    
+    records = np.memmap(record_filename, dtype=np.uint64, mode='r')
+    if len(records) <= chunk_size:
+        keys = np.unique(records)
+        keys.tofile(keys_filename)
+        del records
+        return len(keys)
+    
+    run_filenames = []
+    for start in range(0, len(records), chunk_size):
+        run_filenames.append(f'{keys_filename}.run{len(run_filenames)}')
+        np.unique(records[start:start + chunk_size]).tofile(run_filenames[-1])
+    del records
+    
+    with open(keys_filename, 'wb') as outfile:
+        count = _merge_sorted_runs(run_filenames, outfile, max(chunk_size // len(run_filenames), 1))
+    for run_filename in run_filenames:
+        os.remove(run_filename)
+    
+    return count
+
+
+def build_sharded_partition(num_verts, num_edges, source=None, num_shards=64, path_prefix='data',
+                            chunk_size=1 << 24, batch_size=16384, algorithm=None, processes=None, connected=True):
+    """
+    Builds the sharded partition of the uspcm_dict of the graphs on num_verts vertices and num_edges edges from a
+    stream of graph6_strings, with the spectator number of each graph as its spectator minor floor number (the
+    starting point of spec_floor()), and returns it as a ShardedUspcmPartition. Memory use is bounded by
+    batch_size, chunk_size and the size of one shard, not by the size of the partition.
+    
+    :param source: Optional argument. An iterable of graph6_strings (not necessarily canonically labelled, and
+            possibly repeated) of the graphs, e.g. the deletions of the graphs on num_edges + 1 edges. By
+            default, the graphs streamed from iter_geng().
+    
+    :param connected: If True (default), the partition only has the connected graphs, unlike the txt, bin and
+            array partitions written by spec_floor(), which also have the disconnected deletions of the graphs
+            on num_edges + 1 edges. The default source then streams only the connected graphs, and with False
+            it streams every graph. It is recorded in shards.json, see ShardedUspcmPartition.connected.
+    
+    :param num_shards: The number of shards.
+    
+    :param path_prefix: The directory in which to save the shards. By default, 'data'
+    
+    :param chunk_size: See sort_shard().
+    
+    :param batch_size: The number of graphs canonically labelled together, and of graphs whose spectator
+            numbers are computed together, see get_spectator_numbers().
+    
+    :param algorithm: Optional argument. The canonical labelling backend, see canonical_graph6().
+    
+    :param processes: Optional argument. The number of worker processes used to canonically label the graphs,
+            see canonical_graph6_batch().
+    """
+    import json
+    import os
+    import numpy as np
+    from itertools import islice
+    
+    if source is None:
+        source = iter_geng(num_verts, num_edges, connected)
+    source = iter(source)
+    directory = get_shard_directory(num_verts, num_edges, path_prefix)
+    os.makedirs(directory, exist_ok=True)
+    
+    with ShardWriter(directory, num_shards) as writer:
+        while True:
+            batch = list(islice(source, batch_size))
+            if not batch:
+                break
+            writer.add(graph6_to_keys(canonical_graph6_batch(batch, algorithm, processes)))
+    
+    counts = []
+    for shard in range(num_shards):
+        record_filename = writer.record_filename(shard)
+        counts.append(sort_shard(record_filename, f'{directory}/shard_{shard:04d}.keys', chunk_size))
+        if os.path.exists(record_filename):
+            os.remove(record_filename)
+        
+        keys = np.memmap(f'{directory}/shard_{shard:04d}.keys', dtype=np.uint64, mode='r') if counts[-1] else np.zeros(0, np.uint64)
+        get_spectator_numbers(keys, num_verts, batch_size).astype(np.uint8).tofile(f'{directory}/shard_{shard:04d}.floors')
+        del keys
+    
+    with open(f'{directory}/shards.json', 'w') as outfile:
+        json.dump({'num_verts': num_verts, 'num_edges': num_edges, 'num_shards': num_shards, 'connected': connected,
+                   'counts': counts}, outfile)
+    
+    return ShardedUspcmPartition(directory)
+
+
+class ShardedUspcmPartition(Mapping):
+    """
+    Read-only partition of the uspcm_dict saved by build_sharded_partition(), which behaves like the
+    dictionary returned by read_partial_uspcm_dict(). Each shard is memory-mapped the first time it is used.
+    
+    The attribute connected is True if the partition only has the connected graphs (see
+    build_sharded_partition()). Shards saved before it was recorded were all built from the connected graphs.
+    
+    :param directory: The directory of the shards, see get_shard_directory().
+    """
+    
+    def __init__(self, directory):
+        import json
+        
+        with open(f'{directory}/shards.json') as infile:
+            meta = json.load(infile)
+        self.directory = directory
+        self.num_verts = meta['num_verts']
+        self.num_edges = meta['num_edges']
+        self.num_shards = meta['num_shards']
+        self.connected = meta.get('connected', True)
+        self.counts = meta['counts']
+        self._shards = {}
+    
+    def get_shard(self, shard):
+        """
+        Returns the memory-mapped NumPy arrays of the sorted keys and the floors of the shard.
+        """
+        import numpy as np
+        
+        if shard not in self._shards:
+            if self.counts[shard]:
+                self._shards[shard] = (np.memmap(f'{self.directory}/shard_{shard:04d}.keys', dtype=np.uint64, mode='r'),
+                                       np.memmap(f'{self.directory}/shard_{shard:04d}.floors', dtype=np.uint8, mode='r'))
+            else:
+                self._shards[shard] = (np.zeros(0, np.uint64), np.zeros(0, np.uint8))
+        return self._shards[shard]
+    
+    def get_floors(self, g6_strings):
+        """
+        Returns a NumPy int64 array of the spectator minor floor numbers of the graphs with the given
+        graph6_strings, looking up the graphs of each shard together. Raises a KeyError if a graph is not in
+        the partition.
+        """
+        import numpy as np
+        
+        keys = graph6_to_keys(g6_strings)
+        floors = np.zeros(len(keys), dtype=np.int64)
+        shard_ids = get_shard_ids(keys, self.num_shards)
+        for shard in np.unique(shard_ids):
+            indices = np.flatnonzero(shard_ids == shard)
+            shard_keys, shard_floors = self.get_shard(int(shard))
+            pos = np.searchsorted(shard_keys, keys[indices])
+            found = pos < len(shard_keys)
+            found[found] = shard_keys[pos[found]] == keys[indices][found]
+            if not found.all():
+                raise KeyError(key_to_graph6(keys[indices][~found][0]))
+            floors[indices] = shard_floors[pos]
+        return floors
+    
+    def __getitem__(self, g6_str):
+        try:
+            return int(self.get_floors([g6_str])[0])
+        except ValueError:
+            raise KeyError(g6_str)
+    
+    def __contains__(self, g6_str):
+        try:
+            self[g6_str]
+        except KeyError:
+            return False
+        return True
+    
+    def __iter__(self):
+        for shard in range(self.num_shards):
+            for key in self.get_shard(shard)[0]:
+                yield key_to_graph6(key)
+    
+    def __len__(self):
+        return sum(self.counts)
+    
+    def close(self):
+        self._shards = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+##########################################################################################
+#################################### Work Queue ##########################################
+##########################################################################################
+
+# Several worker processes, on one machine or on several machines sharing the data directory, can work through
+# the sharded partitions (see build_sharded_partition()) together. The work is split into (num_verts,
+# num_edges, shard) units recorded in an SQLite WorkQueue, and each worker claims one unit at a time. A unit
+# is only handed out once every unit it depends on is complete: the graphs of a partition get their final
+# spectator minor floors from the edge deletions of the partition with one more edge and from the edge
+# contractions of the partitions with one more vertex, so (num_verts, num_edges, shard) waits for every
+# unit on at least num_verts vertices and more than num_edges edges. Units are claimed for lease_time
+# seconds and the lease is renewed while the worker is alive, so the units of a worker that crashed are
+# claimed again once their lease runs out. Files written by several workers are guarded by FileLock.
+# The status of a unit is one of PARTITION_PENDING, PARTITION_IN_PROGRESS or PARTITION_COMPLETE.
+
+
+def get_worker_id():
+    """
+    Returns the name of the current process as a worker, as hostname:pid.
+    """
+    import os
+    import socket
+    
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class FileLock:
+    """
+    Lock held with an fcntl lock (lockf) on a lock file, which works across processes and, on file systems
+    that support POSIX locks (including NFS with a lock manager), across machines that share the directory.
+    The operating system releases the lock when the process holding it exits, so a lock is never left behind
+    by a crashed worker and is never broken by another process. The lock file itself is left in place and
+    holds the worker id (see get_worker_id()) of the last holder.
+    
+    Locks are held by processes, so two FileLocks on the same file in one process do not exclude each other.
+    
+    Use as a context manager:
+        with FileLock(filename):
+            ...
+    
+    :param filename: The lock file, usually the name of the file it guards followed by '.lock'.
+    
+    :param timeout: Optional argument. The number of seconds to wait for the lock before raising a TimeoutError.
+            By default, waits for as long as it takes.
+    
+    :param poll_interval: The number of seconds between attempts to take the lock when timeout is given.
+    """
+    
+    def __init__(self, filename, timeout=None, poll_interval=0.05):
+        self.filename = filename
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+    
+    def acquire(self):
+        """
+        Takes the lock, waiting for it if another process holds it.
+        """
+        import fcntl
+        import os
+        import time
+        
+        fd = os.open(self.filename, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if self.timeout is None:
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+            else:
+                start = time.time()
+                while True:
+                    try:
+                        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError:
+                        if time.time() - start > self.timeout:
+                            raise TimeoutError(f'Timed out waiting for the lock {self.filename}')
+                        time.sleep(self.poll_interval)
+            os.ftruncate(fd, 0)
+            os.write(fd, get_worker_id().encode())
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+    
+    def release(self):
+        import fcntl
+        import os
+        
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+    
+    def __enter__(self):
+        return self.acquire()
+    
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class WorkQueue:
+    """
+    Queue of (num_verts, num_edges, shard) units of work shared by worker processes through an SQLite
+    database. Claiming a unit is a single transaction, so a unit is never handed to two live workers.
+    
+    :param filename: The SQLite database file, e.g. f'{path_prefix}/work_queue.sqlite'.
+    
+    :param lease_time: The number of seconds a worker has a claimed unit for before it can be claimed by
+            another worker, unless the lease is renewed with heartbeat().
+    """
+    
+    def __init__(self, filename, lease_time=600):
+        self.filename = filename
+        self.lease_time = lease_time
+        self._db = None
+        self._pid = None
+    
+    def _connection(self):
+        import os
+        import sqlite3
+        
+        # A connection cannot be shared with a forked worker process, so each process opens its own
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.filename, timeout=60, isolation_level=None)
+            self._pid = os.getpid()
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS units (num_verts INTEGER NOT NULL, num_edges INTEGER NOT NULL, '
+                             'shard INTEGER NOT NULL, status TEXT NOT NULL, worker TEXT, lease_expires REAL, '
+                             'attempts INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (num_verts, num_edges, shard)) WITHOUT ROWID')
+        return self._db
+    
+    def add_partitions(self, partitions, num_shards=1):
+        """
+        Adds the units of the partitions that are not in the queue yet.
+        
+        :param partitions: An iterable of (num_verts, num_edges) pairs, or of (num_verts, num_edges, num_shards)
+                triples for partitions with their own number of shards.
+        
+        :param num_shards: The number of shards of the partitions given as pairs.
+        """
+        units = []
+        for partition in partitions:
+            num_verts, num_edges = partition[:2]
+            for shard in range(partition[2] if len(partition) > 2 else num_shards):
+                units.append((num_verts, num_edges, shard, PARTITION_PENDING))
+        
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        db.executemany('INSERT OR IGNORE INTO units (num_verts, num_edges, shard, status) VALUES (?, ?, ?, ?)', units)
+        db.execute('COMMIT')
+    
+    def claim(self, worker=None):
+        """
+        Claims the next unit that is ready, from the most vertices and edges down, and returns it as
+        (num_verts, num_edges, shard), or returns None if no unit is ready. A unit is ready if it is pending, or
+        if its lease has run out, and every unit it depends on is complete.
+        
+        :param worker: Optional argument. The worker id. By default, get_worker_id().
+        """
+        import time
+        
+        if worker is None:
+            worker = get_worker_id()
+        now = time.time()
+        
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            unit = db.execute('SELECT num_verts, num_edges, shard FROM units AS u '
+                              'WHERE (status = ? OR (status = ? AND lease_expires < ?)) '
+                              'AND NOT EXISTS (SELECT 1 FROM units AS v WHERE v.num_verts >= u.num_verts '
+                              'AND v.num_edges > u.num_edges AND v.status != ?) '
+                              'ORDER BY num_verts DESC, num_edges DESC, shard LIMIT 1',
+                              (PARTITION_PENDING, PARTITION_IN_PROGRESS, now, PARTITION_COMPLETE)).fetchone()
+            if unit is not None:
+                db.execute('UPDATE units SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 '
+                           'WHERE num_verts = ? AND num_edges = ? AND shard = ?',
+                           (PARTITION_IN_PROGRESS, worker, now + self.lease_time) + tuple(unit))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        
+        return None if unit is None else tuple(unit)
+    
+    def _update(self, sql, params, unit, worker):
+        if worker is None:
+            worker = get_worker_id()
+        cursor = self._connection().execute(sql + ' WHERE num_verts = ? AND num_edges = ? AND shard = ? AND worker = ?',
+                                            tuple(params) + tuple(unit) + (worker,))
+        return cursor.rowcount > 0
+    
+    def heartbeat(self, unit, worker=None):
+        """
+        Renews the lease of a claimed unit. Returns False if the unit is no longer claimed by the worker.
+        """
+        import time
+        
+        return self._update('UPDATE units SET lease_expires = ?', (time.time() + self.lease_time,), unit, worker)
+    
+    def complete(self, unit, worker=None):
+        """
+        Records that the worker has finished a claimed unit. Returns False if the unit had been claimed by
+        another worker in the meantime, in which case it is left to that worker.
+        """
+        return self._update('UPDATE units SET status = ?, lease_expires = NULL', (PARTITION_COMPLETE,), unit, worker)
+    
+    def release(self, unit, worker=None):
+        """
+        Gives back a claimed unit that the worker could not finish, so that it can be claimed again.
+        """
+        return self._update('UPDATE units SET status = ?, worker = NULL, lease_expires = NULL',
+                            (PARTITION_PENDING,), unit, worker)
+    
+    def get_status(self, num_verts=None, num_edges=None):
+        """
+        Returns a dictionary of the number of units with each status, for the whole queue or for one partition.
+        """
+        sql = 'SELECT status, COUNT(*) FROM units'
+        params = ()
+        if num_verts is not None:
+            sql += ' WHERE num_verts = ? AND num_edges = ?'
+            params = (num_verts, num_edges)
+        status = {PARTITION_PENDING: 0, PARTITION_IN_PROGRESS: 0, PARTITION_COMPLETE: 0}
+        status.update(self._connection().execute(sql + ' GROUP BY status', params).fetchall())
+        return status
+    
+    def is_done(self):
+        status = self.get_status()
+        return status[PARTITION_PENDING] + status[PARTITION_IN_PROGRESS] == 0
+    
+    def close(self):
+        if self._db is not None and self._pid is not None:
+            import os
+            if self._pid == os.getpid():
+                self._db.close()
+        self._db = None
+
+
+def run_worker(queue, work, worker=None, poll_interval=5, max_units=None):
+    """
+    Claims and runs units of a WorkQueue until every unit is complete, and returns the number of units run.
+    While a unit runs, its lease is renewed by a background thread. If work raises an exception, the unit is
+    released and the exception is raised again. Since a unit can be run again after a crash, work must give
+    the same result when it is run more than once.
+    
+    :param queue: The WorkQueue, or the name of its SQLite database file.
+    
+    :param work: The function called as work(num_verts, num_edges, shard) for each unit.
+    
+    :param worker: Optional argument. The worker id. By default, get_worker_id().
+    
+    :param poll_interval: The number of seconds to wait for other workers when no unit is ready.
+    
+    :param max_units: Optional argument. The largest number of units to run.
+    """
+    import threading
+    import time
+    
+    if not isinstance(queue, WorkQueue):
+        queue = WorkQueue(queue)
+    if worker is None:
+        worker = get_worker_id()
+    
+    def renew_lease(unit, stop):
+        # The SQLite connection of the queue belongs to this thread's parent, so the thread opens its own
+        lease_queue = WorkQueue(queue.filename, queue.lease_time)
+        while not stop.wait(queue.lease_time / 3):
+            lease_queue.heartbeat(unit, worker)
+        lease_queue.close()
+    
+    num_units = 0
+    while max_units is None or num_units < max_units:
+        unit = queue.claim(worker)
+        if unit is None:
+            if queue.is_done():
+                break
+            time.sleep(poll_interval)
+            continue
+        
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=renew_lease, args=(unit, stop), daemon=True)
+        heartbeat.start()
+        try:
+            work(*unit)
+        except BaseException:
+            queue.release(unit, worker)
+            raise
+        finally:
+            stop.set()
+            heartbeat.join()
+        queue.complete(unit, worker)
+        num_units += 1
+    
+    return num_units
+
+
+
+##########################################################################################
+############################## Initialize All Dicts ######################################
+##########################################################################################
+
+def get_spectator_number_dictionaries(path_prefix='data', file_format='txt', load_complete=True, lazy=False,
+                                      memory_budget=None, workers=None):
+    """
+    Returns the uspcm_dict, minimals_dict, seen_dict, and completed_dict that have either been reconstructed
+    from saved files or initialized if no saved files exist.
+    
+    uspcm_dict: Nested dictionary of the form 
+            uspcm_dict[f'{nn}_verts'][f'{ee}_edges'][graph6_string] = spectator minor floor number, where 
+            nn is the number of vertices, ee is the number of edges, and graph6_string is the graph6_string 
+            of that graph.
+    
+    minimals_dict: Dictionary of the form minimals_dict[f'{kk}_spectators'] = set of graphs which have
+            spectator minor floor number equal to kk and which are minor minimal with respect to the spectator
+            minor floor number.
+            
+    seen_dict: Nested dictionary of the form seen_dict[f'{nn}_verts'][f'{ee}_edges'] = a set of graph6_strings
+            of graphs whose spectator minor floor number has been calculated and saved to file.
+            
+    completed_dict: Nested dictionary of the form completed_dict[f'{nn}_verts'][f'{ee}_edges'] = a set of 
+            graph6_strings of graphs which have been determined as to whether or not they are minor minimal
+            with respect to the spectator minor floor number.
+    
+    :param path_prefix: The directory in which to find the partitioned files that can be used to rebuild
+            the dictionaries.
+            
+    :param file_format: Either 'txt' (default), 'bin' or 'array', how the uspcm_dict partitions are read, see
+            init_uspcm_dict().
+            
+    :param load_complete: If False, only the partitions needed to resume the computation are read, see
+            init_uspcm_dict(), init_seen_dict() and init_completed_dict().
+            
+    :param lazy: If True, uspcm_dict, seen_dict and completed_dict are LazyPartitionDicts that read each
+            partition the first time it is accessed.
+            
+    :param memory_budget: Optional argument, only used if lazy is True. The number of bytes of complete
+            partitions each of the three dictionaries keeps in memory, see LazyPartitionDict.
+            
+    :param workers: Optional argument. The number of worker processes (or threads) used to read the
+            partitions of each dictionary, see load_partitions().
     """
     
-    uspcm_dict = init_uspcm_dict(path_prefix)
+    uspcm_dict = init_uspcm_dict(path_prefix, file_format, load_complete, lazy, memory_budget, workers)
     minimals_dict = read_minimals_dict(path_prefix)
-    seen_dict = init_seen_dict(path_prefix)
-    completed_dict = init_completed_dict(path_prefix)
+    seen_dict = init_seen_dict(path_prefix, load_complete, lazy, memory_budget, workers)
+    completed_dict = init_completed_dict(path_prefix, load_complete, lazy, memory_budget, workers)
         
     return uspcm_dict, minimals_dict, seen_dict, completed_dict
\ No newline at end of file